@@ -11,9 +11,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import os
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,8 +40,10 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_yasg',
     # LOCAL_APPS
+    'apps.core',
     'apps.accounts',
     'apps.inventory',
     'apps.products',
@@ -154,6 +157,25 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Las subidas se guardan una vez por contenido (utils/storage/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'utils.storage.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Variantes de imágenes (miniaturas y WebP) generadas en un pool de procesos
+IMAGE_VARIANT_WIDTHS = config("IMAGE_VARIANT_WIDTHS", default="320,640,1280", cast=Csv(int, post_process=tuple))
+IMAGE_VARIANT_WORKERS = config("IMAGE_VARIANT_WORKERS", default=2, cast=int)
+IMAGE_VARIANTS_ASYNC = config("IMAGE_VARIANTS_ASYNC", default=True, cast=bool)
+
+# Servido de /media/ y /static/ (utils/media/media.py). Los nombres con hash se
+# sirven como immutable; el resto con MEDIA_CACHE_SECONDS y revalidación.
+# MEDIA_SENDFILE_BACKEND: '' (Django envía el fichero), 'x-accel-redirect'
+# (nginx, con un location internal en MEDIA_SENDFILE_PREFIX) o 'x-sendfile'.
+MEDIA_CACHE_SECONDS = config("MEDIA_CACHE_SECONDS", default=3600, cast=int)
+MEDIA_SENDFILE_BACKEND = config("MEDIA_SENDFILE_BACKEND", default="")
+MEDIA_SENDFILE_PREFIX = config("MEDIA_SENDFILE_PREFIX", default="/_protected")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -195,6 +217,41 @@ AUTHENTICATION_BACKENDS = [
 # FRONTEND URL
 FRONTEND_URL = config("FRONTEND_URL", default="https://localhost:3000")
 
+# Caché (por defecto en memoria del proceso; con varios workers conviene un
+# backend compartido para que las invalidaciones lleguen a todos)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+CATEGORY_TREE_CACHE_SECONDS = config("CATEGORY_TREE_CACHE_SECONDS", default=300, cast=int)
+PRODUCT_STATISTICS_CACHE_SECONDS = config("PRODUCT_STATISTICS_CACHE_SECONDS", default=300, cast=int)
+ACTIVE_OFFERTS_CACHE_SECONDS = config("ACTIVE_OFFERTS_CACHE_SECONDS", default=3600, cast=int)
+
+# Filas por producto para los contadores likes/total_sales (fold_product_counters los pliega)
+PRODUCT_COUNTER_SHARDS = config("PRODUCT_COUNTER_SHARDS", default=8, cast=int)
+
+# Reservas de stock: vigencia por defecto en segundos
+STOCK_RESERVATION_TTL_SECONDS = config("STOCK_RESERVATION_TTL_SECONDS", default=900, cast=int)
+
+# Idempotency-Key: tiempo que se guarda la primera respuesta, en segundos
+IDEMPOTENCY_KEY_TTL_SECONDS = config("IDEMPOTENCY_KEY_TTL_SECONDS", default=86400, cast=int)
+
+# Logs de las apps (p. ej. cada ejecución de sync_offerts) por consola
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'apps': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO')},
+    },
+}
+
 # CORS
 LIST_CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS',default='https://localhost:8000')
 CORS_ALLOWED_ORIGINS = LIST_CORS_ALLOWED_ORIGINS.split(",")
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include,re_path
 from django.conf import settings
-from django.views.static import serve
+from utils.media.media import serve
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
@@ -40,6 +40,7 @@ urlpatterns = [
     path('accounts/', include('apps.accounts.api.routers.auth')),
     path('products/', include('apps.products.api.routers.products')),
     path('inventory/', include('apps.inventory.api.routers.inventory')),
+    path('events/', include('apps.core.api.routers.events')),
     re_path(r'^media/(?P<path>.*)$',serve,{'document_root':settings.MEDIA_ROOT}),
     re_path(r'^static/(?P<path>.*)$',serve,{'document_root':settings.STATIC_ROOT}),
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
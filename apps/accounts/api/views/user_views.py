@@ -1,9 +1,9 @@
 from rest_framework import generics, permissions, filters
-from rest_framework.pagination import PageNumberPagination
 from apps.accounts.api.serializers.change_password_serializer import ChangePasswordSerializer
 from apps.accounts.api.serializers.user_serializer import UserRegisterSerializer, UserSerializer, UserUpdateSerializer, UserUpdateStatusSerializer
 from apps.accounts.models import User
 from utils.permission.admin import IsAdminGroup
+from utils.pagination.pagination import Pagination
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework import status
@@ -11,7 +11,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 
-class UserPagination(PageNumberPagination):
+class UserPagination(Pagination):
     """
     Custom pagination configuration
     """
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from apps.core.models import IdempotencyKey, OutboxEvent, MediaBlob
+
+# Register your models here.
+
+
+admin.site.register(IdempotencyKey)
+admin.site.register(OutboxEvent)
+admin.site.register(MediaBlob)
@@ -0,0 +1,6 @@
+from django.urls import path
+from apps.core.api.views.event_view import OutboxEventListAPIView
+
+urlpatterns = [
+    path('', OutboxEventListAPIView.as_view(), name="outbox-events"),
+]
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from apps.core.models import OutboxEvent
+
+
+class OutboxEventSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = OutboxEvent
+        fields = ['id', 'txid', 'aggregate', 'aggregate_id', 'event', 'payload', 'created_at']
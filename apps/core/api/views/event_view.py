@@ -0,0 +1,57 @@
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.core.models import OutboxEvent, SnapshotXmin
+from apps.core.api.serializers.event_serializer import OutboxEventSerializer
+from utils.permission.admin import IsAdminGroup
+
+
+class OutboxEventListAPIView(APIView):
+    """
+    Feed de cambios de stocks, productos y ofertas:
+    ?after=<last_id>&after_txid=<last_txid>&limit=
+    Opcionalmente ?aggregate=stock,product,offert.
+
+    En PostgreSQL un evento con id menor puede confirmarse después que otro
+    con id mayor, así que los eventos se sirven en orden (txid, id) y solo
+    los de transacciones anteriores a la transacción abierta más antigua:
+    ninguna transacción posterior puede ya escribir detrás del cursor. Si
+    falta after_txid se toma el del evento `after` (o 0 si se compactó, lo
+    que puede repetir eventos ya recibidos).
+    """
+    permission_classes = [IsAuthenticated, IsAdminGroup]
+
+    def get(self, request):
+        try:
+            after = int(request.query_params.get('after', 0))
+            after_txid = request.query_params.get('after_txid')
+            after_txid = int(after_txid) if after_txid not in (None, '') else None
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), 1000)
+        except ValueError:
+            return Response(
+                {'error': 'after, after_txid y limit deben ser números enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if connection.vendor == 'postgresql':
+            if after_txid is None:
+                after_txid = OutboxEvent.objects.filter(pk=after).values_list('txid', flat=True).first() or 0
+            events = OutboxEvent.objects.alias(xmin=SnapshotXmin()).filter(
+                Q(txid__gt=after_txid) | Q(txid=after_txid, pk__gt=after), txid__lt=F('xmin')
+            ).order_by('txid', 'pk')
+        else:
+            events = OutboxEvent.objects.filter(pk__gt=after).order_by('pk')
+        if request.query_params.get('aggregate'):
+            events = events.filter(aggregate__in=request.query_params['aggregate'].split(','))
+        events = list(events[:limit + 1])
+        has_more = len(events) > limit
+        events = events[:limit]
+        return Response({
+            'results': OutboxEventSerializer(events, many=True).data,
+            'last_id': events[-1].pk if events else after,
+            'last_txid': events[-1].txid if events else after_txid,
+            'has_more': has_more
+        })
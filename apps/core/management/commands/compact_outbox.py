@@ -0,0 +1,44 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.core.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los eventos del outbox más antiguos que --days. Con --compact borra además, "
+        "entre los eventos de más de --compact-hours, los que tienen un evento posterior de la "
+        "misma entidad (el payload siempre es la fila completa, así que el último basta)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Retención en días')
+        parser.add_argument('--compact', action='store_true', help='Quedarse solo con el último evento de cada entidad')
+        parser.add_argument('--compact-hours', type=int, default=24, help='Antigüedad mínima para compactar')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Filas borradas por sentencia')
+
+    def delete_in_batches(self, queryset, batch_size):
+        deleted = 0
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += OutboxEvent.objects.filter(pk__in=ids).delete()[0]
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = OutboxEvent.objects.filter(created_at__lt=now - datetime.timedelta(days=options['days']))
+        deleted = self.delete_in_batches(expired, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Eventos caducados borrados: {deleted}"))
+
+        if options['compact']:
+            superseded = OutboxEvent.objects.filter(
+                created_at__lt=now - datetime.timedelta(hours=options['compact_hours'])
+            ).filter(Exists(OutboxEvent.objects.filter(
+                aggregate=OuterRef('aggregate'), aggregate_id=OuterRef('aggregate_id'), pk__gt=OuterRef('pk')
+            )))
+            compacted = self.delete_in_batches(superseded, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Eventos compactados: {compacted}"))
@@ -0,0 +1,38 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.services.media_service import adopt_legacy_files, count_references, recount_blobs, sweep_blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las referencias de los blobs de media (Category.image y Product.image_list) y borra "
+        "los que no tienen ninguna y no se usan desde hace --min-age-hours. Con --adopt pasa antes al "
+        "almacén por contenido los ficheros subidos antes de activarlo (deduplicándolos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age-hours', type=int, default=24, help='Antigüedad mínima de un blob para borrarlo')
+        parser.add_argument('--adopt', action='store_true', help='Adoptar los ficheros anteriores fuera de blobs/')
+        parser.add_argument('--dry-run', action='store_true', help='Informar sin borrar ni mover nada')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['adopt']:
+            files, result = adopt_legacy_files(dry_run=options['dry_run'])
+            if options['dry_run']:
+                self.stdout.write(f"Ficheros anteriores por adoptar: {files} ({result} bytes)")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Ficheros anteriores adoptados: {files} en {result} blobs"))
+
+        changed = recount_blobs(count_references())
+        cutoff = timezone.now() - datetime.timedelta(hours=options['min_age_hours'])
+        blobs, size = sweep_blobs(cutoff, dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+        verb = 'por borrar' if options['dry_run'] else 'borrados'
+        self.stdout.write(self.style.SUCCESS(
+            f"Referencias actualizadas: {changed}. Blobs sin referencias {verb}: {blobs} ({size} bytes, {elapsed:.1f} s)"
+        ))
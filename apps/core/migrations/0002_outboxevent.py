@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:17
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('aggregate', models.CharField(max_length=50)),
+                ('aggregate_id', models.BigIntegerField()),
+                ('event', models.CharField(choices=[('created', 'creado'), ('updated', 'actualizado'), ('deleted', 'eliminado')], max_length=10)),
+                ('payload', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox event',
+                'verbose_name_plural': 'Outbox events',
+                'db_table': 'outbox_event',
+                'indexes': [models.Index(fields=['aggregate', 'aggregate_id', 'id'], name='outbox_aggregate_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:44
+
+import apps.core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='txid',
+            field=models.BigIntegerField(blank=True, db_default=apps.core.models.CurrentTransactionId(), editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['txid', 'id'], name='outbox_txid_idx'),
+        ),
+    ]
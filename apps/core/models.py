@@ -0,0 +1,112 @@
+from django.db import models
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class IdempotencyKey(models.Model):
+    """
+    Primera respuesta de una petición de escritura enviada con la cabecera
+    Idempotency-Key. Los reintentos con la misma clave y usuario reciben la
+    respuesta guardada en vez de repetir la operación. La fila se crea y
+    recibe la respuesta en la misma transacción que la operación.
+    """
+    user_id = models.IntegerField(default=0)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_key'
+        verbose_name = "Idempotency key"
+        verbose_name_plural = "Idempotency keys"
+        unique_together = ('user_id', 'key')
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
+
+
+class CurrentTransactionId(models.Func):
+    """Id de la transacción que escribe la fila (PostgreSQL 13+); NULL en otras bases"""
+    output_field = models.BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return 'NULL', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return 'pg_current_xact_id()::text::bigint', []
+
+
+class SnapshotXmin(models.Func):
+    """Transacción abierta más antigua vista por la consulta (PostgreSQL 13+)"""
+    output_field = models.BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return 'NULL', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return 'pg_snapshot_xmin(pg_current_snapshot())::text::bigint', []
+
+
+class OutboxEvent(models.Model):
+    """
+    Evento de cambio escrito en la misma transacción que el cambio de
+    Stock, Product u Offert. payload guarda la fila completa tras el cambio.
+
+    En PostgreSQL los ids no siguen el orden de confirmación, así que el
+    cursor de los consumidores es (txid, id): txid es la transacción que
+    escribió el evento. En SQLite las escrituras se serializan y basta el id.
+    """
+    EVENT_CHOICES = (
+        ('created', 'creado'),
+        ('updated', 'actualizado'),
+        ('deleted', 'eliminado'),
+    )
+    id = models.BigAutoField(primary_key=True)
+    aggregate = models.CharField(max_length=50)
+    aggregate_id = models.BigIntegerField()
+    event = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    payload = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    txid = models.BigIntegerField(null=True, blank=True, editable=False, db_default=CurrentTransactionId())
+
+    class Meta:
+        db_table = 'outbox_event'
+        verbose_name = "Outbox event"
+        verbose_name_plural = "Outbox events"
+        indexes = [
+            # Compactación: último evento de cada entidad
+            models.Index(fields=['aggregate', 'aggregate_id', 'id'], name='outbox_aggregate_idx'),
+            # Cursor del feed en PostgreSQL
+            models.Index(fields=['txid', 'id'], name='outbox_txid_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.aggregate}:{self.aggregate_id} {self.event}"
+
+
+class MediaBlob(models.Model):
+    """
+    Fichero guardado por ContentAddressedStorage bajo su hash SHA-256. Cada
+    contenido se guarda una sola vez; ref_count es el número de referencias
+    desde Category.image y Product.image_list que recalcula gc_media_blobs,
+    que borra los blobs sin referencias. last_used_at se actualiza también
+    cuando una subida reutiliza el blob, para que el GC no lo borre antes de
+    que se guarde la entidad que lo referencia.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'media_blob'
+        verbose_name = "Media blob"
+        verbose_name_plural = "Media blobs"
+
+    def __str__(self):
+        return self.name
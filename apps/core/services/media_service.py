@@ -0,0 +1,165 @@
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from apps.core.models import MediaBlob
+from apps.products.models import Category, Product
+from apps.products.services.category_service import CATEGORY_TREE_CACHE
+from apps.products.services.offert_service import ACTIVE_OFFERTS_CACHE
+from utils.cache.cache import bump_version
+from utils.images.images import media_name
+from utils.storage.storage import BLOB_PREFIX
+
+BATCH_SIZE = 1000
+# Lotes del GC más pequeños: cada uno vuelve a buscar sus referencias
+SWEEP_BATCH_SIZE = 200
+
+
+def count_references():
+    """
+    {nombre en MEDIA_ROOT: número de referencias} desde Category.image y
+    las URLs /media/ de Product.image_list. Dos consultas.
+    """
+    counts = Counter(
+        Category.objects.exclude(image__isnull=True).exclude(image='').values_list('image', flat=True)
+    )
+    for image_list in Product.objects.exclude(image_list=[]).values_list('image_list', flat=True).iterator():
+        counts.update(name for name in map(media_name, image_list or []) if name)
+    return counts
+
+
+def recount_blobs(references):
+    """Actualiza MediaBlob.ref_count; devuelve el número de blobs cambiados"""
+    changed = [
+        MediaBlob(pk=pk, ref_count=references.get(name, 0))
+        for pk, name, ref_count in MediaBlob.objects.values_list('pk', 'name', 'ref_count').iterator()
+        if ref_count != references.get(name, 0)
+    ]
+    MediaBlob.objects.bulk_update(changed, ['ref_count'], batch_size=BATCH_SIZE)
+    return len(changed)
+
+
+def delete_variants(name):
+    """Borra las variantes generadas (variants/<nombre sin extensión>-<ancho>.<ext>)"""
+    stem, _ = os.path.splitext(name)
+    directory = os.path.join(settings.MEDIA_ROOT, 'variants', os.path.dirname(stem))
+    prefix = os.path.basename(stem) + '-'
+    if not os.path.isdir(directory):
+        return
+    for entry in os.listdir(directory):
+        if entry.startswith(prefix):
+            os.remove(os.path.join(directory, entry))
+
+
+def _referenced(names):
+    """Los nombres de `names` que alguna entidad referencia ahora mismo"""
+    referenced = set(Category.objects.filter(image__in=names).values_list('image', flat=True))
+    condition = Q()
+    for name in names:
+        condition |= Q(image_list__icontains=name)
+    for image_list in Product.objects.filter(condition).values_list('image_list', flat=True):
+        referenced.update(name for name in map(media_name, image_list or []) if name in names)
+    return referenced
+
+
+def sweep_blobs(cutoff, dry_run=False):
+    """
+    Borra los blobs sin referencias no usados desde `cutoff` (fichero,
+    variantes y fila). Devuelve (blobs, bytes) liberados.
+
+    Cada lote se bloquea con SELECT ... FOR UPDATE SKIP LOCKED (una subida
+    que está reutilizando el blob lo tiene bloqueado), se vuelven a
+    comprobar last_used_at y las referencias, y filas y ficheros se borran
+    antes de confirmar: una subida concurrente espera al commit y, al no
+    encontrar la fila, vuelve a escribir el fichero.
+    """
+    candidates = MediaBlob.objects.filter(ref_count=0, last_used_at__lt=cutoff)
+    if dry_run:
+        sizes = list(candidates.values_list('size', flat=True))
+        return len(sizes), sum(sizes)
+
+    pks = list(candidates.values_list('pk', flat=True))
+    blobs = size = 0
+    for start in range(0, len(pks), SWEEP_BATCH_SIZE):
+        with transaction.atomic():
+            orphans = list(
+                candidates.select_for_update(skip_locked=True).filter(
+                    pk__in=pks[start:start + SWEEP_BATCH_SIZE]
+                ).values_list('pk', 'name', 'size')
+            )
+            if not orphans:
+                continue
+            referenced = _referenced({name for _, name, _ in orphans})
+            orphans = [orphan for orphan in orphans if orphan[1] not in referenced]
+            MediaBlob.objects.filter(pk__in=[pk for pk, _, _ in orphans]).delete()
+            for _, name, _ in orphans:
+                default_storage.delete(name)
+                delete_variants(name)
+        blobs += len(orphans)
+        size += sum(orphan_size for _, _, orphan_size in orphans)
+    return blobs, size
+
+
+def _adopt(name, adopted):
+    """Guarda un fichero anterior al almacenamiento por contenido como blob"""
+    if name not in adopted:
+        if not default_storage.exists(name):
+            adopted[name] = None
+        else:
+            with default_storage.open(name) as legacy:
+                adopted[name] = default_storage.save(name, legacy)
+    return adopted[name]
+
+
+def _remap_variants(variants, renamed):
+    return {renamed.get(name) or name: value for name, value in (variants or {}).items()}
+
+
+def adopt_legacy_files(dry_run=False):
+    """
+    Pasa al almacén por contenido los ficheros referenciados que no están en
+    blobs/ (subidas anteriores), reescribe las referencias y borra los
+    originales: los duplicados quedan en un único blob. Las variantes ya
+    generadas se conservan con su nombre. Devuelve (ficheros, blobs); con
+    dry_run, (ficheros, bytes que ocupan).
+    """
+    legacy = [
+        name for name in count_references()
+        if not name.startswith(BLOB_PREFIX + '/') and default_storage.exists(name)
+    ]
+    if dry_run:
+        return len(legacy), sum(default_storage.size(name) for name in legacy)
+
+    adopted = {}
+    for category in Category.objects.exclude(image__isnull=True).exclude(image='').exclude(
+        image__startswith=BLOB_PREFIX + '/'
+    ).only('pk', 'image', 'image_variants'):
+        new_name = _adopt(category.image.name, adopted)
+        if new_name:
+            Category.objects.filter(pk=category.pk).update(
+                image=new_name, image_variants=_remap_variants(category.image_variants, adopted)
+            )
+
+    for product in Product.objects.exclude(image_list=[]).only('pk', 'image_list', 'image_variants').iterator():
+        names = [media_name(url) for url in product.image_list]
+        if not any(name and not name.startswith(BLOB_PREFIX + '/') for name in names):
+            continue
+        image_list = []
+        for url, name in zip(product.image_list, names):
+            new_name = _adopt(name, adopted) if name and not name.startswith(BLOB_PREFIX + '/') else None
+            image_list.append(default_storage.url(new_name) if new_name else url)
+        Product.objects.filter(pk=product.pk).update(
+            image_list=image_list, image_variants=_remap_variants(product.image_variants, adopted)
+        )
+
+    for name, new_name in adopted.items():
+        if new_name:
+            default_storage.delete(name)
+    # Las referencias se reescriben con UPDATE, sin señales
+    bump_version(CATEGORY_TREE_CACHE)
+    bump_version(ACTIVE_OFFERTS_CACHE)
+    blobs = {new_name for new_name in adopted.values() if new_name}
+    return len([name for name in adopted.values() if name]), len(blobs)
@@ -0,0 +1,33 @@
+from apps.core.models import OutboxEvent
+
+
+BATCH_SIZE = 1000
+
+
+def snapshot(instance):
+    """Columnas de la fila como dict (las FK como <campo>_id)"""
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def build_event(instance, event):
+    return OutboxEvent(
+        aggregate=instance._meta.model_name,
+        aggregate_id=instance.pk,
+        event=event,
+        payload=snapshot(instance),
+    )
+
+
+def publish(instance, event='updated'):
+    """
+    Escribe el evento de cambio de `instance`. Debe llamarse dentro de la
+    transacción que hace el cambio para que ambos se confirmen juntos.
+    """
+    return build_event(instance, event).save()
+
+
+def publish_many(instances, event='updated'):
+    """Igual que publish() para los caminos masivos (bulk_update, UPDATE, upserts)"""
+    OutboxEvent.objects.bulk_create(
+        [build_event(instance, event) for instance in instances], batch_size=BATCH_SIZE
+    )
@@ -0,0 +1,26 @@
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete
+
+from apps.core.services.outbox_service import publish
+
+
+# Modelos cuyos cambios se publican en el outbox. Las escrituras que no pasan
+# por save()/delete() (UPDATE condicionales, bulk_update, upserts) publican
+# explícitamente con publish_many().
+OUTBOX_MODELS = ('inventory.Stock', 'products.Product', 'products.Offert')
+
+
+def publish_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        publish(instance, 'created' if created else 'updated')
+
+
+def publish_deleted(sender, instance, **kwargs):
+    publish(instance, 'deleted')
+
+
+def connect_outbox():
+    for label in OUTBOX_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(publish_saved, sender=model, dispatch_uid=f'outbox_save_{label}')
+        post_delete.connect(publish_deleted, sender=model, dispatch_uid=f'outbox_delete_{label}')
@@ -0,0 +1,300 @@
+import datetime
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import Group
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User
+from apps.core.models import MediaBlob, OutboxEvent
+from apps.core.services.media_service import adopt_legacy_files, count_references, recount_blobs, sweep_blobs
+from apps.inventory.models import Store, Warehouse, Stock
+from apps.inventory.services import stock_service
+from apps.products.models import Category, Product
+from utils.media.media import IMMUTABLE_CACHE_CONTROL, serve
+
+
+class OutboxEventFeedTests(APITestCase):
+    url = '/events/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='admin@test.com', password='x')
+        cls.user.groups.add(Group.objects.get_or_create(name='admin')[0])
+        OutboxEvent.objects.all().delete()
+        cls.events = OutboxEvent.objects.bulk_create([
+            OutboxEvent(aggregate='stock' if index % 2 else 'product', aggregate_id=index, event='updated')
+            for index in range(5)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_walks_the_feed_in_order(self):
+        first = self.client.get(self.url, {'limit': 3}).data
+        second = self.client.get(self.url, {'after': first['last_id'], 'limit': 3}).data
+
+        self.assertEqual([event['aggregate_id'] for event in first['results']], [0, 1, 2])
+        self.assertTrue(first['has_more'])
+        self.assertEqual([event['aggregate_id'] for event in second['results']], [3, 4])
+        self.assertFalse(second['has_more'])
+
+    def test_empty_page_keeps_the_cursor(self):
+        last = self.events[-1].pk
+
+        data = self.client.get(self.url, {'after': last}).data
+
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['last_id'], last)
+
+    def test_aggregate_filter(self):
+        data = self.client.get(self.url, {'aggregate': 'stock'}).data
+
+        self.assertEqual([event['aggregate_id'] for event in data['results']], [1, 3])
+
+    def test_query_count_does_not_depend_on_the_limit(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'limit': 1})
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'limit': 1000})
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'after': 'x'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_admin_group(self):
+        self.client.force_authenticate(User.objects.create_user(email='user@test.com', password='x'))
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OutboxPublishTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        warehouse = Warehouse.objects.create(store=Store.objects.create(name='Tienda', address='x'), name='W', address='x')
+        product = Product.objects.create(code='P1', slug='p1', name='Producto 1', unit_price=10)
+        cls.stock = Stock.objects.create(code='S-P1', product=product, warehouse=warehouse, cant=10, unit_price=5)
+
+    def test_event_is_written_with_the_change(self):
+        OutboxEvent.objects.all().delete()
+
+        stock_service.bulk_adjust_stock([{'stock_id': self.stock.pk, 'adjustment': 3}])
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.aggregate, event.aggregate_id), ('stock', self.stock.pk))
+        self.assertEqual(event.payload['cant'], 13)
+
+    def test_rejected_change_leaves_no_event(self):
+        OutboxEvent.objects.all().delete()
+
+        with self.assertRaises(stock_service.BulkAdjustmentError):
+            stock_service.bulk_adjust_stock([
+                {'stock_id': self.stock.pk, 'adjustment': 3},
+                {'stock_id': self.stock.pk, 'adjustment': -50},
+            ])
+
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class MediaServeTests(SimpleTestCase):
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        for name in ('foto.jpg', 'foto.0123456789abcdef.jpg'):
+            with open(os.path.join(self.root, name), 'wb') as handle:
+                handle.write(self.content)
+        self.factory = RequestFactory()
+
+    def get(self, path='foto.jpg', **headers):
+        return serve(self.factory.get(f'/media/{path}', headers=headers), path, self.root)
+
+    def test_full_response_with_validators(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('must-revalidate', response['Cache-Control'])
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_hashed_names_are_immutable(self):
+        self.assertEqual(self.get('foto.0123456789abcdef.jpg')['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.get()['ETag']
+
+        response = self.get(if_none_match=f'"otro", {etag}')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.get()['Last-Modified']
+
+        self.assertEqual(self.get(if_modified_since=last_modified).status_code, 304)
+
+    def test_range_returns_206(self):
+        response = self.get(range='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+    def test_suffix_range(self):
+        response = self.get(range='bytes=-5')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+    def test_unsatisfiable_range_returns_416(self):
+        response = self.get(range=f'bytes={len(self.content)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_stale_if_range_serves_the_whole_file(self):
+        response = self.get(range='bytes=0-9', if_range='"viejo"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='x-accel-redirect', MEDIA_SENDFILE_PREFIX='/_protected')
+    def test_x_accel_redirect_delegates_to_the_proxy(self):
+        response = self.get(range='bytes=0-9')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/_protected/media/foto.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('ETag', response)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='x-sendfile')
+    def test_x_sendfile_uses_the_absolute_path(self):
+        response = self.get()
+
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.root, 'foto.jpg'))
+
+    def test_path_traversal_and_directories_are_404(self):
+        for path in ('../foto.jpg', ''):
+            with self.assertRaises(Http404):
+                self.get(path)
+
+
+class MediaBlobTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def age_blobs(self, days=2):
+        MediaBlob.objects.update(last_used_at=timezone.now() - datetime.timedelta(days=days))
+
+    def cutoff(self):
+        return timezone.now() - datetime.timedelta(days=1)
+
+    def test_same_content_is_stored_once(self):
+        first = default_storage.save('a.png', ContentFile(b'contenido'))
+        second = default_storage.save('b.png', ContentFile(b'contenido'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(MediaBlob.objects.count(), 1)
+        self.assertEqual(MediaBlob.objects.get().size, len(b'contenido'))
+
+    def test_reuse_refreshes_last_used_at(self):
+        default_storage.save('a.png', ContentFile(b'contenido'))
+        self.age_blobs()
+
+        default_storage.save('b.png', ContentFile(b'contenido'))
+
+        self.assertGreater(MediaBlob.objects.get().last_used_at, self.cutoff())
+
+    def test_references_come_from_categories_and_products(self):
+        shared = default_storage.save('a.png', ContentFile(b'compartido'))
+        only_product = default_storage.save('b.png', ContentFile(b'producto'))
+        orphan = default_storage.save('c.png', ContentFile(b'huerfano'))
+        Category.objects.create(name='Categoria', image=shared)
+        Product.objects.create(
+            code='P1', slug='p1', name='Producto 1', unit_price=10,
+            image_list=[default_storage.url(shared), default_storage.url(only_product), 'https://cdn.test/x.png']
+        )
+
+        recount_blobs(count_references())
+
+        self.assertEqual(
+            dict(MediaBlob.objects.values_list('name', 'ref_count')), {shared: 2, only_product: 1, orphan: 0}
+        )
+
+    def test_sweep_deletes_only_unreferenced_blobs(self):
+        orphan = default_storage.save('a.png', ContentFile(b'huerfano'))
+        used = default_storage.save('b.png', ContentFile(b'usado'))
+        Category.objects.create(name='Categoria', image=used)
+        # ref_count sin recalcular: el barrido vuelve a comprobar las referencias
+        self.age_blobs()
+
+        blobs, size = sweep_blobs(self.cutoff())
+
+        self.assertEqual((blobs, size), (1, len(b'huerfano')))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(used))
+        self.assertEqual(list(MediaBlob.objects.values_list('name', flat=True)), [used])
+
+    def test_sweep_deletes_the_variants(self):
+        orphan = default_storage.save('a.png', ContentFile(b'huerfano'))
+        stem, _ = os.path.splitext(orphan)
+        variant = os.path.join(self.media_root, 'variants', f'{stem}-320.0123456789abcdef.webp')
+        os.makedirs(os.path.dirname(variant))
+        open(variant, 'wb').close()
+        self.age_blobs()
+
+        sweep_blobs(self.cutoff())
+
+        self.assertFalse(os.path.exists(variant))
+
+    def test_sweep_keeps_recently_used_blobs(self):
+        name = default_storage.save('a.png', ContentFile(b'reciente'))
+
+        blobs, _ = sweep_blobs(self.cutoff())
+
+        self.assertEqual(blobs, 0)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_dry_run_deletes_nothing(self):
+        name = default_storage.save('a.png', ContentFile(b'huerfano'))
+        self.age_blobs()
+
+        self.assertEqual(sweep_blobs(self.cutoff(), dry_run=True), (1, len(b'huerfano')))
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(MediaBlob.objects.exists())
+
+    def test_adopt_deduplicates_legacy_files(self):
+        os.makedirs(os.path.join(self.media_root, 'categories'))
+        for name in ('categories/foto.jpg', 'categories/foto_v2.jpg'):
+            with open(os.path.join(self.media_root, name), 'wb') as legacy:
+                legacy.write(b'misma foto')
+        first = Category.objects.create(name='Primera', image='categories/foto.jpg')
+        second = Category.objects.create(name='Segunda', image='categories/foto_v2.jpg')
+
+        self.assertEqual(adopt_legacy_files(), (2, 1))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(MediaBlob.objects.get().name, first.image.name)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'categories/foto.jpg')))
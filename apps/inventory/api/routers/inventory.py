@@ -3,12 +3,16 @@ from rest_framework.routers import DefaultRouter
 from apps.inventory.api.views.warehouse_view import WarehouseViewSet
 from apps.inventory.api.views.store_view import StoreViewSet
 from apps.inventory.api.views.stock_view import StockViewSet
-from apps.inventory.api.views.general_view import StoreListAPIView, WarehouseListAPIView, StockListAPIView, WarehouseAndProductsListAPIView
+from apps.inventory.api.views.reservation_view import StockReservationViewSet
+from apps.inventory.api.views.import_view import StockImportAPIView
+from apps.inventory.api.views.availability_view import ProductAvailabilityAPIView
+from apps.inventory.api.views.general_view import StoreListAPIView, WarehouseListAPIView, StockListAPIView, WarehouseAndProductsListAPIView, StockMovementExportAPIView
 
 router = DefaultRouter()
 router.register(r'stores', StoreViewSet, basename='stores')
 router.register(r'warehouses', WarehouseViewSet, basename='warehouses')
 router.register(r'stocks', StockViewSet, basename='stocks')
+router.register(r'reservations', StockReservationViewSet, basename='reservations')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -16,4 +20,7 @@ urlpatterns = [
     path('warehouses-filter/', WarehouseListAPIView.as_view(), name="warehouse-list-filter"),
     path('warehouses-and-products-filter/', WarehouseAndProductsListAPIView.as_view(), name="warehouse-and-products-list-filter"),
     path('stocks-filter/', StockListAPIView.as_view(), name="stock-list-filter"),
+    path('movements-export/', StockMovementExportAPIView.as_view(), name="movement-export"),
+    path('import/', StockImportAPIView.as_view(), name="stock-import"),
+    path('availability/', ProductAvailabilityAPIView.as_view(), name="product-availability"),
 ]
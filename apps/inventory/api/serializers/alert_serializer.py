@@ -0,0 +1,12 @@
+from rest_framework import serializers
+from apps.inventory.models import StockAlert
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+
+    class Meta:
+        model = StockAlert
+        fields = [
+            'id', 'kind', 'kind_display', 'stock', 'stock_code', 'product_id',
+            'warehouse_id', 'prev_cant', 'new_cant', 'threshold', 'created_at'
+        ]
@@ -0,0 +1,8 @@
+from rest_framework import serializers
+
+class AvailabilityRequestSerializer(serializers.Serializer):
+    products = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
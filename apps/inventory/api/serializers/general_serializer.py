@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from apps.inventory.models import Store, Warehouse, Stock
+from apps.inventory.models import Store, Warehouse
 from apps.products.models import Product
 
 
@@ -18,16 +18,3 @@ class WarehouseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Warehouse
         fields = ['id', 'name']
-
-
-class StockSerializer(serializers.ModelSerializer):
-    product_name = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Stock
-        fields = ['id', 'code', 'product','product_name']
-        
-    def get_product_name(self, obj):
-        if obj.product:
-            return obj.product.name
-        return ""
\ No newline at end of file
@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from apps.inventory.models import StockReservation
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = StockReservation
+        fields = [
+            'id', 'stock', 'quantity', 'status', 'status_display', 'expires_at',
+            'reference', 'create_by_user_id', 'created_at', 'updated_at'
+        ]
+
+
+class StockReservationCreateSerializer(serializers.Serializer):
+    stock = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    ttl_seconds = serializers.IntegerField(min_value=1, max_value=7 * 24 * 3600, required=False)
+    reference = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+
+
+class StockReservationConfirmSerializer(serializers.Serializer):
+    motive = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from apps.inventory.models import Stock
 
@@ -10,7 +14,97 @@ class StockSerializer(serializers.ModelSerializer):
     class Meta:
         model = Stock
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
+        read_only_fields = ('reserved', 'created_at', 'updated_at')
+
+    def validate_cant(self, value):
+        if self.instance is not None and value < self.instance.reserved:
+            raise serializers.ValidationError(
+                f"La cantidad no puede ser menor que la reservada ({self.instance.reserved})."
+            )
+        return value
+
+    def update(self, instance, validated_data):
+        # reserved lo mantienen las reservas con UPDATE condicionales: no se reescribe
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+# Campo de salida -> lookup de values(); mismas claves que StockSerializer
+STOCK_LIST_FIELDS = {
+    'id': 'id',
+    'product_name': 'product__name',
+    'product_code': 'product__code',
+    'warehouse_name': 'warehouse__name',
+    'store_name': 'warehouse__store__name',
+    'code': 'code',
+    'cant': 'cant',
+    'reserved': 'reserved',
+    'unit_price': 'unit_price',
+    'is_active': 'is_active',
+    'expire_date': 'expire_date',
+    'threshold': 'threshold',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'product': 'product',
+    'warehouse': 'warehouse',
+}
+
+
+def requested_fields(request):
+    """Campos pedidos con ?fields=a,b,c (solo los válidos), o todos"""
+    fields = request.query_params.get('fields') if request is not None else None
+    if not fields:
+        return list(STOCK_LIST_FIELDS)
+    fields = [field.strip() for field in fields.split(',') if field.strip() in STOCK_LIST_FIELDS]
+    return fields or list(STOCK_LIST_FIELDS)
+
+
+def format_datetime(value):
+    """Mismo formato que DateTimeField de DRF por defecto (ISO 8601, 'Z' en UTC)"""
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def stock_list_values(queryset, fields):
+    """Proyecta el queryset a values() con solo las columnas de `fields`"""
+    plain = [field for field in fields if STOCK_LIST_FIELDS[field] == field]
+    joined = {field: F(STOCK_LIST_FIELDS[field]) for field in fields if STOCK_LIST_FIELDS[field] != field}
+    return queryset.values(*plain, **joined)
+
+
+class StockListSerializer(serializers.BaseSerializer):
+    """
+    Representación de solo lectura para listados. Recibe filas de
+    stock_list_values() en vez de instancias y construye el dict
+    directamente, sin el coste por campo de ModelSerializer.
+    """
+
+    @cached_property
+    def output_fields(self):
+        # Con many=True hay un único hijo: los campos se resuelven una vez por respuesta
+        return requested_fields(self.context.get('request'))
+
+    def to_representation(self, row):
+        data = {}
+        for field in self.output_fields:
+            value = row[field]
+            if value is None:
+                data[field] = None
+            elif field in ('created_at', 'updated_at'):
+                data[field] = format_datetime(value)
+            elif field == 'expire_date':
+                data[field] = value.isoformat()
+            elif field == 'unit_price':
+                data[field] = str(value)
+            else:
+                data[field] = value
+        return data
+
 
 class StockCreateSerializer(serializers.ModelSerializer):
     
@@ -40,6 +134,39 @@ class StockDetailSerializer(StockSerializer):
     class Meta(StockSerializer.Meta):
         fields = [  # Lista explícita de campos
             'id', 'product', 'product_name', 'product_code', 'warehouse', 
-            'warehouse_name', 'store_name', 'cant', 'unit_price', 'is_active', 
+            'warehouse_name', 'store_name', 'cant', 'reserved', 'unit_price', 'is_active',
             'created_at', 'updated_at', 'product_details'
         ]
+
+
+class StockAdjustSerializer(serializers.Serializer):
+    adjustment = serializers.IntegerField()
+    motive = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class StockAdjustLineSerializer(StockAdjustSerializer):
+    stock_id = serializers.IntegerField()
+
+
+class StockBulkAdjustSerializer(serializers.Serializer):
+    items = StockAdjustLineSerializer(many=True, allow_empty=False, max_length=10000)
+
+
+class StockTransferSerializer(serializers.Serializer):
+    stock_from = serializers.IntegerField()
+    stock_to = serializers.IntegerField(required=False, allow_null=True)
+    warehouse_to = serializers.IntegerField(required=False, allow_null=True)
+    cant = serializers.IntegerField(min_value=1)
+    code = serializers.CharField(required=False, allow_blank=True, max_length=100)
+    motive = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, data):
+        if bool(data.get('stock_to')) == bool(data.get('warehouse_to')):
+            raise serializers.ValidationError(
+                "Debe indicar el stock destino (stock_to) o el almacén destino (warehouse_to)."
+            )
+        return data
+
+
+class StockBulkTransferSerializer(serializers.Serializer):
+    items = StockTransferSerializer(many=True, allow_empty=False, max_length=1000)
@@ -0,0 +1,26 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.inventory.api.serializers.availability_serializer import AvailabilityRequestSerializer
+from apps.inventory.services.summary_service import get_availability
+
+
+class ProductAvailabilityAPIView(APIView):
+    """
+    Disponibilidad total y por almacén de hasta 1.000 productos:
+    GET ?products=1,2,3 o POST {"products": [1, 2, 3]}
+    """
+
+    def get(self, request):
+        products = [value for value in request.query_params.get('products', '').split(',') if value]
+        return self.availability({'products': products})
+
+    def post(self, request):
+        return self.availability(request.data)
+
+    def availability(self, data):
+        serializer = AvailabilityRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        product_ids = list(dict.fromkeys(serializer.validated_data['products']))
+        return Response(get_availability(product_ids))
@@ -1,8 +1,29 @@
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from apps.inventory.models import Store, Warehouse, Stock
-from apps.inventory.api.serializers.general_serializer import StoreSerializer, WarehouseSerializer, StockSerializer, ProductSerializer
+from apps.inventory.models import Store, Warehouse, Stock, StockMovement
+from apps.inventory.api.serializers.general_serializer import StoreSerializer, WarehouseSerializer, ProductSerializer
+from apps.inventory.api.views.stock_view import STOCK_EXPORT_FIELDS
 from apps.products.models import Product
+from utils.export.export import stream_export, EXPORT_FORMATS
+
+MOVEMENT_EXPORT_FIELDS = [
+    (field.name, field.attname) for field in StockMovement._meta.concrete_fields
+]
+
+STOCK_SELECTOR_FIELDS = [
+    ('id', 'id'), ('code', 'code'), ('product', 'product'), ('product_name', 'product_name'),
+]
+
+
+def invalid_output_response():
+    return Response(
+        {'error': f"output debe ser uno de: {', '.join(EXPORT_FORMATS)}"},
+        status=status.HTTP_400_BAD_REQUEST
+    )
 
 
 class WarehouseAndProductsListAPIView(APIView):
@@ -29,7 +50,54 @@ class WarehouseListAPIView(APIView):
 
 
 class StockListAPIView(APIView):
+    """
+    Listado simple (id, code, product, product_name) para selectores.
+    Con ?output=ndjson|csv|json devuelve la exportación completa en streaming.
+    """
     def get(self, request):
-        stocks = Stock.objects.all()
-        serializer = StockSerializer(stocks, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        output = request.query_params.get('output')
+        if output:
+            if output not in EXPORT_FORMATS:
+                return invalid_output_response()
+            return stream_export(Stock.objects.order_by('pk'), STOCK_EXPORT_FIELDS, output, filename='stocks')
+
+        # Sin ?output= la lista se emite como array JSON en streaming: la
+        # respuesta no cambia de forma y la memoria no crece con la tabla
+        stocks = Stock.objects.annotate(product_name=Coalesce('product__name', Value(''))).order_by('pk')
+        return stream_export(stocks, STOCK_SELECTOR_FIELDS, 'json', filename=None)
+
+
+class StockMovementExportAPIView(APIView):
+    """
+    Exportación en streaming de los movimientos: ?output=ndjson|csv|json
+    Filtros opcionales: ?stock=<id> (origen o destino), ?from=YYYY-MM-DD, ?to=YYYY-MM-DD
+    """
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return invalid_output_response()
+
+        movements = StockMovement.objects.order_by('pk')
+        stock = request.query_params.get('stock')
+        if stock:
+            movements = movements.filter(Q(stock_from_id=stock) | Q(stock_to_id=stock))
+        dates = {}
+        for param in ('from', 'to'):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                dates[param] = parse_date(value)
+            except ValueError:
+                dates[param] = None
+            if dates[param] is None:
+                return Response(
+                    {'error': f'{param} debe ser una fecha válida (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        date_from, date_to = dates.get('from'), dates.get('to')
+        if date_from:
+            movements = movements.filter(created_at__date__gte=date_from)
+        if date_to:
+            movements = movements.filter(created_at__date__lte=date_to)
+        return stream_export(movements, MOVEMENT_EXPORT_FIELDS, output, filename='movements')
\ No newline at end of file
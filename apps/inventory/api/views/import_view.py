@@ -0,0 +1,43 @@
+import io
+
+from rest_framework import status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.inventory.services.import_service import import_csv
+from utils.permission.admin import IsAdminGroup
+
+
+class StockImportAPIView(APIView):
+    """
+    Importación masiva de productos y stocks desde un CSV (campo `file`).
+    Devuelve el resumen con los errores por fila.
+    """
+    permission_classes = [IsAuthenticated, IsAdminGroup]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Debe adjuntar un archivo CSV en el campo file'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            report = import_csv(stream, user=request.user)
+            return Response(report.as_dict())
+        except UnicodeDecodeError:
+            return Response(
+                {'error': 'El archivo debe estar codificado en UTF-8'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {
+                    'error': 'Error al importar el archivo',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
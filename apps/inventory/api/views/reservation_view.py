@@ -0,0 +1,114 @@
+from rest_framework import viewsets, mixins, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from apps.inventory.models import StockReservation
+from apps.inventory.services import reservation_service
+from apps.inventory.services.stock_service import StockNotFound, StockServiceError
+from apps.inventory.api.serializers.reservation_serializer import (
+    StockReservationSerializer, StockReservationCreateSerializer, StockReservationConfirmSerializer
+)
+from utils.pagination.pagination import Pagination
+from utils.idempotency.idempotency import idempotent
+
+
+class StockReservationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Reservas temporales de stock. Crear una reserva ocupa cantidad sin
+    descontarla; confirm la convierte en salida y release la libera. Las
+    reservas vencidas las libera el comando expire_stock_reservations.
+    """
+    queryset = StockReservation.objects.all()
+    serializer_class = StockReservationSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['stock', 'status', 'reference']
+    ordering_fields = ['created_at', 'expires_at']
+    ordering = ['-created_at']
+    pagination_class = Pagination
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return StockReservationCreateSerializer
+        elif self.action == 'confirm':
+            return StockReservationConfirmSerializer
+        return StockReservationSerializer
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        try:
+            reservation = reservation_service.reserve_stock(
+                data['stock'], data['quantity'], user=request.user,
+                ttl_seconds=data.get('ttl_seconds'), reference=data.get('reference') or None,
+            )
+            return Response(StockReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+
+        except StockNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except StockServiceError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {
+                    'error': 'Error al crear la reserva',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def confirm(self, request, pk=None):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            reservation, movement = reservation_service.confirm_reservation(
+                pk, user=request.user, motive=serializer.validated_data.get('motive') or None
+            )
+            return Response({
+                'message': 'Reserva confirmada correctamente',
+                'reservation': StockReservationSerializer(reservation).data,
+                'movement_id': movement.pk
+            })
+
+        except reservation_service.ReservationNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except reservation_service.ReservationClosed as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response(
+                {
+                    'error': 'Error al confirmar la reserva',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def release(self, request, pk=None):
+        try:
+            reservation = reservation_service.release_reservation(pk)
+            return Response({
+                'message': 'Reserva liberada correctamente',
+                'reservation': StockReservationSerializer(reservation).data
+            })
+
+        except reservation_service.ReservationNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except reservation_service.ReservationClosed as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response(
+                {
+                    'error': 'Error al liberar la reserva',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
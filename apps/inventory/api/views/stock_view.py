@@ -1,19 +1,54 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, F, Value, Q
-from django.db.models.functions import Coalesce
-from django.db.models import Count
+import datetime
+from django.db import transaction
+from django.db.models import Sum, F, Count, DecimalField
+from django.utils import timezone
 from rest_framework.response import Response
-from apps.inventory.models import Stock
-from apps.inventory.api.serializers.stock_serializer import StockSerializer, StockCreateSerializer, StockDetailSerializer
+from apps.inventory.models import Stock, StockAlert
+from apps.inventory.services import stock_service
+from apps.inventory.services.summary_service import SummaryTracker, stock_state, get_summary
+from apps.inventory.services.alert_service import LOW_STOCK, crossing_alert
+from apps.inventory.api.serializers.alert_serializer import StockAlertSerializer
+from apps.inventory.api.serializers.stock_serializer import (
+    StockSerializer, StockCreateSerializer, StockDetailSerializer, StockListSerializer,
+    StockAdjustSerializer, StockBulkAdjustSerializer, StockBulkTransferSerializer, stock_list_values, requested_fields
+)
 from utils.pagination.pagination import Pagination
+from utils.search.search import RankedSearchFilter
+from utils.idempotency.idempotency import idempotent
+from utils.export.export import stream_export, EXPORT_FORMATS
+
+STOCK_EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('code', 'code'),
+    ('product', 'product_id'),
+    ('product_code', 'product__code'),
+    ('product_name', 'product__name'),
+    ('warehouse', 'warehouse_id'),
+    ('warehouse_name', 'warehouse__name'),
+    ('store_name', 'warehouse__store__name'),
+    ('cant', 'cant'),
+    ('reserved', 'reserved'),
+    ('unit_price', 'unit_price'),
+    ('is_active', 'is_active'),
+    ('expire_date', 'expire_date'),
+    ('threshold', 'threshold'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
 
 class StockViewSet(viewsets.ModelViewSet):
     queryset = Stock.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # adjust_stock pasa el pk al servicio sin get_object()
+    lookup_value_regex = r'\d+'
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['warehouse', 'product', 'is_active']
     search_fields = ['code', 'product__name', 'product__code']
+    search_prefix_fields = ['code', 'product__code']
+    search_text_fields = ['product__name']
     ordering_fields = ['cant', 'unit_price', 'created_at']
     ordering = ['-created_at']
     pagination_class = Pagination
@@ -21,15 +56,27 @@ class StockViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return StockCreateSerializer
+        elif self.action == 'adjust_stock':
+            return StockAdjustSerializer
+        elif self.action == 'bulk_adjust':
+            return StockBulkAdjustSerializer
+        elif self.action == 'transfer':
+            return StockBulkTransferSerializer
         elif self.action == 'retrieve':
             return StockDetailSerializer
+        elif self.action == 'list':
+            return StockListSerializer
         return StockSerializer
 
     def get_queryset(self):
+        if self.action == 'list':
+            # Solo las columnas que se van a devolver (?fields= las recorta más)
+            return stock_list_values(Stock.objects.all(), requested_fields(self.request))
         return Stock.objects.select_related(
             'product', 'warehouse', 'warehouse__store'
         ).all()
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
@@ -42,17 +89,77 @@ class StockViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            stock = serializer.save()
+            tracker = SummaryTracker()
+            tracker.track(None, stock_state(stock))
+            tracker.flush()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # Se relee la fila bloqueada: reserved puede haber cambiado desde get_object()
+            locked = Stock.objects.select_for_update(of=('self',)).select_related('warehouse').get(
+                pk=serializer.instance.pk
+            )
+            cant = serializer.validated_data.get('cant', locked.cant)
+            if cant < locked.reserved:
+                raise ValidationError({
+                    'cant': [f"La cantidad no puede ser menor que la reservada ({locked.reserved})."]
+                })
+            serializer.instance = locked
+            old = stock_state(locked)
+            old_threshold = locked.threshold
+            stock = serializer.save()
+            alert = crossing_alert(stock, old.cant, stock.cant, prev_threshold=old_threshold)
+            if alert is not None:
+                alert.save()
+            tracker = SummaryTracker()
+            tracker.track(old, stock_state(stock))
+            tracker.flush()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            old = stock_state(instance)
+            instance.delete()
+            tracker = SummaryTracker()
+            tracker.track(old, None)
+            tracker.flush()
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exportación completa sin paginar: ?output=ndjson|csv|json. Respeta los
+        mismos filtros, búsqueda y orden que el listado.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"output debe ser uno de: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(Stock.objects.all())
+        return stream_export(queryset, STOCK_EXPORT_FIELDS, output, filename='stocks')
 
     @action(detail=False, methods=['get'])
     def inventory_summary(self, request):
+        """
+        Resumen del inventario activo leído de la tabla inventory_summary.
+        Acepta ?warehouse=<id> o ?store=<id> para el resumen de un ámbito.
+        """
+        scope, scope_id = 'global', 0
+        for param in ('warehouse', 'store'):
+            if request.query_params.get(param):
+                try:
+                    scope, scope_id = param, int(request.query_params[param])
+                except ValueError:
+                    return Response(
+                        {'error': f'{param} debe ser un número entero'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                break
         try:
-            summary = Stock.objects.filter(is_active=True).aggregate(
-                total_products=Count('product', distinct=True),
-                total_warehouses=Count('warehouse', distinct=True),
-                total_quantity=Coalesce(Sum('cant'), Value(0)),
-                total_value=Coalesce(Sum(F('cant') * F('unit_price')), Value(0))
-            )
-            return Response(summary)
+            return Response(get_summary(scope, scope_id))
         except Exception as e:
             return Response(
                 {
@@ -62,12 +169,127 @@ class StockViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
             
+    @action(detail=False, methods=['get'])
+    def low_stock(self, request):
+        """
+        Stocks activos con cant <= threshold. Resuelto por el índice parcial
+        stock_low_stock_idx; admite los mismos filtros que el listado.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(LOW_STOCK)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def expiring(self, request):
+        """
+        Stocks activos que caducan en los próximos ?days=N días (30 por
+        defecto), ordenados por caducidad y agrupados por almacén con
+        conteo, cantidad y valor. ?include_expired=true incluye los ya caducados.
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response(
+                {'error': 'days debe ser un número entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        today = timezone.localdate()
+        until = today + datetime.timedelta(days=max(days, 0))
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            is_active=True, expire_date__lte=until
+        )
+        if request.query_params.get('include_expired') != 'true':
+            queryset = queryset.filter(expire_date__gte=today)
+        queryset = queryset.order_by('expire_date', 'pk')
+
+        warehouses = queryset.values('warehouse', 'warehouse__name').annotate(
+            total_stocks=Count('id'),
+            total_quantity=Sum('cant'),
+            total_value=Sum(F('cant') * F('unit_price'), output_field=DecimalField()),
+        ).order_by('warehouse__name')
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response({'results': self.get_serializer(queryset, many=True).data})
+        response.data['until'] = until
+        response.data['warehouses'] = [
+            {
+                'warehouse': row['warehouse'],
+                'warehouse_name': row['warehouse__name'],
+                'total_stocks': row['total_stocks'],
+                'total_quantity': row['total_quantity'],
+                'total_value': row['total_value'],
+            }
+            for row in warehouses
+        ]
+        return response
+
+    @action(detail=False, methods=['get'])
+    def fefo(self, request):
+        """
+        Picking FEFO: ?product=<id>&quantity=<n>[&warehouse=<id>] devuelve de
+        qué stocks tomar la cantidad, primero los de caducidad más próxima.
+        """
+        try:
+            product_id = int(request.query_params['product'])
+            quantity = int(request.query_params['quantity'])
+            warehouse_id = request.query_params.get('warehouse')
+            warehouse_id = int(warehouse_id) if warehouse_id else None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'product y quantity son obligatorios y deben ser números enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if quantity < 1:
+            return Response(
+                {'error': 'La cantidad debe ser mayor que cero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(stock_service.fefo_allocation(product_id, quantity, warehouse_id))
+
+    @action(detail=False, methods=['get'])
+    def low_stock_events(self, request):
+        """
+        Feed incremental de cruces de umbral: ?after=<último id recibido>&limit=
+        Opcionalmente ?warehouse=<id>.
+        """
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(int(request.query_params.get('limit', 100)), 1000)
+        except ValueError:
+            return Response(
+                {'error': 'after y limit deben ser números enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        events = StockAlert.objects.filter(pk__gt=after).order_by('pk')
+        if request.query_params.get('warehouse'):
+            events = events.filter(warehouse_id=request.query_params['warehouse'])
+        events = list(events[:limit])
+        return Response({
+            'results': StockAlertSerializer(events, many=True).data,
+            'last_id': events[-1].pk if events else after
+        })
+
     @action(detail=True, methods=['post'])
+    @idempotent
     def change_status(self, request, pk=None):
         try:
-            stock = Stock.objects.get(pk=pk)
-            stock.is_active = not stock.is_active
-            stock.save()
+            with transaction.atomic():
+                stock = Stock.objects.select_for_update(of=('self',)).select_related('warehouse').get(pk=pk)
+                old = stock_state(stock)
+                stock.is_active = not stock.is_active
+                stock.save()
+                tracker = SummaryTracker()
+                tracker.track(old, stock_state(stock))
+                tracker.flush()
             serializer = StockSerializer(stock)
 
             return Response({
@@ -90,31 +312,58 @@ class StockViewSet(viewsets.ModelViewSet):
         
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def adjust_stock(self, request, pk=None):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            stock = self.get_object()
-            adjustment = request.data.get('adjustment', 0)
-            
-            adjustment = int(adjustment)
-            new_quantity = stock.cant + adjustment
-            
-            if new_quantity < 0:
-                return Response(
-                    {'error': 'La cantidad no puede ser negativa'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            stock.cant = new_quantity
-            stock.save()
-            
+            stock, movement = stock_service.adjust_stock(
+                int(pk), serializer.validated_data['adjustment'], user=request.user,
+                motive=serializer.validated_data.get('motive')
+            )
             return Response({
                 'message': 'Stock ajustado correctamente',
-                'new_quantity': stock.cant
+                'new_quantity': stock.cant,
+                'movement_id': movement.pk if movement is not None else None
             })
-            
-        except ValueError:
+
+        except stock_service.StockNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except stock_service.StockServiceError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
             return Response(
-                {'error': 'El ajuste debe ser un número entero'},
+                {
+                    'error': 'Error al ajustar el stock',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def bulk_adjust(self, request):
+        data = request.data
+        if isinstance(data, list):
+            data = {'items': data}
+        serializer = self.get_serializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = stock_service.bulk_adjust_stock(
+                serializer.validated_data['items'], user=request.user
+            )
+            return Response({
+                'message': 'Stock ajustado correctamente',
+                'results': results
+            })
+
+        except stock_service.BulkAdjustmentError as e:
+            return Response(
+                {'error': str(e), 'results': e.results},
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
@@ -125,4 +374,42 @@ class StockViewSet(viewsets.ModelViewSet):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-            
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def transfer(self, request):
+        """
+        Transferencia entre stocks. Acepta una transferencia o un lote:
+        {stock_from, cant, stock_to | warehouse_to} o {"items": [...]}
+        """
+        data = request.data
+        if isinstance(data, list):
+            data = {'items': data}
+        elif 'items' not in data:
+            data = {'items': [data]}
+        serializer = self.get_serializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = stock_service.transfer_stock(
+                serializer.validated_data['items'], user=request.user
+            )
+            return Response({
+                'message': 'Stock transferido correctamente',
+                'results': results
+            })
+
+        except stock_service.TransferError as e:
+            return Response(
+                {'error': str(e), 'results': e.results},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {
+                    'error': 'Error al transferir el stock',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -1,7 +1,12 @@
+from django.db import transaction
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from apps.inventory.models import Warehouse
+from apps.inventory.models import Warehouse, Stock
 from apps.inventory.api.serializers.warehouse_serializer import WarehouseSerializer
+from apps.inventory.api.serializers.stock_serializer import StockSerializer
+from apps.inventory.services.alert_service import LOW_STOCK
 from utils.pagination.pagination import Pagination 
 
 class WarehouseViewSet(viewsets.ModelViewSet):
@@ -14,4 +19,23 @@ class WarehouseViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = Warehouse.objects.select_related('store')
-        return queryset
\ No newline at end of file
+        return queryset
+
+    def perform_update(self, serializer):
+        # Cambiar de tienda corrige el resumen (apps.inventory.signals) en la
+        # misma transacción que el guardado
+        with transaction.atomic():
+            serializer.save()
+
+    @action(detail=True, methods=['get'])
+    def low_stock(self, request, pk=None):
+        warehouse = self.get_object()
+        queryset = Stock.objects.select_related(
+            'product', 'warehouse', 'warehouse__store'
+        ).filter(LOW_STOCK, warehouse=warehouse).order_by('cant', 'pk')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = StockSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = StockSerializer(queryset, many=True)
+        return Response(serializer.data)
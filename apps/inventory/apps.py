@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.inventory'
+
+    def ready(self):
+        from apps.inventory.signals import connect_summary_tracking
+        connect_summary_tracking()
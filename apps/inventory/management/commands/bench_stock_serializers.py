@@ -0,0 +1,67 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.inventory.models import Store, Warehouse, Stock
+from apps.inventory.api.serializers.stock_serializer import (
+    StockSerializer, StockListSerializer, STOCK_LIST_FIELDS, stock_list_values
+)
+from apps.products.models import Product
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el tiempo de serialización del listado de stocks (consulta + "
+        "serialización) por cada 1.000 filas: StockSerializer con select_related "
+        "frente a StockListSerializer sobre values(). Los datos se crean dentro "
+        "de una transacción que se deshace al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        suffix = uuid.uuid4().hex[:8]
+        store = Store.objects.create(name=f'bench-{suffix}', address='bench')
+        warehouse = Warehouse.objects.create(store=store, name=f'bench-{suffix}', address='bench')
+        product = Product.objects.create(
+            code=f'bench-{suffix}', slug=f'bench-{suffix}', name='bench',
+            long_description='x' * 2000
+        )
+        Stock.objects.bulk_create([
+            Stock(code=f'bench-{suffix}-{i}', product=product, warehouse=warehouse, cant=i, unit_price=1)
+            for i in range(rows)
+        ], batch_size=1000)
+        base = Stock.objects.filter(warehouse=warehouse).order_by('-created_at', 'pk')
+
+        def before():
+            queryset = base.select_related('product', 'warehouse', 'warehouse__store')
+            return StockSerializer(queryset, many=True).data
+
+        def after():
+            queryset = stock_list_values(base, list(STOCK_LIST_FIELDS))
+            return StockListSerializer(queryset, many=True).data
+
+        for label, function in (('StockSerializer', before), ('StockListSerializer', after)):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - started)
+            best = min(timings) * 1000 * 1000 / rows
+            self.stdout.write(f"{label:<22} {best:8.2f} ms / 1000 filas (mejor de {repeat})")
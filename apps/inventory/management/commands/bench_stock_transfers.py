@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.inventory.models import Store, Warehouse, Stock, StockMovement
+from apps.inventory.services import stock_service
+from apps.products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el throughput de transferencias concurrentes opuestas (A→B y B→A) "
+        "sobre el mismo par de stocks. Crea sus propios datos y los borra al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--transfers', type=int, default=200, help='Transferencias por worker')
+        parser.add_argument('--keep', action='store_true', help='No borrar los datos creados')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        store = Store.objects.create(name=f'bench-{suffix}', address='bench')
+        warehouse_a = Warehouse.objects.create(store=store, name=f'bench-a-{suffix}', address='bench')
+        warehouse_b = Warehouse.objects.create(store=store, name=f'bench-b-{suffix}', address='bench')
+        product = Product.objects.create(code=f'bench-{suffix}', slug=f'bench-{suffix}', name='bench')
+        initial = options['workers'] * options['transfers']
+        stock_a = Stock.objects.create(code=f'bench-a-{suffix}', product=product, warehouse=warehouse_a, cant=initial, unit_price=1)
+        stock_b = Stock.objects.create(code=f'bench-b-{suffix}', product=product, warehouse=warehouse_b, cant=initial, unit_price=1)
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(index):
+            source, destination = (stock_a.pk, stock_b.pk) if index % 2 == 0 else (stock_b.pk, stock_a.pk)
+            local = []
+            try:
+                for _ in range(options['transfers']):
+                    started = time.perf_counter()
+                    try:
+                        stock_service.transfer_stock(
+                            [{'stock_from': source, 'stock_to': destination, 'cant': 1}]
+                        )
+                    except Exception as e:
+                        with lock:
+                            errors.append(repr(e))
+                    local.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stock_a.refresh_from_db()
+        stock_b.refresh_from_db()
+        total = stock_a.cant + stock_b.cant
+        latencies.sort()
+        self.stdout.write(f"backend: {connection.vendor}")
+        self.stdout.write(f"workers: {options['workers']}  transfers: {len(latencies)}  errors: {len(errors)}")
+        self.stdout.write(f"elapsed: {elapsed:.2f}s  throughput: {(len(latencies) - len(errors)) / elapsed:.1f} transfers/s")
+        if latencies:
+            self.stdout.write(
+                f"latency p50: {statistics.median(latencies) * 1000:.1f}ms  "
+                f"p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms"
+            )
+        for error in sorted(set(errors))[:5]:
+            self.stdout.write(self.style.WARNING(error))
+        if total != initial * 2:
+            self.stdout.write(self.style.ERROR(f"Cantidad total inconsistente: {total} != {initial * 2}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Cantidad total consistente"))
+
+        if not options['keep']:
+            StockMovement.objects.filter(stock_from_id__in=[stock_a.pk, stock_b.pk]).delete()
+            Stock.objects.filter(pk__in=[stock_a.pk, stock_b.pk]).delete()
+            product.delete()
+            store.delete()
+            Warehouse.objects.filter(pk__in=[warehouse_a.pk, warehouse_b.pk]).delete()
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.services.reservation_service import expire_reservations
+from apps.inventory.services.stock_service import BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Marca como expiradas las reservas de stock vencidas y devuelve su cantidad al disponible. "
+        "Con --loop se queda ejecutando el barrido cada --interval segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Reservas por transacción')
+        parser.add_argument('--loop', action='store_true', help='Repetir el barrido indefinidamente')
+        parser.add_argument('--interval', type=int, default=30, help='Segundos entre barridos con --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_reservations(batch_size=options['batch_size'])
+            if expired or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Reservas expiradas: {expired}"))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.services.import_service import import_csv, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos y stocks desde un CSV (ver import_service.import_csv "
+        "para las columnas admitidas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_csv(stream, chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Filas: {report.rows}  productos: {report.products}  stocks: {report.stocks}  "
+            f"errores: {report.error_count}  tiempo: {elapsed:.1f}s"
+        )
+        for error in report.errors[:50]:
+            self.stdout.write(self.style.WARNING(f"línea {error['line']}: {error['error']}"))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.models import InventorySummary, ProductAvailability
+from apps.inventory.services.summary_service import compute_summaries, compute_availability, rebuild_summaries
+
+FIELDS = ('total_products', 'total_warehouses', 'total_quantity', 'total_value')
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye las tablas inventory_summary y product_availability a partir de la tabla stock. "
+        "Con --verify solo compara los totales guardados con el cálculo completo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Comparar sin escribir')
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            summaries = rebuild_summaries()
+            self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido: {len(summaries)} filas"))
+            return
+
+        expected = compute_summaries()
+        stored = {
+            (row['scope'], row['scope_id']): row
+            for row in InventorySummary.objects.values('scope', 'scope_id', *FIELDS)
+        }
+        empty = dict.fromkeys(FIELDS, 0)
+        mismatches = 0
+        for key in sorted(set(expected) | set(stored)):
+            want = expected.get(key, empty)
+            have = stored.get(key, empty)
+            diff = {field: (have[field], want[field]) for field in FIELDS if have[field] != want[field]}
+            if diff:
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(f"{key[0]} {key[1]}: {diff}"))
+
+        expected_availability = compute_availability()
+        stored_availability = {
+            (product_id, warehouse_id): (quantity, reserved)
+            for product_id, warehouse_id, quantity, reserved in ProductAvailability.objects.values_list(
+                'product_id', 'warehouse_id', 'quantity', 'reserved'
+            )
+        }
+        for key in sorted(set(expected_availability) | set(stored_availability)):
+            want = expected_availability.get(key, (0, 0))
+            have = stored_availability.get(key, (0, 0))
+            if have != want:
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(f"producto {key[0]} almacén {key[1]}: ({have}, {want})"))
+
+        if mismatches:
+            raise CommandError(f"{mismatches} filas del resumen no coinciden con la tabla stock")
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen correcto: {len(expected)} filas y {len(expected_availability)} disponibilidades verificadas"
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_alter_stock_unique_together_alter_stock_cant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='stock_from_wharehouse_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='stock_to_wharehouse_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_alter_stockmovement_wharehouse_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='action_operation',
+            field=models.CharField(choices=[('1', 'salida'), ('2', 'entrada'), ('3', 'transferencia')], default='2', max_length=1),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_alter_stockmovement_action_operation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('global', 'global'), ('store', 'store'), ('warehouse', 'warehouse')], max_length=10)),
+                ('scope_id', models.IntegerField(default=0)),
+                ('total_products', models.IntegerField(default=0)),
+                ('total_warehouses', models.IntegerField(default=0)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Inventory summary',
+                'verbose_name_plural': 'Inventory summaries',
+                'db_table': 'inventory_summary',
+                'unique_together': {('scope', 'scope_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_inventorysummary'),
+        ('products', '0006_remove_category_description_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('1', 'bajo umbral'), ('2', 'recuperado')], max_length=1)),
+                ('stock_code', models.CharField(max_length=100)),
+                ('product_id', models.IntegerField(blank=True, null=True)),
+                ('warehouse_id', models.IntegerField(blank=True, null=True)),
+                ('prev_cant', models.PositiveIntegerField()),
+                ('new_cant', models.PositiveIntegerField()),
+                ('threshold', models.SmallIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stock alert',
+                'verbose_name_plural': 'Stock alerts',
+                'db_table': 'stock_alert',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('cant__lte', models.F('threshold')), ('is_active', True)), fields=['warehouse', 'cant'], name='stock_low_stock_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='stock',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='inventory.stock'),
+        ),
+    ]
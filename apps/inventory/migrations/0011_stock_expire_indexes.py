@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_stock_low_stock_idx_stockalert'),
+        ('products', '0006_remove_category_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['is_active', 'expire_date'], name='stock_active_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'expire_date'], name='stock_fefo_idx'),
+        ),
+    ]
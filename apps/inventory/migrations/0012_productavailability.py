@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_stock_expire_indexes'),
+        ('products', '0006_remove_category_description_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='inventory.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Product availability',
+                'verbose_name_plural': 'Product availability',
+                'db_table': 'product_availability',
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:12
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_productavailability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productavailability',
+            name='reserved',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('status', models.CharField(choices=[('1', 'pendiente'), ('2', 'confirmada'), ('3', 'liberada'), ('4', 'expirada')], default='1', max_length=1)),
+                ('expires_at', models.DateTimeField()),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('create_by_user_id', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventory.stock')),
+            ],
+            options={
+                'verbose_name': 'Stock reservation',
+                'verbose_name_plural': 'Stock reservations',
+                'db_table': 'stock_reservation',
+                'indexes': [models.Index(condition=models.Q(('status', '1')), fields=['expires_at'], name='reservation_pending_idx')],
+            },
+        ),
+    ]
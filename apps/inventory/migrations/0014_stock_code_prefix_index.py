@@ -0,0 +1,37 @@
+from django.contrib.postgres.indexes import OpClass
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+
+# Búsqueda por prefijo de código (UPPER(code) LIKE 'ABC%'); solo PostgreSQL.
+def stock_search_indexes():
+    return [
+        models.Index(OpClass(Upper('code'), name='text_pattern_ops'), name='stock_code_prefix_idx'),
+    ]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Stock = apps.get_model('inventory', 'Stock')
+    for index in stock_search_indexes():
+        schema_editor.add_index(Stock, index)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Stock = apps.get_model('inventory', 'Stock')
+    for index in stock_search_indexes():
+        schema_editor.remove_index(Stock, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_stock_reserved_stockreservation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
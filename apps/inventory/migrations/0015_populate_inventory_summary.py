@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_summaries(apps, schema_editor):
+    """
+    Construye inventory_summary y product_availability desde la tabla stock
+    para que las lecturas no tengan que hacerlo. Desde aquí los mantiene
+    SummaryTracker; rebuild_inventory_summary los recalcula si hace falta.
+    """
+    Stock = apps.get_model('inventory', 'Stock')
+    InventorySummary = apps.get_model('inventory', 'InventorySummary')
+    ProductAvailability = apps.get_model('inventory', 'ProductAvailability')
+    if InventorySummary.objects.filter(scope='global', scope_id=0).exists():
+        return
+
+    aggregates = {
+        'total_products': Count('product', distinct=True),
+        'total_warehouses': Count('warehouse', distinct=True),
+        'total_quantity': Coalesce(Sum('cant'), Value(0)),
+        'total_value': Coalesce(
+            Sum(F('cant') * F('unit_price'), output_field=DecimalField()),
+            Value(Decimal('0')), output_field=DecimalField()
+        ),
+    }
+    active = Stock.objects.filter(is_active=True)
+    summaries = [InventorySummary(scope='global', scope_id=0, **active.aggregate(**aggregates))]
+    for scope, field in (('warehouse', 'warehouse'), ('store', 'warehouse__store')):
+        rows = active.filter(**{f'{field}__isnull': False}).values(field).annotate(**aggregates).order_by()
+        summaries.extend(InventorySummary(scope=scope, scope_id=row.pop(field), **row) for row in rows)
+    InventorySummary.objects.all().delete()
+    InventorySummary.objects.bulk_create(summaries)
+
+    rows = active.filter(product__isnull=False, warehouse__isnull=False).values('product', 'warehouse').annotate(
+        quantity=Sum('cant'), reserved=Sum('reserved')
+    ).order_by()
+    ProductAvailability.objects.all().delete()
+    ProductAvailability.objects.bulk_create([
+        ProductAvailability(
+            product_id=row['product'], warehouse_id=row['warehouse'],
+            quantity=row['quantity'], reserved=row['reserved'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_stock_code_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
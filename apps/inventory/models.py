@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q, F
 from apps.products.models import Product
 from apps.accounts.models import User
 from django.core.validators import MinValueValidator
@@ -38,6 +39,7 @@ class Stock(models.Model):
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='warehouse_stocks')
     warehouse = models.ForeignKey(Warehouse, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_stocks')
     cant = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0.01)])
     is_active = models.BooleanField(default=True)
     expire_date = models.DateField(null=True, blank=True)
@@ -48,16 +50,37 @@ class Stock(models.Model):
     def __str__(self):
         return f"{self.code} - {self.product.name}"
 
+    @property
+    def available(self):
+        """Cantidad disponible para la venta: cant menos las reservas vivas"""
+        return self.cant - self.reserved
+
     class Meta:
         db_table = 'stock'
         verbose_name = "Stock"
         verbose_name_plural = "Stocks"
+        indexes = [
+            # Índice parcial: solo contiene los stocks activos en o bajo el umbral
+            models.Index(
+                fields=['warehouse', 'cant'],
+                condition=Q(is_active=True, cant__lte=F('threshold')),
+                name='stock_low_stock_idx',
+            ),
+            models.Index(fields=['is_active', 'expire_date'], name='stock_active_expire_idx'),
+            # Picking FEFO: stocks activos de un producto por fecha de caducidad
+            models.Index(
+                fields=['product', 'expire_date'],
+                condition=Q(is_active=True),
+                name='stock_fefo_idx',
+            ),
+        ]
     
     
 class StockMovement(models.Model):
     ACTION_OPERATION_CHOICES  = (
         ('1', 'salida'),
         ('2', 'entrada'),   
+        ('3', 'transferencia'),
     )
     ACTION_TYPE_CHOICES  = (
         ('1', 'simple'),
@@ -76,7 +99,7 @@ class StockMovement(models.Model):
     stock_from_product_id = models.IntegerField(null=True, blank=True)
     stock_from_product_name = models.CharField(max_length=150, null=True, blank=True)
     stock_from_wharehouse_id = models.IntegerField(null=True, blank=True)
-    stock_from_wharehouse_name = models.IntegerField(null=True, blank=True)
+    stock_from_wharehouse_name = models.CharField(max_length=255, null=True, blank=True)
     stock_from_prev_cant = models.PositiveIntegerField(null=True, blank=True)
     stock_from_new_cant = models.PositiveIntegerField(null=True, blank=True)
     stock_to_id = models.IntegerField(null=True, blank=True)
@@ -84,7 +107,7 @@ class StockMovement(models.Model):
     stock_to_product_id = models.IntegerField(null=True, blank=True)
     stock_to_product_name = models.CharField(max_length=150, null=True, blank=True)
     stock_to_wharehouse_id = models.IntegerField(null=True, blank=True)
-    stock_to_wharehouse_name = models.IntegerField(null=True, blank=True)
+    stock_to_wharehouse_name = models.CharField(max_length=255, null=True, blank=True)
     stock_to_prev_cant = models.PositiveIntegerField(null=True, blank=True)
     stock_to_new_cant = models.PositiveIntegerField(null=True, blank=True)
     
@@ -94,4 +117,110 @@ class StockMovement(models.Model):
         verbose_name_plural = "Stocks Movements"
 
     def __str__(self):
-        return f'{self.pk}'
\ No newline at end of file
+        return f'{self.pk}'
+
+
+class InventorySummary(models.Model):
+    """
+    Totales de inventario (stock activo) mantenidos por las rutas de escritura.
+    Hay una fila global (scope_id=0) y una por almacén y por tienda.
+    """
+    SCOPE_CHOICES = (
+        ('global', 'global'),
+        ('store', 'store'),
+        ('warehouse', 'warehouse'),
+    )
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_id = models.IntegerField(default=0)
+    total_products = models.IntegerField(default=0)
+    total_warehouses = models.IntegerField(default=0)
+    total_quantity = models.BigIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'inventory_summary'
+        verbose_name = "Inventory summary"
+        verbose_name_plural = "Inventory summaries"
+        unique_together = ['scope', 'scope_id']
+
+    def __str__(self):
+        return f"{self.scope} {self.scope_id}"
+
+
+
+
+class ProductAvailability(models.Model):
+    """
+    Cantidad disponible (stock activo) de cada producto por almacén, mantenida
+    por las rutas de escritura junto con InventorySummary.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='availability')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='availability')
+    quantity = models.BigIntegerField(default=0)
+    reserved = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'product_availability'
+        verbose_name = "Product availability"
+        verbose_name_plural = "Product availability"
+        unique_together = ['product', 'warehouse']
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.warehouse_id}: {self.quantity}"
+
+class StockAlert(models.Model):
+    """Evento emitido cuando un stock cruza su umbral (threshold)"""
+    KIND_CHOICES = (
+        ('1', 'bajo umbral'),
+        ('2', 'recuperado'),
+    )
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='alerts')
+    stock_code = models.CharField(max_length=100)
+    product_id = models.IntegerField(null=True, blank=True)
+    warehouse_id = models.IntegerField(null=True, blank=True)
+    prev_cant = models.PositiveIntegerField()
+    new_cant = models.PositiveIntegerField()
+    threshold = models.SmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'stock_alert'
+        verbose_name = "Stock alert"
+        verbose_name_plural = "Stock alerts"
+
+    def __str__(self):
+        return f"{self.stock_code} {self.get_kind_display()}"
+
+
+
+class StockReservation(models.Model):
+    """Reserva temporal de una cantidad de un stock (carritos, pedidos pendientes)"""
+    STATUS_CHOICES = (
+        ('1', 'pendiente'),
+        ('2', 'confirmada'),
+        ('3', 'liberada'),
+        ('4', 'expirada'),
+    )
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='1')
+    expires_at = models.DateTimeField()
+    reference = models.CharField(max_length=100, null=True, blank=True)
+    create_by_user_id = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'stock_reservation'
+        verbose_name = "Stock reservation"
+        verbose_name_plural = "Stock reservations"
+        indexes = [
+            # Barrido de reservas vencidas: solo las pendientes
+            models.Index(fields=['expires_at'], condition=Q(status='1'), name='reservation_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_id} x {self.quantity} ({self.get_status_display()})"
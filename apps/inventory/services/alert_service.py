@@ -0,0 +1,30 @@
+from django.db.models import Q, F
+from apps.inventory.models import StockAlert
+
+
+# Coincide con la condición del índice parcial stock_low_stock_idx
+LOW_STOCK = Q(is_active=True, cant__lte=F('threshold'))
+
+
+def crossing_alert(stock, prev_cant, new_cant, prev_threshold=None):
+    """
+    Devuelve (sin guardar) el StockAlert si el cambio de cantidad cruza el
+    umbral del stock en cualquiera de los dos sentidos, o None.
+    """
+    if not stock.is_active:
+        return None
+    prev_threshold = stock.threshold if prev_threshold is None else prev_threshold
+    was_low = prev_cant <= prev_threshold
+    is_low = new_cant <= stock.threshold
+    if was_low == is_low:
+        return None
+    return StockAlert(
+        kind='1' if is_low else '2',
+        stock=stock,
+        stock_code=stock.code,
+        product_id=stock.product_id,
+        warehouse_id=stock.warehouse_id,
+        prev_cant=prev_cant,
+        new_cant=new_cant,
+        threshold=stock.threshold,
+    )
@@ -0,0 +1,435 @@
+import csv
+import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from apps.inventory.models import Stock, StockMovement, StockAlert, Warehouse
+from apps.products.models import Product
+from apps.inventory.services.alert_service import crossing_alert
+from apps.inventory.services.stock_service import build_movement
+from apps.inventory.services.summary_service import SummaryTracker, stock_state
+from apps.core.services.outbox_service import publish_many
+from apps.products.services.category_service import CATEGORY_TREE_CACHE
+from apps.products.services.statistics_service import PRODUCT_STATISTICS_CACHE
+from apps.products.services.offert_service import ACTIVE_OFFERTS_CACHE
+from utils.cache.cache import bump_version
+
+
+CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+
+PRODUCT_UPDATE_FIELDS = ['name', 'unit_price', 'brand', 'discount', 'small_description', 'updated_at']
+STOCK_UPDATE_FIELDS = ['product', 'warehouse', 'cant', 'unit_price', 'expire_date', 'threshold', 'updated_at']
+STOCK_COLUMNS = ('warehouse', 'stock_code', 'cant')
+IMPORT_MOTIVE = 'Importación CSV'
+
+
+class RowError(Exception):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.products = 0
+        self.stocks = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'products': self.products,
+            'stocks': self.stocks,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def _text(row, column, required=False, max_length=255):
+    value = (row.get(column) or '').strip()
+    if required and not value:
+        raise RowError(f"{column} es obligatorio")
+    if len(value) > max_length:
+        raise RowError(f"{column} supera {max_length} caracteres")
+    return value or None
+
+
+def _decimal(row, column, default=None, minimum=None):
+    value = (row.get(column) or '').strip()
+    if not value:
+        return default
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise RowError(f"{column} no es un número válido")
+    if minimum is not None and number < minimum:
+        raise RowError(f"{column} debe ser mayor o igual que {minimum}")
+    return number
+
+
+def _integer(row, column, default=None, minimum=None):
+    value = (row.get(column) or '').strip()
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise RowError(f"{column} no es un número entero")
+    if minimum is not None and number < minimum:
+        raise RowError(f"{column} debe ser mayor o igual que {minimum}")
+    return number
+
+
+def _date(row, column):
+    value = (row.get(column) or '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"{column} debe tener formato YYYY-MM-DD")
+
+
+def _warehouse_map():
+    """{nombre en minúsculas: id}; los nombres repetidos se marcan como ambiguos (None)"""
+    warehouses = {}
+    for pk, name in Warehouse.objects.values_list('pk', 'name').iterator(chunk_size=CHUNK_SIZE):
+        key = name.strip().lower()
+        warehouses[key] = None if key in warehouses else pk
+    return warehouses
+
+
+def _parse_row(row, warehouses):
+    code = _text(row, 'code', required=True, max_length=100)
+    name = _text(row, 'name', required=True)
+    product = {
+        'code': code,
+        'name': name,
+        'slug': slugify(f"{name}-{code}")[:255] or code,
+        'unit_price': _decimal(row, 'unit_price', Decimal('0.01'), minimum=Decimal('0.01')),
+        'brand': _text(row, 'brand'),
+        'discount': _decimal(row, 'discount', Decimal('0'), minimum=Decimal('0')),
+        'small_description': _text(row, 'small_description'),
+    }
+
+    if not any((row.get(column) or '').strip() for column in STOCK_COLUMNS):
+        return product, None
+
+    warehouse_name = _text(row, 'warehouse', required=True)
+    warehouse_id = warehouses.get(warehouse_name.lower(), 0)
+    if warehouse_id == 0:
+        raise RowError(f"Almacén '{warehouse_name}' no encontrado")
+    if warehouse_id is None:
+        raise RowError(f"Hay varios almacenes llamados '{warehouse_name}'")
+    stock = {
+        'code': _text(row, 'stock_code', required=True, max_length=100),
+        'product_code': code,
+        'warehouse_id': warehouse_id,
+        'cant': _integer(row, 'cant', 0, minimum=0),
+        'unit_price': _decimal(row, 'stock_unit_price', product['unit_price'], minimum=Decimal('0.01')),
+        'expire_date': _date(row, 'expire_date'),
+        'threshold': _integer(row, 'threshold', 5, minimum=0),
+    }
+    return product, stock
+
+
+def _use_copy():
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def _copy_upsert(model, fields, rows, update_fields, constants):
+    """
+    Upsert por COPY (PostgreSQL): copia las filas a una tabla temporal con las
+    mismas columnas y las vuelca con INSERT ... SELECT ... ON CONFLICT (code).
+    `fields` y `update_fields` son nombres de campo del modelo; `constants`
+    son expresiones SQL para las columnas NOT NULL que no se importan.
+    """
+    qn = connection.ops.quote_name
+
+    def column(name):
+        return qn(model._meta.get_field(name).column)
+
+    table = qn(model._meta.db_table)
+    staging = qn(f"{model._meta.db_table}_import_staging")
+    column_list = ', '.join(column(name) for name in fields)
+    insert_columns = column_list + ''.join(f', {column(name)}' for name in constants)
+    select_columns = column_list + ''.join(f', {expression}' for expression in constants.values())
+    updates = ', '.join(f'{column(name)} = EXCLUDED.{column(name)}' for name in update_fields)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {table} WITH NO DATA"
+        )
+        # El cursor de psycopg no pasa por el envoltorio de errores de Django
+        with connection.wrap_database_errors, cursor.cursor.copy(
+            f"COPY {staging} ({column_list}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+        cursor.execute(
+            f"INSERT INTO {table} ({insert_columns}) SELECT {select_columns} FROM {staging} "
+            f"ON CONFLICT ({qn('code')}) DO UPDATE SET {updates}"
+        )
+        # Se borra ya para poder repetir el upsert en la misma transacción
+        cursor.execute(f"DROP TABLE {staging}")
+
+
+def _upsert_products(products, now):
+    if _use_copy():
+        _copy_upsert(
+            Product,
+            ['code', 'slug', 'name', 'unit_price', 'brand', 'discount', 'small_description', 'created_at', 'updated_at'],
+            [
+                (p['code'], p['slug'], p['name'], p['unit_price'], p['brand'], p['discount'],
+                 p['small_description'], now, now)
+                for p in products
+            ],
+            PRODUCT_UPDATE_FIELDS,
+            {
+                'image_list': "'[]'::jsonb", 'image_variants': "'{}'::jsonb", 'stars': '0', 'likes': '0',
+                'total_sales': '0', 'is_active': 'true', 'is_deleted': 'false',
+            },
+        )
+        return
+    Product.objects.bulk_create(
+        [Product(created_at=now, updated_at=now, **p) for p in products],
+        update_conflicts=True,
+        unique_fields=['code'],
+        update_fields=PRODUCT_UPDATE_FIELDS,
+        batch_size=CHUNK_SIZE,
+    )
+
+
+def _upsert_stocks(stocks, now):
+    if _use_copy():
+        _copy_upsert(
+            Stock,
+            ['code', 'product', 'warehouse', 'cant', 'unit_price', 'expire_date', 'threshold', 'created_at', 'updated_at'],
+            [
+                (s['code'], s['product_id'], s['warehouse_id'], s['cant'], s['unit_price'],
+                 s['expire_date'], s['threshold'], now, now)
+                for s in stocks
+            ],
+            STOCK_UPDATE_FIELDS,
+            {'is_active': 'true', 'reserved': '0'},
+        )
+        return
+    Stock.objects.bulk_create(
+        [Stock(created_at=now, updated_at=now, **s) for s in stocks],
+        update_conflicts=True,
+        unique_fields=['code'],
+        update_fields=STOCK_UPDATE_FIELDS,
+        batch_size=CHUNK_SIZE,
+    )
+
+
+def _lock_existing_stocks(codes):
+    """{code: stock} de los stocks que ya existen, bloqueados en orden de pk"""
+    return {
+        stock.code: stock
+        for stock in Stock.objects.select_for_update(of=('self',)).select_related('warehouse').filter(
+            code__in=codes
+        ).order_by('pk')
+    }
+
+
+def _stock_changes(previous, saved, user):
+    """Movimientos y alertas de los stocks existentes cuya cantidad o umbral cambió"""
+    movements = []
+    alerts = []
+    for stock in saved:
+        old = previous.get(stock.code)
+        if old is None:
+            continue
+        if old.cant != stock.cant:
+            movements.append(build_movement(
+                stock, old.cant, stock.cant, user=user, motive=IMPORT_MOTIVE, action_type='2'
+            ))
+        alert = crossing_alert(stock, old.cant, stock.cant, prev_threshold=old.threshold)
+        if alert is not None:
+            alerts.append(alert)
+    return movements, alerts
+
+
+def _check_unique(entries):
+    """
+    Valida antes de escribir lo que haría fallar el lote entero: stock_code
+    repetido dentro del lote y slugs (derivados de nombre y código) que ya
+    usa otro producto. Devuelve {línea: error}.
+    """
+    errors = {}
+    stock_lines = {}
+    for line, product, stock in entries:
+        if stock is None:
+            continue
+        if stock['code'] in stock_lines:
+            errors[line] = f"stock_code repetido en la línea {stock_lines[stock['code']]}"
+        else:
+            stock_lines[stock['code']] = line
+
+    # Los productos existentes conservan su slug: solo importa el de los nuevos
+    slugs = {product['slug'] for _, product, _ in entries}
+    codes = {product['code'] for _, product, _ in entries}
+    taken = {}
+    existing = set()
+    for code, slug in Product.objects.filter(Q(code__in=codes) | Q(slug__in=slugs)).values_list('code', 'slug'):
+        taken[slug] = code
+        if code in codes:
+            existing.add(code)
+    for line, product, _ in entries:
+        if product['code'] in existing or line in errors:
+            continue
+        owner = taken.setdefault(product['slug'], product['code'])
+        if owner != product['code']:
+            errors[line] = f"El slug '{product['slug']}' ya lo usa el producto {owner}"
+    return errors
+
+
+def _write(entries, now, user):
+    """
+    Escribe productos y stocks de `entries` (códigos repetidos: gana la
+    última fila). Devuelve (productos, stocks, [(línea, error)]) con las
+    filas de stock rechazadas.
+    """
+    products = {product['code']: product for _, product, _ in entries}
+    stocks = {stock['code']: (line, stock) for line, _, stock in entries if stock is not None}
+
+    _upsert_products(list(products.values()), now)
+    saved_products = list(Product.objects.filter(code__in=list(products)))
+    publish_many(saved_products)
+    product_ids = {product.code: product.pk for product in saved_products}
+
+    previous = _lock_existing_stocks(list(stocks)) if stocks else {}
+    rejected = []
+    stock_rows = []
+    for line, stock in stocks.values():
+        old = previous.get(stock['code'])
+        if old is not None and stock['cant'] < old.reserved:
+            rejected.append((line, f"La cantidad no puede ser menor que la reservada ({old.reserved})"))
+            continue
+        stock = dict(stock)
+        stock['product_id'] = product_ids[stock.pop('product_code')]
+        stock_rows.append(stock)
+    if stock_rows:
+        _upsert_stocks(stock_rows, now)
+        saved_stocks = list(
+            Stock.objects.select_related('product', 'warehouse').filter(
+                code__in=[stock['code'] for stock in stock_rows]
+            )
+        )
+        movements, alerts = _stock_changes(previous, saved_stocks, user)
+        StockMovement.objects.bulk_create(movements, batch_size=CHUNK_SIZE)
+        StockAlert.objects.bulk_create(alerts, batch_size=CHUNK_SIZE)
+        publish_many(saved_stocks)
+        tracker = SummaryTracker()
+        tracker.track_many([
+            (stock_state(previous[stock.code]) if stock.code in previous else None, stock_state(stock))
+            for stock in saved_stocks
+        ])
+        tracker.flush()
+    return set(products), {stock['code'] for stock in stock_rows}, rejected
+
+
+def _import_rows(entries, now, user, report):
+    """
+    Reintento fila a fila cuando el lote completo falla: cada fila va en su
+    propio savepoint y las que fallan se informan con su número de línea.
+    """
+    products = set()
+    stocks = set()
+    with transaction.atomic():
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    saved_products, saved_stocks, rejected = _write([entry], now, user)
+            except DatabaseError as e:
+                report.add_error(entry[0], f"Fila no importada: {e}")
+                continue
+            products |= saved_products
+            stocks |= saved_stocks
+            for line, message in rejected:
+                report.add_error(line, message)
+    report.products += len(products)
+    report.stocks += len(stocks)
+
+
+def _import_chunk(rows, warehouses, report, user=None):
+    entries = []
+    for line, row in rows:
+        report.rows += 1
+        try:
+            product, stock = _parse_row(row, warehouses)
+        except RowError as e:
+            report.add_error(line, str(e))
+            continue
+        entries.append((line, product, stock))
+
+    if not entries:
+        return
+
+    errors = _check_unique(entries)
+    for line, message in sorted(errors.items()):
+        report.add_error(line, message)
+    entries = [entry for entry in entries if entry[0] not in errors]
+    if not entries:
+        return
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            products, stocks, rejected = _write(entries, now, user)
+    except DatabaseError:
+        _import_rows(entries, now, user, report)
+        return
+
+    for line, message in rejected:
+        report.add_error(line, message)
+    report.products += len(products)
+    report.stocks += len(stocks)
+
+
+def import_csv(stream, chunk_size=CHUNK_SIZE, user=None):
+    """
+    Importa productos y stocks desde un CSV (stream de texto) por lotes.
+
+    Columnas de producto: code, name, unit_price, brand, discount,
+    small_description. Columnas opcionales de stock: warehouse (nombre),
+    stock_code, cant, stock_unit_price, expire_date, threshold.
+
+    Productos y stocks se insertan o actualizan por `code`. Cada lote se
+    escribe en su propia transacción: las filas inválidas se informan sin
+    abortar el resto y, si el lote falla en la base de datos, se reintenta
+    fila a fila. Un stock existente no puede quedar por debajo de su
+    cantidad reservada; los cambios de cantidad se registran como
+    movimientos (a nombre de `user`) y generan las alertas de umbral. Los
+    totales de inventario se actualizan en la transacción de cada lote.
+    """
+    report = ImportReport()
+    warehouses = _warehouse_map()
+    reader = enumerate(csv.DictReader(stream), start=2)
+    while True:
+        rows = list(islice(reader, chunk_size))
+        if not rows:
+            break
+        _import_chunk(rows, warehouses, report, user)
+
+    if report.products:
+        # Los upserts masivos no disparan las señales de Product
+        bump_version(PRODUCT_STATISTICS_CACHE)
+        bump_version(ACTIVE_OFFERTS_CACHE)
+        bump_version(CATEGORY_TREE_CACHE)
+    return report
@@ -0,0 +1,197 @@
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Case, When, Value
+from django.utils import timezone
+from apps.inventory.models import Stock, StockReservation
+from apps.inventory.services.alert_service import crossing_alert
+from apps.inventory.services.stock_service import (
+    StockServiceError, StockNotFound, InsufficientStock, build_movement, BATCH_SIZE
+)
+from apps.inventory.services.summary_service import SummaryTracker, StockState, stock_state
+from apps.core.services.outbox_service import publish, publish_many
+from apps.products.services.counter_service import increment as increment_counters
+
+
+class ReservationNotFound(StockServiceError):
+    pass
+
+
+class ReservationClosed(StockServiceError):
+    """La reserva ya fue confirmada, liberada o ha expirado"""
+
+
+PENDING, CONFIRMED, RELEASED, EXPIRED = '1', '2', '3', '4'
+
+
+def default_ttl():
+    return getattr(settings, 'STOCK_RESERVATION_TTL_SECONDS', 900)
+
+
+def reserve_stock(stock_id, quantity, user=None, ttl_seconds=None, reference=None):
+    """
+    Reserva `quantity` unidades de un stock durante ttl_seconds. El hueco se
+    comprueba y se ocupa en un único UPDATE condicional
+    (reserved = reserved + q solo si cant >= reserved + q), así las reservas
+    concurrentes sobre el mismo stock no pueden sobrevender.
+    """
+    if quantity <= 0:
+        raise StockServiceError('La cantidad debe ser mayor que cero')
+    ttl_seconds = ttl_seconds or default_ttl()
+
+    with transaction.atomic():
+        updated = Stock.objects.filter(
+            pk=stock_id, is_active=True, cant__gte=F('reserved') + quantity
+        ).update(reserved=F('reserved') + quantity)
+
+        if not updated:
+            if not Stock.objects.filter(pk=stock_id, is_active=True).exists():
+                raise StockNotFound('Stock no encontrado')
+            raise InsufficientStock('Cantidad disponible insuficiente')
+
+        reservation = StockReservation.objects.create(
+            stock_id=stock_id,
+            quantity=quantity,
+            expires_at=timezone.now() + datetime.timedelta(seconds=ttl_seconds),
+            reference=reference,
+            create_by_user_id=user.pk if user is not None and user.is_authenticated else None,
+        )
+
+        stock = Stock.objects.select_related('warehouse').get(pk=stock_id)
+        publish(stock)
+        tracker = SummaryTracker()
+        tracker.track_reserved(stock_state(stock), quantity)
+        tracker.flush()
+
+    return reservation
+
+
+def _lock_pending(reservation_id):
+    reservation = StockReservation.objects.select_for_update().filter(pk=reservation_id).first()
+    if reservation is None:
+        raise ReservationNotFound('Reserva no encontrada')
+    if reservation.status != PENDING:
+        raise ReservationClosed(f'La reserva está {reservation.get_status_display()}')
+    return reservation
+
+
+def confirm_reservation(reservation_id, user=None, motive=None):
+    """
+    Convierte la reserva en una salida: descuenta la cantidad del stock y de
+    lo reservado en el mismo UPDATE, registra el StockMovement y suma la
+    cantidad a las ventas del producto. Una reserva
+    vencida no se puede confirmar aunque el barrido aún no la haya marcado.
+    """
+    with transaction.atomic():
+        reservation = _lock_pending(reservation_id)
+        if reservation.expires_at <= timezone.now():
+            raise ReservationClosed('La reserva ha expirado')
+
+        quantity = reservation.quantity
+        Stock.objects.filter(pk=reservation.stock_id).update(
+            cant=F('cant') - quantity, reserved=F('reserved') - quantity, updated_at=timezone.now()
+        )
+        stock = Stock.objects.select_related('product', 'warehouse').get(pk=reservation.stock_id)
+        prev_cant = stock.cant + quantity
+        movement = build_movement(
+            stock, prev_cant, stock.cant, user=user,
+            motive=motive or reservation.reference or 'Confirmación de reserva'
+        )
+        movement.save()
+        publish(stock)
+
+        alert = crossing_alert(stock, prev_cant, stock.cant)
+        if alert is not None:
+            alert.save()
+
+        reservation.status = CONFIRMED
+        reservation.save(update_fields=['status', 'updated_at'])
+        # La reserva confirmada es una venta: cuenta en Product.total_sales
+        increment_counters(stock.product_id, total_sales=quantity)
+
+        tracker = SummaryTracker()
+        state = stock_state(stock)
+        tracker.track_quantity(state, -quantity)
+        tracker.track_reserved(state, -quantity)
+        tracker.flush()
+
+    return reservation, movement
+
+
+def release_reservation(reservation_id):
+    """Cancela una reserva pendiente y devuelve la cantidad al disponible"""
+    with transaction.atomic():
+        reservation = _lock_pending(reservation_id)
+        Stock.objects.filter(pk=reservation.stock_id).update(reserved=F('reserved') - reservation.quantity)
+        reservation.status = RELEASED
+        reservation.save(update_fields=['status', 'updated_at'])
+
+        stock = Stock.objects.select_related('warehouse').get(pk=reservation.stock_id)
+        publish(stock)
+        tracker = SummaryTracker()
+        tracker.track_reserved(stock_state(stock), -reservation.quantity)
+        tracker.flush()
+
+    return reservation
+
+
+def expire_reservations(now=None, batch_size=BATCH_SIZE):
+    """
+    Marca como expiradas las reservas pendientes vencidas y devuelve sus
+    cantidades al disponible. Trabaja por lotes de batch_size, cada uno en
+    su transacción:
+    - SELECT ... FOR UPDATE SKIP LOCKED sobre las reservas vencidas (índice
+      parcial de pendientes), así varios barridos o una confirmación en curso
+      no se bloquean entre sí.
+    - Un UPDATE para las reservas y un UPDATE con CASE para los stocks,
+      bloqueados antes en orden de pk como en las transferencias.
+    Devuelve el número de reservas expiradas.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                StockReservation.objects.select_for_update(skip_locked=True).filter(
+                    status=PENDING, expires_at__lte=now
+                ).order_by('expires_at').values_list('pk', 'stock_id', 'quantity')[:batch_size]
+            )
+            if not rows:
+                break
+
+            released = defaultdict(int)
+            for _, stock_id, quantity in rows:
+                released[stock_id] += quantity
+
+            StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+                status=EXPIRED, updated_at=now
+            )
+            stocks = list(
+                Stock.objects.select_for_update(of=('self',)).filter(pk__in=list(released)).order_by('pk').values(
+                    'pk', 'product_id', 'warehouse_id', 'warehouse__store_id', 'cant', 'unit_price',
+                    'is_active', 'reserved'
+                )
+            )
+            Stock.objects.filter(pk__in=list(released)).update(
+                reserved=F('reserved') - Case(
+                    *[When(pk=stock_id, then=Value(quantity)) for stock_id, quantity in released.items()],
+                    default=Value(0),
+                )
+            )
+            publish_many(Stock.objects.filter(pk__in=list(released)).order_by('pk'))
+
+            tracker = SummaryTracker()
+            for row in stocks:
+                state = StockState(
+                    row['pk'], row['product_id'], row['warehouse_id'], row['warehouse__store_id'],
+                    row['cant'], row['unit_price'], row['is_active'], row['reserved']
+                )
+                tracker.track_reserved(state, -released[row['pk']])
+            tracker.flush()
+            expired += len(rows)
+
+        if len(rows) < batch_size:
+            break
+    return expired
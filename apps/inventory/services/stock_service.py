@@ -0,0 +1,447 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum, Window
+from django.utils import timezone
+from apps.inventory.models import Stock, StockMovement, StockAlert, Warehouse
+from apps.inventory.services.alert_service import crossing_alert
+from apps.inventory.services.summary_service import SummaryTracker, stock_state
+from apps.core.services.outbox_service import publish, publish_many
+
+
+class StockServiceError(Exception):
+    """Error de negocio al operar sobre el stock"""
+
+
+class StockNotFound(StockServiceError):
+    pass
+
+
+class InsufficientStock(StockServiceError):
+    pass
+
+
+class BulkAdjustmentError(StockServiceError):
+    """Alguna línea del ajuste masivo no es válida; no se aplicó ningún cambio"""
+
+    def __init__(self, results):
+        super().__init__('Hay líneas inválidas en el ajuste masivo')
+        self.results = results
+
+
+class TransferError(StockServiceError):
+    """Alguna transferencia no es válida; no se movió ningún stock"""
+
+    def __init__(self, results):
+        super().__init__('Hay transferencias inválidas')
+        self.results = results
+
+
+BATCH_SIZE = 1000
+
+
+def user_full_name(user):
+    if user is None or not user.is_authenticated:
+        return None
+    full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+    return full_name or user.email
+
+
+def set_snapshot(movement, side, stock, prev_cant, new_cant):
+    """Copia el estado del stock en los campos stock_from_* o stock_to_*"""
+    snapshot = {
+        'id': stock.pk,
+        'code': stock.code,
+        'product_id': stock.product_id,
+        'product_name': stock.product.name if stock.product_id else None,
+        'wharehouse_id': stock.warehouse_id,
+        'wharehouse_name': stock.warehouse.name if stock.warehouse_id else None,
+        'prev_cant': prev_cant,
+        'new_cant': new_cant,
+    }
+    for key, value in snapshot.items():
+        setattr(movement, f'stock_{side}_{key}', value)
+
+
+def build_movement(stock, prev_cant, new_cant, user=None, motive=None, action_type='1'):
+    """
+    Construye (sin guardar) el StockMovement de un ajuste sobre un solo stock.
+    Las entradas se registran en stock_to_* y las salidas en stock_from_*.
+    """
+    delta = new_cant - prev_cant
+    movement = StockMovement(
+        action_operation='2' if delta > 0 else '1',
+        action_type=action_type,
+        description='Ajuste de stock',
+        motive=motive,
+        cant=abs(delta),
+        create_by_user_id=user.pk if user is not None and user.is_authenticated else None,
+        create_by_user_full_name=user_full_name(user),
+    )
+    set_snapshot(movement, 'to' if delta > 0 else 'from', stock, prev_cant, new_cant)
+    return movement
+
+
+def adjust_stock(stock_id, adjustment, user=None, motive=None):
+    """
+    Ajusta la cantidad de un stock en una sola sentencia UPDATE condicional
+    (cant = cant + ajuste solo si el resultado no queda por debajo de lo
+    reservado) y registra el StockMovement en la misma transacción.
+
+    El UPDATE toma el lock de la fila únicamente hasta el commit, por lo que
+    escritores concurrentes sobre el mismo stock se encadenan sin perder
+    ajustes y sin leer-modificar-escribir en Python. Un ajuste de 0 no
+    escribe nada: devuelve el stock y ningún movimiento.
+    """
+    if adjustment == 0:
+        stock = Stock.objects.filter(pk=stock_id).first()
+        if stock is None:
+            raise StockNotFound('Stock no encontrado')
+        return stock, None
+
+    with transaction.atomic():
+        updated = Stock.objects.filter(
+            pk=stock_id, cant__gte=F('reserved') - adjustment
+        ).update(cant=F('cant') + adjustment, updated_at=timezone.now())
+
+        if not updated:
+            current = Stock.objects.filter(pk=stock_id).values('cant').first()
+            if current is None:
+                raise StockNotFound('Stock no encontrado')
+            if current['cant'] + adjustment < 0:
+                raise InsufficientStock('La cantidad no puede ser negativa')
+            raise InsufficientStock('La cantidad no puede quedar por debajo de la reservada')
+
+        stock = Stock.objects.select_related('product', 'warehouse').get(pk=stock_id)
+        prev_cant = stock.cant - adjustment
+        movement = build_movement(stock, prev_cant, stock.cant, user=user, motive=motive)
+        movement.save()
+        publish(stock)
+
+        alert = crossing_alert(stock, prev_cant, stock.cant)
+        if alert is not None:
+            alert.save()
+
+        tracker = SummaryTracker()
+        tracker.track_quantity(stock_state(stock), adjustment)
+        tracker.flush()
+
+    return stock, movement
+
+
+def lock_stocks(stock_ids):
+    """
+    Bloquea (SELECT ... FOR UPDATE) los stocks indicados en orden de pk y en
+    lotes de BATCH_SIZE. Devuelve un dict {pk: stock}.
+    """
+    stock_ids = sorted(set(stock_ids))
+    stocks = {}
+    for start in range(0, len(stock_ids), BATCH_SIZE):
+        chunk = stock_ids[start:start + BATCH_SIZE]
+        queryset = Stock.objects.select_for_update(of=('self',)).select_related(
+            'product', 'warehouse'
+        ).filter(pk__in=chunk).order_by('pk')
+        stocks.update({stock.pk: stock for stock in queryset})
+    return stocks
+
+
+def apply_quantities(stocks, running, tracker):
+    """
+    Escribe con bulk_update las cantidades que cambiaron, las registra en el
+    resumen y en el outbox y emite las alertas de umbral que correspondan.
+    """
+    now = timezone.now()
+    changed = []
+    alerts = []
+    for stock in stocks.values():
+        if stock.cant != running[stock.pk]:
+            tracker.track_quantity(stock_state(stock), running[stock.pk] - stock.cant)
+            alert = crossing_alert(stock, stock.cant, running[stock.pk])
+            if alert is not None:
+                alerts.append(alert)
+            stock.cant = running[stock.pk]
+            stock.updated_at = now
+            changed.append(stock)
+    Stock.objects.bulk_update(changed, ['cant', 'updated_at'], batch_size=BATCH_SIZE)
+    StockAlert.objects.bulk_create(alerts, batch_size=BATCH_SIZE)
+    publish_many(changed)
+
+
+def bulk_adjust_stock(lines, user=None):
+    """
+    Aplica una lista de ajustes [{stock_id, adjustment, motive}] en una sola
+    transacción: bloquea los stocks afectados, valida todas las líneas y, si
+    todas son válidas, escribe las cantidades con bulk_update y los
+    movimientos con bulk_create. El número de consultas depende de
+    len(lines) / BATCH_SIZE y no del número de líneas.
+    """
+    tracker = SummaryTracker()
+    with transaction.atomic():
+        stocks = lock_stocks(line['stock_id'] for line in lines)
+        running = {pk: stock.cant for pk, stock in stocks.items()}
+        results = []
+        pending = []
+        has_errors = False
+
+        for index, line in enumerate(lines):
+            stock_id = line['stock_id']
+            adjustment = line['adjustment']
+            result = {'line': index, 'stock_id': stock_id}
+
+            if stock_id not in stocks:
+                result.update(status='error', error='Stock no encontrado')
+            elif adjustment == 0:
+                result.update(status='error', error='El ajuste no puede ser cero')
+            elif running[stock_id] + adjustment < 0:
+                result.update(status='error', error='La cantidad no puede ser negativa')
+            elif running[stock_id] + adjustment < stocks[stock_id].reserved:
+                result.update(status='error', error='La cantidad no puede quedar por debajo de la reservada')
+            else:
+                prev_cant = running[stock_id]
+                running[stock_id] = prev_cant + adjustment
+                result.update(status='ok', prev_cant=prev_cant, new_cant=running[stock_id])
+                pending.append((stocks[stock_id], prev_cant, running[stock_id], line.get('motive')))
+
+            has_errors = has_errors or result['status'] == 'error'
+            results.append(result)
+
+        if has_errors:
+            raise BulkAdjustmentError(results)
+
+        apply_quantities(stocks, running, tracker)
+
+        movements = [
+            build_movement(stock, prev_cant, new_cant, user=user, motive=motive, action_type='2')
+            for stock, prev_cant, new_cant, motive in pending
+        ]
+        StockMovement.objects.bulk_create(movements, batch_size=BATCH_SIZE)
+        tracker.flush()
+
+    return results
+
+
+def _unique_code(base, taken):
+    """`base`, o `base-2`, `base-3`... si ya existe un stock con ese código"""
+    if base not in taken:
+        return base
+    taken.update(Stock.objects.filter(code__startswith=f"{base}-").values_list('code', flat=True))
+    suffix = 2
+    while f"{base}-{suffix}" in taken:
+        suffix += 1
+    return f"{base}-{suffix}"
+
+
+def _resolve_destinations(lines, sources, tracker):
+    """
+    Devuelve para cada línea el pk del stock destino y un dict {línea: error}.
+    Si la línea indica un almacén (warehouse_to) se usa el stock activo del
+    mismo producto en ese almacén, creándolo con cantidad 0 cuando no existe:
+    con el `code` de la línea o, si no lo trae, `<código origen>-<almacén>`
+    (con un sufijo si ya está en uso). El almacén no se bloquea: si otra
+    transferencia crea el mismo código a la vez, el índice único lo detecta
+    y se usa su stock cuando es del mismo producto y almacén.
+    """
+    warehouses = Warehouse.objects.in_bulk({line['warehouse_to'] for line in lines if line.get('warehouse_to')})
+
+    wanted = {
+        (sources[line['stock_from']].product_id, line['warehouse_to'])
+        for line in lines
+        if line.get('warehouse_to') in warehouses and line['stock_from'] in sources
+    }
+    existing = {}
+    if wanted:
+        queryset = Stock.objects.filter(
+            product_id__in={product_id for product_id, _ in wanted},
+            warehouse_id__in={warehouse_id for _, warehouse_id in wanted},
+            is_active=True,
+        ).order_by('pk').values_list('product_id', 'warehouse_id', 'pk')
+        for product_id, warehouse_id, pk in queryset:
+            existing.setdefault((product_id, warehouse_id), pk)
+
+    def default_code(source, warehouse_id):
+        suffix = f"-{warehouse_id}"
+        return source.code[:100 - len(suffix) - 4] + suffix
+
+    candidates = {
+        line.get('code') or default_code(sources[line['stock_from']], line['warehouse_to'])
+        for line in lines
+        if line.get('warehouse_to') in warehouses and line['stock_from'] in sources
+        and (sources[line['stock_from']].product_id, line['warehouse_to']) not in existing
+    }
+    taken = set(Stock.objects.filter(code__in=candidates).values_list('code', flat=True)) if candidates else set()
+
+    destinations = []
+    errors = {}
+    for index, line in enumerate(lines):
+        if line.get('stock_to'):
+            destinations.append(line['stock_to'])
+            continue
+        source = sources.get(line['stock_from'])
+        warehouse_id = line.get('warehouse_to')
+        if source is None or warehouse_id not in warehouses:
+            destinations.append(None)
+            continue
+        key = (source.product_id, warehouse_id)
+        if key not in existing:
+            if line.get('code'):
+                code = line['code']
+                if code in taken:
+                    errors[index] = f"Ya existe un stock con el código {code}"
+                    destinations.append(None)
+                    continue
+            else:
+                code = _unique_code(default_code(source, warehouse_id), taken)
+            try:
+                with transaction.atomic():
+                    created = Stock.objects.create(
+                        code=code,
+                        product_id=source.product_id,
+                        warehouse=warehouses[warehouse_id],
+                        cant=0,
+                        unit_price=source.unit_price,
+                        expire_date=source.expire_date,
+                        threshold=source.threshold,
+                    )
+                tracker.track(None, stock_state(created))
+            except IntegrityError:
+                # Otra escritura creó el mismo código entre la consulta y el
+                # INSERT: sirve si es el destino que buscamos
+                created = Stock.objects.filter(
+                    code=code, product_id=source.product_id, warehouse_id=warehouse_id, is_active=True
+                ).first()
+                if created is None:
+                    errors[index] = f"Ya existe un stock con el código {code}"
+                    destinations.append(None)
+                    continue
+            taken.add(code)
+            existing[key] = created.pk
+        destinations.append(existing[key])
+    return destinations, errors
+
+
+def transfer_stock(lines, user=None):
+    """
+    Mueve cantidades entre stocks. Cada línea es
+    {stock_from, cant, stock_to | warehouse_to, code?, motive?}.
+
+    Todos los stocks implicados se bloquean en orden de pk antes de tocar
+    ninguna cantidad, de modo que transferencias opuestas concurrentes
+    (A→B y B→A) esperan en vez de producir un deadlock. Débitos y créditos
+    se escriben con bulk_update y cada línea deja un StockMovement con el
+    antes/después de ambos stocks.
+    """
+    tracker = SummaryTracker()
+    with transaction.atomic():
+        sources = Stock.objects.in_bulk({line['stock_from'] for line in lines})
+        destinations, destination_errors = _resolve_destinations(lines, sources, tracker)
+        stocks = lock_stocks(
+            [line['stock_from'] for line in lines] + [pk for pk in destinations if pk]
+        )
+        running = {pk: stock.cant for pk, stock in stocks.items()}
+        results = []
+        pending = []
+        has_errors = False
+
+        for index, (line, stock_to) in enumerate(zip(lines, destinations)):
+            stock_from = line['stock_from']
+            cant = line['cant']
+            result = {'line': index, 'stock_from': stock_from, 'stock_to': stock_to}
+
+            if stock_from not in stocks:
+                result.update(status='error', error='Stock de origen no encontrado')
+            elif index in destination_errors:
+                result.update(status='error', error=destination_errors[index])
+            elif stock_to not in stocks:
+                result.update(status='error', error='Destino no encontrado')
+            elif stock_from == stock_to:
+                result.update(status='error', error='El origen y el destino deben ser distintos')
+            elif stocks[stock_from].product_id != stocks[stock_to].product_id:
+                result.update(status='error', error='El origen y el destino deben ser del mismo producto')
+            elif running[stock_from] - stocks[stock_from].reserved < cant:
+                result.update(status='error', error='Cantidad insuficiente en el stock de origen')
+            else:
+                from_prev, to_prev = running[stock_from], running[stock_to]
+                running[stock_from] -= cant
+                running[stock_to] += cant
+                result.update(
+                    status='ok',
+                    stock_from_prev_cant=from_prev, stock_from_new_cant=running[stock_from],
+                    stock_to_prev_cant=to_prev, stock_to_new_cant=running[stock_to],
+                )
+                pending.append((line, stocks[stock_from], from_prev, stocks[stock_to], to_prev))
+
+            has_errors = has_errors or result['status'] == 'error'
+            results.append(result)
+
+        if has_errors:
+            raise TransferError(results)
+
+        apply_quantities(stocks, running, tracker)
+
+        action_type = '1' if len(lines) == 1 else '2'
+        movements = []
+        for line, source, from_prev, destination, to_prev in pending:
+            movement = StockMovement(
+                action_operation='3',
+                action_type=action_type,
+                description='Transferencia de stock',
+                motive=line.get('motive'),
+                cant=line['cant'],
+                create_by_user_id=user.pk if user is not None and user.is_authenticated else None,
+                create_by_user_full_name=user_full_name(user),
+            )
+            set_snapshot(movement, 'from', source, from_prev, from_prev - line['cant'])
+            set_snapshot(movement, 'to', destination, to_prev, to_prev + line['cant'])
+            movements.append(movement)
+        StockMovement.objects.bulk_create(movements, batch_size=BATCH_SIZE)
+        tracker.flush()
+
+    return results
+
+
+def fefo_allocation(product_id, quantity, warehouse_id=None):
+    """
+    Picking FEFO (first expired, first out): devuelve los stocks de los que
+    tomar `quantity` unidades del producto, empezando por la caducidad más
+    próxima, junto con la cantidad a tomar de cada uno.
+
+    Una sola consulta: una suma acumulada (ventana) sobre los stocks
+    ordenados por caducidad corta la lista en el primer stock que completa
+    la cantidad. Los stocks sin fecha de caducidad van al final, los ya
+    caducados se excluyen y solo cuenta la cantidad no reservada.
+    """
+    queryset = Stock.objects.filter(
+        Q(expire_date__isnull=True) | Q(expire_date__gte=timezone.localdate()),
+        product_id=product_id, is_active=True, cant__gt=F('reserved'),
+    )
+    if warehouse_id:
+        queryset = queryset.filter(warehouse_id=warehouse_id)
+    order = [F('expire_date').asc(nulls_last=True), F('pk').asc()]
+    rows = queryset.annotate(
+        free=F('cant') - F('reserved'),
+        running=Window(Sum(F('cant') - F('reserved')), order_by=order),
+    ).filter(
+        running__lt=F('free') + quantity
+    ).order_by(*order).values(
+        'pk', 'code', 'warehouse_id', 'warehouse__name', 'expire_date', 'free', 'running'
+    )
+
+    picks = []
+    allocated = 0
+    for row in rows:
+        take = min(row['free'], quantity - allocated)
+        allocated += take
+        picks.append({
+            'stock_id': row['pk'],
+            'code': row['code'],
+            'warehouse': row['warehouse_id'],
+            'warehouse_name': row['warehouse__name'],
+            'expire_date': row['expire_date'],
+            'available': row['free'],
+            'take': take,
+        })
+    return {
+        'product': product_id,
+        'quantity': quantity,
+        'allocated': allocated,
+        'shortage': quantity - allocated,
+        'picks': picks,
+    }
@@ -0,0 +1,444 @@
+from collections import namedtuple, defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum, F, Q, Value, Count, Case, When, DecimalField, BigIntegerField
+from django.db.models.functions import Coalesce
+from apps.inventory.models import Stock, InventorySummary, ProductAvailability
+
+
+GLOBAL = ('global', 0)
+
+# Claves (producto, almacén) por UPDATE de product_availability: 8 parámetros
+# por clave, por debajo del límite de 999 de SQLite
+AVAILABILITY_BATCH_SIZE = 100
+
+# Valores por consulta agrupada en SummaryTracker.track_many()
+PRESENCE_BATCH_SIZE = 500
+
+StockState = namedtuple(
+    'StockState',
+    ['pk', 'product_id', 'warehouse_id', 'store_id', 'cant', 'unit_price', 'is_active', 'reserved']
+)
+
+
+def stock_state(stock):
+    """Foto de los campos de un stock que afectan al resumen"""
+    store_id = stock.warehouse.store_id if stock.warehouse_id else None
+    return StockState(
+        stock.pk, stock.product_id, stock.warehouse_id, store_id,
+        stock.cant, Decimal(stock.unit_price), stock.is_active, stock.reserved
+    )
+
+
+def _scopes(state):
+    scopes = [GLOBAL]
+    if state.warehouse_id:
+        scopes.append(('warehouse', state.warehouse_id))
+    if state.store_id:
+        scopes.append(('store', state.store_id))
+    return scopes
+
+
+def _scope_filter(scope, scope_id):
+    if scope == 'warehouse':
+        return {'warehouse_id': scope_id}
+    if scope == 'store':
+        return {'warehouse__store_id': scope_id}
+    return {}
+
+
+class SummaryTracker:
+    """
+    Acumula los cambios de una transacción y los aplica al final con un
+    UPDATE ... SET col = col + delta por cada fila de resumen afectada.
+
+    Los cambios que solo mueven cantidades (ajustes, transferencias) no
+    necesitan consultas extra; los que activan/desactivan o mueven un stock
+    comprueban con un EXISTS indexado si el producto/almacén sigue presente
+    en el ámbito para mantener los conteos distintos.
+
+    También mantiene ProductAvailability (cantidad y cantidad reservada por
+    producto y almacén), con un UPDATE por lote de AVAILABILITY_BATCH_SIZE
+    claves.
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, 0, 0, Decimal('0')])
+        self.availability = defaultdict(lambda: [0, 0])
+
+    def _track_availability(self, state, delta_cant, delta_reserved=0):
+        if state.is_active and state.product_id and state.warehouse_id:
+            delta = self.availability[(state.product_id, state.warehouse_id)]
+            delta[0] += delta_cant
+            delta[1] += delta_reserved
+
+    def track_reserved(self, state, delta_reserved):
+        """Reservas creadas o liberadas: solo afectan a product_availability"""
+        self._track_availability(state, 0, delta_reserved)
+
+    def track_quantity(self, state, delta_cant):
+        if not state.is_active or not delta_cant:
+            return
+        self._track_availability(state, delta_cant)
+        for key in _scopes(state):
+            delta = self.deltas[key]
+            delta[2] += delta_cant
+            delta[3] += delta_cant * state.unit_price
+
+    def track(self, old, new):
+        """Registra el paso de un stock del estado old al new (None = no existe)"""
+        old_scopes = set(_scopes(old)) if old and old.is_active else set()
+        new_scopes = set(_scopes(new)) if new and new.is_active else set()
+        pk = (old or new).pk
+        if old:
+            self._track_availability(old, -old.cant, -old.reserved)
+        if new:
+            self._track_availability(new, new.cant, new.reserved)
+
+        for key in old_scopes | new_scopes:
+            delta = self.deltas[key]
+            if key in old_scopes:
+                delta[2] -= old.cant
+                delta[3] -= old.cant * old.unit_price
+            if key in new_scopes:
+                delta[2] += new.cant
+                delta[3] += new.cant * new.unit_price
+
+            for index, field in ((0, 'product_id'), (1, 'warehouse_id')):
+                old_value = getattr(old, field) if key in old_scopes else None
+                new_value = getattr(new, field) if key in new_scopes else None
+                if old_value == new_value:
+                    continue
+                if old_value is not None and not self._others(key, field, old_value, pk):
+                    delta[index] -= 1
+                if new_value is not None and not self._others(key, field, new_value, pk):
+                    delta[index] += 1
+
+    def track_many(self, changes):
+        """
+        Como track() para un lote de (old, new) ya escritos en la base de
+        datos (importaciones). En lugar de un EXISTS por stock, los conteos
+        distintos salen de una consulta agrupada por producto y otra por
+        almacén: se cuentan los stocks activos tras el lote y se les resta lo
+        que aportó el propio lote para saber qué había antes.
+        """
+        products = defaultdict(int)
+        warehouses = defaultdict(int)
+        for old, new in changes:
+            for state, sign in ((old, -1), (new, 1)):
+                if state is None:
+                    continue
+                self._track_availability(state, sign * state.cant, sign * state.reserved)
+                if not state.is_active:
+                    continue
+                for key in _scopes(state):
+                    delta = self.deltas[key]
+                    delta[2] += sign * state.cant
+                    delta[3] += sign * state.cant * state.unit_price
+                if state.product_id:
+                    products[(state.product_id, state.warehouse_id, state.store_id)] += sign
+                if state.warehouse_id:
+                    warehouses[(state.warehouse_id, state.warehouse_id, state.store_id)] += sign
+
+        self._track_presence(0, 'product_id', products)
+        self._track_presence(1, 'warehouse_id', warehouses)
+
+    def _track_presence(self, index, field, changes):
+        """
+        changes: {(valor, warehouse_id, store_id): stocks activos añadidos -
+        quitados por el lote}. Suma o resta 1 al conteo distinto de cada
+        ámbito donde el valor aparece o desaparece.
+        """
+        values = sorted({value for (value, _, _), count in changes.items() if count})
+        after = defaultdict(int)
+        for start in range(0, len(values), PRESENCE_BATCH_SIZE):
+            rows = Stock.objects.filter(
+                is_active=True, **{f'{field}__in': values[start:start + PRESENCE_BATCH_SIZE]}
+            ).values_list(field, 'warehouse_id', 'warehouse__store_id').annotate(count=Count('id')).order_by()
+            for value, warehouse_id, store_id, count in rows:
+                after[(value, warehouse_id, store_id)] += count
+
+        presence = defaultdict(lambda: [0, 0])
+        for entry in set(after) | set(changes):
+            value, warehouse_id, store_id = entry
+            state = StockState(None, None, warehouse_id, store_id, 0, 0, True, 0)
+            for key in _scopes(state):
+                counts = presence[(key, value)]
+                counts[0] += after[entry] - changes.get(entry, 0)
+                counts[1] += after[entry]
+        for (key, _), (before, now) in presence.items():
+            if (before > 0) != (now > 0):
+                self.deltas[key][index] += 1 if now > 0 else -1
+
+    def track_warehouse_store(self, warehouse_id, old_store_id, new_store_id):
+        """
+        Un almacén cambia de tienda (o la pierde, old/new None): sus totales
+        pasan de una tienda a la otra. Un producto del almacén solo cuenta en
+        una tienda si ningún otro almacén de ella lo tiene.
+        """
+        totals = _warehouse_totals(warehouse_id)
+        if totals is None:
+            return
+        products, quantity, value = totals
+        for store_id, sign in ((old_store_id, -1), (new_store_id, 1)):
+            if store_id is None:
+                continue
+            shared = set(
+                Stock.objects.filter(
+                    is_active=True, warehouse__store_id=store_id, product_id__in=products
+                ).exclude(warehouse_id=warehouse_id).values_list('product_id', flat=True).distinct()
+            )
+            delta = self.deltas[('store', store_id)]
+            delta[0] += sign * len(products - shared)
+            delta[1] += sign
+            delta[2] += sign * quantity
+            delta[3] += sign * value
+
+    def track_warehouse_removed(self, warehouse_id, store_id):
+        """
+        Se borra un almacén: sus stocks se quedan sin almacén (SET_NULL), siguen
+        en el total global pero salen de su tienda. La fila del almacén se borra
+        aparte y las de product_availability caen en cascada.
+        """
+        if _warehouse_totals(warehouse_id) is None:
+            return
+        self.track_warehouse_store(warehouse_id, store_id, None)
+        self.deltas[GLOBAL][1] -= 1
+
+    def track_product_removed(self, product_id):
+        """
+        Se borra un producto: sus stocks se quedan sin producto (SET_NULL) y
+        el producto deja de contar en cada ámbito donde tenía stock activo.
+        """
+        scopes = set()
+        for warehouse_id, store_id in Stock.objects.filter(
+            is_active=True, product_id=product_id
+        ).values_list('warehouse_id', 'warehouse__store_id').distinct():
+            scopes.update(_scopes(StockState(None, product_id, warehouse_id, store_id, 0, 0, True, 0)))
+        for key in scopes:
+            self.deltas[key][0] -= 1
+
+    def _others(self, key, field, value, pk):
+        return Stock.objects.filter(
+            is_active=True, **{**_scope_filter(*key), field: value}
+        ).exclude(pk=pk).exists()
+
+    def flush(self):
+        """
+        Aplica los deltas acumulados. Las filas se actualizan en orden para
+        que transacciones concurrentes las bloqueen siempre en la misma
+        secuencia. Si el resumen global aún no existe no se escribe nada: se
+        construirá completo con rebuild_summaries().
+        """
+        deltas = {key: delta for key, delta in self.deltas.items() if any(delta)}
+        availability = {key: delta for key, delta in self.availability.items() if any(delta)}
+        self.deltas.clear()
+        self.availability.clear()
+        if not deltas and not availability:
+            return
+
+        deltas.setdefault(GLOBAL, [0, 0, 0, Decimal('0')])
+        if not self._flush_summaries(deltas):
+            return
+        keys = sorted(availability)
+        for start in range(0, len(keys), AVAILABILITY_BATCH_SIZE):
+            self._flush_availability({key: availability[key] for key in keys[start:start + AVAILABILITY_BATCH_SIZE]})
+
+    def _flush_availability(self, deltas):
+        """
+        Un UPDATE ... SET quantity = quantity + CASE ... END por lote. Si falta
+        alguna fila se crea a cero (ignorando las que otra transacción haya
+        creado a la vez) y se le suma su delta con otro UPDATE.
+        """
+        if _add_availability(deltas) == len(deltas):
+            return
+        existing = set(
+            _availability_rows(deltas).values_list('product_id', 'warehouse_id')
+        )
+        missing = {key: delta for key, delta in deltas.items() if key not in existing}
+        ProductAvailability.objects.bulk_create([
+            ProductAvailability(product_id=product_id, warehouse_id=warehouse_id)
+            for (product_id, warehouse_id) in missing
+        ], ignore_conflicts=True)
+        _add_availability(missing)
+
+    def _flush_summaries(self, deltas):
+        """Devuelve False si el resumen no está construido (no se escribió nada)"""
+        for (scope, scope_id) in sorted(deltas):
+            products, warehouses, quantity, value = deltas[(scope, scope_id)]
+            updated = InventorySummary.objects.filter(scope=scope, scope_id=scope_id).update(
+                total_products=F('total_products') + products,
+                total_warehouses=F('total_warehouses') + warehouses,
+                total_quantity=F('total_quantity') + quantity,
+                total_value=F('total_value') + value,
+            )
+            if updated:
+                continue
+            if (scope, scope_id) == GLOBAL:
+                return False
+            try:
+                with transaction.atomic():
+                    InventorySummary.objects.create(
+                        scope=scope, scope_id=scope_id,
+                        total_products=products, total_warehouses=warehouses,
+                        total_quantity=quantity, total_value=value,
+                    )
+            except IntegrityError:
+                InventorySummary.objects.filter(scope=scope, scope_id=scope_id).update(
+                    total_products=F('total_products') + products,
+                    total_warehouses=F('total_warehouses') + warehouses,
+                    total_quantity=F('total_quantity') + quantity,
+                    total_value=F('total_value') + value,
+                )
+        return True
+
+
+def _warehouse_totals(warehouse_id):
+    """(productos, cantidad, valor) de los stocks activos del almacén, o None si no tiene"""
+    rows = list(
+        Stock.objects.filter(is_active=True, warehouse_id=warehouse_id).values('product_id').annotate(
+            quantity=Sum('cant'),
+            value=Sum(F('cant') * F('unit_price'), output_field=DecimalField()),
+        ).order_by()
+    )
+    if not rows:
+        return None
+    return (
+        {row['product_id'] for row in rows if row['product_id'] is not None},
+        sum(row['quantity'] for row in rows),
+        sum((row['value'] for row in rows), Decimal('0')),
+    )
+
+
+def _availability_rows(keys):
+    condition = Q()
+    for (product_id, warehouse_id) in keys:
+        condition |= Q(product_id=product_id, warehouse_id=warehouse_id)
+    return ProductAvailability.objects.filter(condition)
+
+
+def _add_availability(deltas):
+    """Suma {(product_id, warehouse_id): [cantidad, reservada]} en un UPDATE; devuelve las filas tocadas"""
+    updates = {}
+    for index, field in ((0, 'quantity'), (1, 'reserved')):
+        whens = [
+            When(product_id=product_id, warehouse_id=warehouse_id, then=Value(delta[index]))
+            for (product_id, warehouse_id), delta in deltas.items() if delta[index]
+        ]
+        if whens:
+            updates[field] = F(field) + Case(*whens, default=Value(0), output_field=BigIntegerField())
+    return _availability_rows(deltas).update(**updates)
+
+
+def compute_summaries():
+    """Calcula los totales desde la tabla stock. Devuelve {(scope, id): dict}"""
+    aggregates = {
+        'total_products': Count('product', distinct=True),
+        'total_warehouses': Count('warehouse', distinct=True),
+        'total_quantity': Coalesce(Sum('cant'), Value(0)),
+        'total_value': Coalesce(
+            Sum(F('cant') * F('unit_price'), output_field=DecimalField()),
+            Value(Decimal('0')), output_field=DecimalField()
+        ),
+    }
+    active = Stock.objects.filter(is_active=True)
+    summaries = {GLOBAL: active.aggregate(**aggregates)}
+    for scope, field in (('warehouse', 'warehouse'), ('store', 'warehouse__store')):
+        rows = active.filter(**{f'{field}__isnull': False}).values(field).annotate(**aggregates).order_by()
+        for row in rows:
+            summaries[(scope, row.pop(field))] = row
+    return summaries
+
+
+def compute_availability():
+    """Calcula {(product_id, warehouse_id): (cantidad, reservada)} desde la tabla stock"""
+    rows = Stock.objects.filter(
+        is_active=True, product__isnull=False, warehouse__isnull=False
+    ).values('product', 'warehouse').annotate(quantity=Sum('cant'), reserved=Sum('reserved')).order_by()
+    return {(row['product'], row['warehouse']): (row['quantity'], row['reserved']) for row in rows}
+
+
+def _lock_summary_tables():
+    """
+    Bloquea inventory_summary y product_availability hasta el final de la
+    transacción (PostgreSQL): los flush() concurrentes esperan y las
+    lecturas siguen permitidas. En SQLite las escrituras ya se serializan.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    qn = connection.ops.quote_name
+    tables = ', '.join(qn(model._meta.db_table) for model in (InventorySummary, ProductAvailability))
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {tables} IN EXCLUSIVE MODE")
+
+
+def rebuild_summaries():
+    """
+    Reemplaza el contenido de inventory_summary y product_availability por el
+    cálculo completo. Cálculo y reemplazo van en la misma transacción con
+    las tablas bloqueadas: un flush() concurrente espera y aplica su delta
+    sobre el resultado, o ya confirmó y su cambio entra en el cálculo.
+    """
+    with transaction.atomic():
+        _lock_summary_tables()
+        summaries = compute_summaries()
+        availability = compute_availability()
+        InventorySummary.objects.all().delete()
+        InventorySummary.objects.bulk_create([
+            InventorySummary(scope=scope, scope_id=scope_id, **values)
+            for (scope, scope_id), values in summaries.items()
+        ])
+        ProductAvailability.objects.all().delete()
+        ProductAvailability.objects.bulk_create([
+            ProductAvailability(
+                product_id=product_id, warehouse_id=warehouse_id, quantity=quantity, reserved=reserved
+            )
+            for (product_id, warehouse_id), (quantity, reserved) in availability.items()
+        ], batch_size=1000)
+    return summaries
+
+
+def get_summary(scope='global', scope_id=0):
+    """
+    Lee una fila del resumen (la migración 0015 lo construye y
+    SummaryTracker lo mantiene); un ámbito sin fila tiene todo a cero.
+    """
+    summary = InventorySummary.objects.filter(scope=scope, scope_id=scope_id).first()
+    if summary is None:
+        return {'total_products': 0, 'total_warehouses': 0, 'total_quantity': 0, 'total_value': 0}
+    return {
+        'total_products': summary.total_products,
+        'total_warehouses': summary.total_warehouses,
+        'total_quantity': summary.total_quantity,
+        'total_value': summary.total_value,
+    }
+
+
+def get_availability(product_ids):
+    """
+    Disponibilidad de varios productos leída de product_availability:
+    {product_id: {'total': n, 'available': n, 'warehouses': [...]}}, donde
+    available descuenta las reservas vivas. No consulta la tabla stock ni
+    escribe: la tabla la construye la migración 0015 y la mantiene
+    SummaryTracker.
+    """
+    availability = {product_id: {'total': 0, 'available': 0, 'warehouses': []} for product_id in product_ids}
+    rows = ProductAvailability.objects.filter(
+        product_id__in=product_ids, quantity__gt=0
+    ).values(
+        'product_id', 'warehouse_id', 'warehouse__name', 'quantity', 'reserved'
+    ).order_by('product_id', 'warehouse_id')
+    for row in rows:
+        entry = availability[row['product_id']]
+        available = row['quantity'] - row['reserved']
+        entry['total'] += row['quantity']
+        entry['available'] += available
+        entry['warehouses'].append({
+            'warehouse': row['warehouse_id'],
+            'warehouse_name': row['warehouse__name'],
+            'quantity': row['quantity'],
+            'reserved': row['reserved'],
+            'available': available,
+        })
+    return availability
@@ -0,0 +1,44 @@
+from django.db.models.signals import pre_save, pre_delete
+
+from apps.inventory.models import Store, Warehouse, InventorySummary
+from apps.inventory.services.summary_service import SummaryTracker
+from apps.products.models import Product
+
+
+# Los stocks guardan warehouse y product con SET_NULL: al borrar o mover un
+# almacén o borrar un producto los stocks no pasan por sus rutas de
+# escritura, así que el resumen se corrige aquí, en la misma transacción
+def track_warehouse_store(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    old_store_id = Warehouse.objects.filter(pk=instance.pk).values_list('store_id', flat=True).first()
+    if old_store_id == instance.store_id:
+        return
+    tracker = SummaryTracker()
+    tracker.track_warehouse_store(instance.pk, old_store_id, instance.store_id)
+    tracker.flush()
+
+
+def track_warehouse_removed(sender, instance, **kwargs):
+    tracker = SummaryTracker()
+    tracker.track_warehouse_removed(instance.pk, instance.store_id)
+    tracker.flush()
+    InventorySummary.objects.filter(scope='warehouse', scope_id=instance.pk).delete()
+
+
+def track_store_removed(sender, instance, **kwargs):
+    # Sus almacenes se quedan sin tienda; el total global no cambia
+    InventorySummary.objects.filter(scope='store', scope_id=instance.pk).delete()
+
+
+def track_product_removed(sender, instance, **kwargs):
+    tracker = SummaryTracker()
+    tracker.track_product_removed(instance.pk)
+    tracker.flush()
+
+
+def connect_summary_tracking():
+    pre_save.connect(track_warehouse_store, sender=Warehouse, dispatch_uid='summary_warehouse_store')
+    pre_delete.connect(track_warehouse_removed, sender=Warehouse, dispatch_uid='summary_warehouse_removed')
+    pre_delete.connect(track_store_removed, sender=Store, dispatch_uid='summary_store_removed')
+    pre_delete.connect(track_product_removed, sender=Product, dispatch_uid='summary_product_removed')
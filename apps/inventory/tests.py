@@ -1,3 +1,931 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, DatabaseError
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User
+from apps.core.models import IdempotencyKey
+from apps.inventory.models import (
+    Store, Warehouse, Stock, StockMovement, StockAlert, StockReservation, InventorySummary, ProductAvailability
+)
+from apps.inventory.api.serializers import stock_serializer
+from apps.inventory.api.serializers.stock_serializer import StockSerializer
+from apps.inventory.services import reservation_service, stock_service
+from apps.inventory.services import import_service
+from apps.inventory.services.import_service import import_csv, IMPORT_MOTIVE
+from apps.inventory.services.summary_service import (
+    compute_summaries, compute_availability, rebuild_summaries, get_summary
+)
+from apps.products.models import Product
+from apps.products.services.category_service import CATEGORY_TREE_CACHE
+from utils.cache.cache import get_version
+
+
+class InventoryTestMixin:
+    """Usuario del grupo admin, dos almacenes y un stock de 10 unidades"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='admin@test.com', password='x', first_name='Ana', last_name='Diaz')
+        cls.user.groups.add(Group.objects.get_or_create(name='admin')[0])
+        cls.store = Store.objects.create(name='Tienda', address='x')
+        cls.warehouse = Warehouse.objects.create(store=cls.store, name='Central', address='x')
+        cls.other_warehouse = Warehouse.objects.create(store=cls.store, name='Norte', address='x')
+        cls.product = Product.objects.create(code='P1', slug='p1', name='Producto 1', unit_price=10)
+        cls.stock = Stock.objects.create(
+            code='S-P1', product=cls.product, warehouse=cls.warehouse, cant=10, unit_price=5
+        )
+        rebuild_summaries()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertSummaryIsConsistent(self):
+        """El resumen mantenido coincide con el cálculo completo (sin filas vacías)"""
+        stored = {
+            (row.scope, row.scope_id): {
+                'total_products': row.total_products,
+                'total_warehouses': row.total_warehouses,
+                'total_quantity': row.total_quantity,
+                'total_value': row.total_value,
+            }
+            for row in InventorySummary.objects.all()
+            if row.total_warehouses or (row.scope, row.scope_id) == ('global', 0)
+        }
+        self.assertEqual(stored, compute_summaries())
+        self.assertEqual(
+            {
+                (row.product_id, row.warehouse_id): (row.quantity, row.reserved)
+                for row in ProductAvailability.objects.all() if row.quantity or row.reserved
+            },
+            {key: value for key, value in compute_availability().items() if any(value)}
+        )
+
+    def create_stocks(self, count, cant=10):
+        return Stock.objects.bulk_create([
+            Stock(code=f'B-{index}', product=self.product, warehouse=self.warehouse, cant=cant, unit_price=5)
+            for index in range(count)
+        ])
+
+
+class AdjustStockTests(InventoryTestMixin, APITestCase):
+
+    def url(self, stock):
+        return f'/inventory/stocks/{stock.pk}/adjust_stock/'
+
+    def test_adjustment_updates_quantity_and_records_movement(self):
+        response = self.client.post(self.url(self.stock), {'adjustment': -3, 'motive': 'Rotura'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['new_quantity'], 7)
+        movement = StockMovement.objects.get(pk=response.data['movement_id'])
+        self.assertEqual((movement.stock_from_prev_cant, movement.stock_from_new_cant), (10, 7))
+
+    def test_zero_adjustment_is_a_no_op(self):
+        response = self.client.post(self.url(self.stock), {'adjustment': 0}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['movement_id'])
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_unknown_stock_returns_404(self):
+        for pk in ('999999', 'abc'):
+            response = self.client.post(f'/inventory/stocks/{pk}/adjust_stock/', {'adjustment': 1}, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_quantity_cannot_go_negative(self):
+        response = self.client.post(self.url(self.stock), {'adjustment': -11}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'La cantidad no puede ser negativa')
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 10)
+
+    def test_non_integer_adjustment_is_rejected(self):
+        for adjustment in (2.9, '2.9', 'abc', None):
+            response = self.client.post(self.url(self.stock), {'adjustment': adjustment}, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('adjustment', response.data)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 10)
+
+    def test_adjustment_is_a_single_conditional_update(self):
+        # Incluye los UPDATE del resumen (global, almacén, tienda) y de product_availability
+        with self.assertNumQueries(10):
+            self.client.post(self.url(self.stock), {'adjustment': 2}, format='json')
+
+
+    def test_quantity_cannot_go_below_reserved(self):
+        reservation_service.reserve_stock(self.stock.pk, 8)
+
+        response = self.client.post(self.url(self.stock), {'adjustment': -5}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 10)
+
+class BulkAdjustTests(InventoryTestMixin, APITestCase):
+    url = '/inventory/stocks/bulk_adjust/'
+
+    def lines(self, stocks, adjustment=2):
+        return [{'stock_id': stock.pk, 'adjustment': adjustment, 'motive': 'Recuento'} for stock in stocks]
+
+    def test_applies_every_line_with_its_movement(self):
+        stocks = self.create_stocks(3)
+
+        response = self.client.post(self.url, self.lines(stocks), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']], ['ok'] * 3)
+        self.assertEqual(set(Stock.objects.filter(code__startswith='B-').values_list('cant', flat=True)), {12})
+        self.assertEqual(StockMovement.objects.count(), 3)
+
+    def test_lines_on_the_same_stock_accumulate(self):
+        response = self.client.post(self.url, self.lines([self.stock, self.stock], adjustment=-4), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(result['prev_cant'], result['new_cant']) for result in response.data['results']], [(10, 6), (6, 2)]
+        )
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 2)
+
+    def test_one_invalid_line_rejects_the_whole_batch(self):
+        stocks = self.create_stocks(2)
+        lines = self.lines(stocks) + [{'stock_id': stocks[0].pk, 'adjustment': -50}]
+
+        response = self.client.post(self.url, lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']], ['ok', 'ok', 'error']
+        )
+        self.assertEqual(set(Stock.objects.filter(code__startswith='B-').values_list('cant', flat=True)), {10})
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_non_integer_adjustment_is_rejected(self):
+        response = self.client.post(self.url, [{'stock_id': self.stock.pk, 'adjustment': 1.5}], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 10)
+
+    def test_query_count_does_not_depend_on_the_number_of_lines(self):
+        few = self.create_stocks(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, self.lines(few), format='json')
+
+        Stock.objects.filter(pk__in=[stock.pk for stock in few]).delete()
+        # 30 líneas caben en un INSERT de movimientos incluso con el límite de parámetros de SQLite
+        many = self.create_stocks(30)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.post(self.url, self.lines(many), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+    def test_summary_follows_the_adjustments(self):
+        stocks = self.create_stocks(3)
+        rebuild_summaries()
+
+        self.client.post(self.url, self.lines(stocks, adjustment=5), format='json')
+
+        self.assertEqual(get_summary()['total_quantity'], 10 + 3 * 15)
+        self.assertEqual(
+            ProductAvailability.objects.get(product=self.product, warehouse=self.warehouse).quantity, 10 + 3 * 15
+        )
+
+
+class SummaryTests(InventoryTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_store = Store.objects.create(name='Otra', address='x')
+        self.other_product = Product.objects.create(code='P2', slug='p2', name='Producto 2', unit_price=3)
+        Stock.objects.create(code='S-P1-N', product=self.product, warehouse=self.other_warehouse, cant=4, unit_price=2)
+        Stock.objects.create(code='S-P2-N', product=self.other_product, warehouse=self.other_warehouse, cant=3, unit_price=1)
+        rebuild_summaries()
+
+    def test_warehouse_moved_to_another_store(self):
+        response = self.client.patch(
+            f'/inventory/warehouses/{self.other_warehouse.pk}/', {'store': self.other_store.pk}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertSummaryIsConsistent()
+        self.assertEqual(get_summary('store', self.other_store.pk)['total_quantity'], 7)
+
+    def test_warehouse_deleted(self):
+        self.other_warehouse.delete()
+
+        self.assertSummaryIsConsistent()
+        self.assertEqual(get_summary('store', self.store.pk)['total_products'], 1)
+
+    def test_store_deleted(self):
+        self.store.delete()
+
+        self.assertSummaryIsConsistent()
+
+    def test_product_deleted(self):
+        self.product.delete()
+
+        self.assertSummaryIsConsistent()
+        self.assertEqual(get_summary()['total_products'], 1)
+
+    def test_scope_must_be_an_integer(self):
+        for param in ('warehouse', 'store'):
+            response = self.client.get('/inventory/stocks/inventory_summary/', {param: 'abc'})
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TransferTests(InventoryTestMixin, APITestCase):
+    url = '/inventory/stocks/transfer/'
+
+    def setUp(self):
+        super().setUp()
+        self.destination = Stock.objects.create(
+            code='S-P1-N', product=self.product, warehouse=self.other_warehouse, cant=1, unit_price=5
+        )
+
+    def test_transfer_between_stocks(self):
+        response = self.client.post(
+            self.url, {'stock_from': self.stock.pk, 'stock_to': self.destination.pk, 'cant': 4}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.stock.refresh_from_db()
+        self.destination.refresh_from_db()
+        self.assertEqual((self.stock.cant, self.destination.cant), (6, 5))
+        movement = StockMovement.objects.get()
+        self.assertEqual((movement.stock_from_id, movement.stock_to_id, movement.cant), (self.stock.pk, self.destination.pk, 4))
+
+    def test_opposite_transfers_in_one_batch(self):
+        lines = [
+            {'stock_from': self.stock.pk, 'stock_to': self.destination.pk, 'cant': 10},
+            {'stock_from': self.destination.pk, 'stock_to': self.stock.pk, 'cant': 11},
+        ]
+
+        response = self.client.post(self.url, lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.stock.refresh_from_db()
+        self.destination.refresh_from_db()
+        self.assertEqual((self.stock.cant, self.destination.cant), (11, 0))
+
+    def test_stocks_are_locked_in_pk_order(self):
+        lines = [
+            {'stock_from': self.destination.pk, 'stock_to': self.stock.pk, 'cant': 1},
+            {'stock_from': self.stock.pk, 'stock_to': self.destination.pk, 'cant': 1},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, lines, format='json')
+
+        locks = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "stock"' in query['sql']
+            and 'ORDER BY "stock"."id" ASC' in query['sql']
+        ]
+        self.assertEqual(len(locks), 1)
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', locks[0])
+
+    def test_invalid_line_rolls_back_the_batch(self):
+        lines = [
+            {'stock_from': self.stock.pk, 'stock_to': self.destination.pk, 'cant': 2},
+            {'stock_from': self.destination.pk, 'stock_to': self.stock.pk, 'cant': 50},
+        ]
+
+        response = self.client.post(self.url, lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results'][1]['error'], 'Cantidad insuficiente en el stock de origen')
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_reserved_quantity_cannot_be_transferred(self):
+        reservation_service.reserve_stock(self.stock.pk, 8)
+
+        response = self.client.post(
+            self.url, {'stock_from': self.stock.pk, 'stock_to': self.destination.pk, 'cant': 3}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_warehouse_destination_is_created_with_a_free_code(self):
+        warehouse = Warehouse.objects.create(store=self.store, name='Sur', address='x')
+        other = Product.objects.create(code='P2', slug='p2', name='Producto 2', unit_price=3)
+        Stock.objects.create(
+            code=f'S-P1-{warehouse.pk}', product=other, warehouse=warehouse, cant=0, unit_price=3
+        )
+
+        response = self.client.post(
+            self.url, {'stock_from': self.stock.pk, 'warehouse_to': warehouse.pk, 'cant': 3}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        created = Stock.objects.get(product=self.product, warehouse=warehouse)
+        self.assertEqual((created.code, created.cant), (f'S-P1-{warehouse.pk}-2', 3))
+
+    def test_explicit_destination_code_already_in_use(self):
+        warehouse = Warehouse.objects.create(store=self.store, name='Sur', address='x')
+
+        response = self.client.post(
+            self.url,
+            {'stock_from': self.stock.pk, 'warehouse_to': warehouse.pk, 'code': 'S-P1-N', 'cant': 3},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results'][0]['error'], 'Ya existe un stock con el código S-P1-N')
+        self.assertFalse(Stock.objects.filter(warehouse=warehouse).exists())
+
+    def test_inactive_stock_is_not_used_as_destination(self):
+        warehouse = Warehouse.objects.create(store=self.store, name='Sur', address='x')
+        inactive = Stock.objects.create(
+            code='S-P1-OFF', product=self.product, warehouse=warehouse, cant=0, unit_price=5, is_active=False
+        )
+
+        response = self.client.post(
+            self.url, {'stock_from': self.stock.pk, 'warehouse_to': warehouse.pk, 'cant': 3}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['results'][0]['stock_to'], inactive.pk)
+        inactive.refresh_from_db()
+        self.assertEqual(inactive.cant, 0)
+        self.assertEqual(Stock.objects.get(product=self.product, warehouse=warehouse, is_active=True).cant, 3)
+
+    def transfer_racing(self, warehouse, product):
+        """Transferencia en la que otra escritura crea el código del destino tras consultarlo"""
+        unique_code = stock_service._unique_code
+
+        def insert_first(base, taken):
+            code = unique_code(base, taken)
+            Stock.objects.create(code=code, product=product, warehouse=warehouse, cant=0, unit_price=5)
+            return code
+
+        with mock.patch.object(stock_service, '_unique_code', side_effect=insert_first):
+            return self.client.post(
+                self.url, {'stock_from': self.stock.pk, 'warehouse_to': warehouse.pk, 'cant': 3}, format='json'
+            )
+
+    def test_destination_created_concurrently_is_reused(self):
+        warehouse = Warehouse.objects.create(store=self.store, name='Sur', address='x')
+
+        response = self.transfer_racing(warehouse, self.product)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        destination = Stock.objects.get(product=self.product, warehouse=warehouse)
+        self.assertEqual((destination.pk, destination.cant), (response.data['results'][0]['stock_to'], 3))
+
+    def test_destination_code_taken_concurrently_by_another_product(self):
+        warehouse = Warehouse.objects.create(store=self.store, name='Sur', address='x')
+        other = Product.objects.create(code='P2', slug='p2', name='Producto 2', unit_price=3)
+
+        response = self.transfer_racing(warehouse, other)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['results'][0]['error'], f'Ya existe un stock con el código S-P1-{warehouse.pk}'
+        )
+
+
+class LowStockTests(InventoryTestMixin, APITestCase):
+    """threshold por defecto 5: el stock S-P1 empieza por encima (10)"""
+
+    def adjust(self, stock, adjustment):
+        return self.client.post(
+            f'/inventory/stocks/{stock.pk}/adjust_stock/', {'adjustment': adjustment}, format='json'
+        )
+
+    def test_crossing_the_threshold_emits_one_alert_each_way(self):
+        self.adjust(self.stock, -6)
+        self.adjust(self.stock, -1)
+        self.adjust(self.stock, 3)
+
+        alerts = list(StockAlert.objects.order_by('pk').values_list('kind', 'prev_cant', 'new_cant', 'threshold'))
+        self.assertEqual(alerts, [('1', 10, 4, 5), ('2', 3, 6, 5)])
+
+    def test_bulk_adjust_emits_alerts_for_crossing_lines_only(self):
+        stocks = self.create_stocks(2)
+        lines = [
+            {'stock_id': stocks[0].pk, 'adjustment': -8},
+            {'stock_id': stocks[1].pk, 'adjustment': -2},
+        ]
+
+        self.client.post('/inventory/stocks/bulk_adjust/', lines, format='json')
+
+        self.assertEqual(list(StockAlert.objects.values_list('stock_id', 'kind')), [(stocks[0].pk, '1')])
+
+    def test_raising_the_threshold_emits_an_alert(self):
+        response = self.client.patch(f'/inventory/stocks/{self.stock.pk}/', {'threshold': 12}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        alert = StockAlert.objects.get()
+        self.assertEqual((alert.kind, alert.prev_cant, alert.new_cant, alert.threshold), ('1', 10, 10, 12))
+
+    def test_inactive_stock_emits_no_alert(self):
+        Stock.objects.filter(pk=self.stock.pk).update(is_active=False)
+
+        self.adjust(self.stock, -8)
+
+        self.assertFalse(StockAlert.objects.exists())
+
+    def test_low_stock_lists_active_stocks_under_the_threshold(self):
+        low = self.create_stocks(2, cant=3)
+        Stock.objects.filter(pk=low[1].pk).update(is_active=False)
+
+        response = self.client.get('/inventory/stocks/low_stock/')
+        by_warehouse = self.client.get(f'/inventory/warehouses/{self.warehouse.pk}/low_stock/')
+
+        self.assertEqual([row['id'] for row in response.data['results']], [low[0].pk])
+        self.assertEqual([row['id'] for row in by_warehouse.data['results']], [low[0].pk])
+
+    def test_events_feed_resumes_after_the_last_id(self):
+        for adjustment in (-6, 3, -3):
+            self.adjust(self.stock, adjustment)
+        url = '/inventory/stocks/low_stock_events/'
+
+        first = self.client.get(url, {'limit': 2})
+        rest = self.client.get(url, {'after': first.data['last_id']})
+        empty = self.client.get(url, {'after': rest.data['last_id']})
+
+        self.assertEqual([event['kind'] for event in first.data['results']], ['1', '2'])
+        self.assertEqual([event['kind'] for event in rest.data['results']], ['1'])
+        self.assertEqual((empty.data['results'], empty.data['last_id']), ([], rest.data['last_id']))
+
+    def test_events_feed_rejects_a_non_integer_cursor(self):
+        response = self.client.get('/inventory/stocks/low_stock_events/', {'after': 'abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExpiryTests(InventoryTestMixin, APITestCase):
+    """Stocks de P2 con caducidades distintas; S-P1 no caduca"""
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.other = Product.objects.create(code='P2', slug='p2', name='Producto 2', unit_price=3)
+        self.stocks = {
+            name: Stock.objects.create(
+                code=f'E-{name}', product=self.other, warehouse=warehouse, cant=5, unit_price=2,
+                expire_date=self.today + datetime.timedelta(days=days) if days is not None else None
+            )
+            for name, warehouse, days in (
+                ('expired', self.warehouse, -1),
+                ('late', self.warehouse, 20),
+                ('soon', self.other_warehouse, 2),
+                ('today', self.warehouse, 0),
+                ('never', self.warehouse, None),
+            )
+        }
+
+    def ids(self, *names):
+        return [self.stocks[name].pk for name in names]
+
+    def test_fefo_takes_the_earliest_expiry_first(self):
+        Stock.objects.filter(pk=self.stocks['soon'].pk).update(reserved=2)
+
+        response = self.client.get('/inventory/stocks/fefo/', {'product': self.other.pk, 'quantity': 9})
+
+        picks = response.data['picks']
+        self.assertEqual([pick['stock_id'] for pick in picks], self.ids('today', 'soon', 'late'))
+        self.assertEqual([pick['take'] for pick in picks], [5, 3, 1])
+        self.assertEqual((response.data['allocated'], response.data['shortage']), (9, 0))
+
+    def test_fefo_leaves_stock_without_expiry_last_and_reports_the_shortage(self):
+        response = self.client.get(
+            '/inventory/stocks/fefo/', {'product': self.other.pk, 'quantity': 30, 'warehouse': self.warehouse.pk}
+        )
+
+        picks = response.data['picks']
+        self.assertEqual([pick['stock_id'] for pick in picks], self.ids('today', 'late', 'never'))
+        self.assertEqual((response.data['allocated'], response.data['shortage']), (15, 15))
+
+    def test_fefo_requires_a_positive_integer_quantity(self):
+        for params in ({'product': self.other.pk}, {'product': self.other.pk, 'quantity': 'x'},
+                       {'product': self.other.pk, 'quantity': 0}):
+            response = self.client.get('/inventory/stocks/fefo/', params)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expiring_window(self):
+        response = self.client.get('/inventory/stocks/expiring/', {'days': 5})
+
+        self.assertEqual([row['id'] for row in response.data['results']], self.ids('today', 'soon'))
+        self.assertEqual(response.data['until'], self.today + datetime.timedelta(days=5))
+        self.assertEqual(
+            [(row['warehouse'], row['total_stocks'], row['total_quantity']) for row in response.data['warehouses']],
+            [(self.warehouse.pk, 1, 5), (self.other_warehouse.pk, 1, 5)]
+        )
+
+    def test_expiring_can_include_expired_stock(self):
+        response = self.client.get('/inventory/stocks/expiring/', {'days': 5, 'include_expired': 'true'})
+
+        self.assertEqual([row['id'] for row in response.data['results']], self.ids('expired', 'today', 'soon'))
+
+    def test_expiring_rejects_a_non_integer_window(self):
+        response = self.client.get('/inventory/stocks/expiring/', {'days': 'abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTests(InventoryTestMixin, APITestCase):
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_stock_selector_streams_a_json_array(self):
+        orphan = Stock.objects.create(code='S-X', warehouse=self.warehouse, cant=1, unit_price=1)
+
+        response = self.client.get('/inventory/stocks-filter/')
+
+        self.assertTrue(response.streaming)
+        self.assertNotIn('Content-Disposition', response)
+        self.assertEqual(json.loads(self.content(response)), [
+            {'id': self.stock.pk, 'code': 'S-P1', 'product': self.product.pk, 'product_name': 'Producto 1'},
+            {'id': orphan.pk, 'code': 'S-X', 'product': None, 'product_name': ''},
+        ])
+
+    def test_empty_stock_selector_is_an_empty_array(self):
+        Stock.objects.all().delete()
+
+        response = self.client.get('/inventory/stocks-filter/')
+
+        self.assertEqual(json.loads(self.content(response)), [])
+
+    def test_stock_export_formats(self):
+        csv_response = self.client.get('/inventory/stocks-filter/', {'output': 'csv'})
+        ndjson_response = self.client.get('/inventory/stocks/export/', {'output': 'ndjson'})
+        invalid = self.client.get('/inventory/stocks-filter/', {'output': 'xml'})
+
+        self.assertEqual(csv_response['Content-Disposition'], 'attachment; filename="stocks.csv"')
+        self.assertEqual(len(self.content(csv_response).splitlines()), 2)
+        self.assertEqual(json.loads(self.content(ndjson_response).splitlines()[0])['code'], 'S-P1')
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_movement_export_filters_by_date(self):
+        stock_service.adjust_stock(self.stock.pk, 2, self.user)
+        today = timezone.localdate()
+        url = '/inventory/movements-export/'
+
+        current = self.client.get(url, {'from': today.isoformat(), 'to': today.isoformat()})
+        future = self.client.get(url, {'from': (today + datetime.timedelta(days=1)).isoformat()})
+
+        self.assertEqual(len(self.content(current).splitlines()), 1)
+        self.assertEqual(self.content(future), '')
+
+    def test_movement_export_rejects_invalid_dates(self):
+        for params in ({'from': 'ayer'}, {'to': '2026-02-30'}):
+            response = self.client.get('/inventory/movements-export/', params)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReservationTests(InventoryTestMixin, APITestCase):
+    url = '/inventory/reservations/'
+
+    def reserve(self, quantity, **extra):
+        return self.client.post(self.url, {'stock': self.stock.pk, 'quantity': quantity, **extra}, format='json')
+
+    def test_reservation_holds_quantity_without_discounting_it(self):
+        response = self.reserve(4, reference='PED-1')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.stock.refresh_from_db()
+        self.assertEqual((self.stock.cant, self.stock.reserved), (10, 4))
+
+    def test_cannot_reserve_more_than_available(self):
+        self.reserve(7)
+
+        response = self.reserve(4)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Cantidad disponible insuficiente')
+
+    def test_confirm_turns_the_reservation_into_an_outgoing_movement(self):
+        reservation = self.reserve(4).data
+
+        response = self.client.post(f"{self.url}{reservation['id']}/confirm/", {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.stock.refresh_from_db()
+        self.assertEqual((self.stock.cant, self.stock.reserved), (6, 0))
+        self.assertTrue(StockMovement.objects.filter(pk=response.data['movement_id']).exists())
+
+    def test_release_returns_the_quantity(self):
+        reservation = self.reserve(4).data
+
+        response = self.client.post(f"{self.url}{reservation['id']}/release/", format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.stock.refresh_from_db()
+        self.assertEqual((self.stock.cant, self.stock.reserved), (10, 0))
+        response = self.client.post(f"{self.url}{reservation['id']}/confirm/", {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_expired_reservations_are_released(self):
+        reservation = reservation_service.reserve_stock(self.stock.pk, 3, ttl_seconds=60)
+        reservation_service.reserve_stock(self.stock.pk, 2, ttl_seconds=3600)
+
+        expired = reservation_service.expire_reservations(now=timezone.now() + datetime.timedelta(minutes=5))
+
+        self.assertEqual(expired, 1)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, reservation_service.EXPIRED)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.reserved, 2)
+
+    def test_expired_reservation_cannot_be_confirmed(self):
+        reservation = reservation_service.reserve_stock(self.stock.pk, 3)
+        StockReservation.objects.filter(pk=reservation.pk).update(expires_at=timezone.now())
+
+        response = self.client.post(f'{self.url}{reservation.pk}/confirm/', {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 10)
+
+    def test_reservations_are_reflected_in_the_availability(self):
+        reservation = self.reserve(4).data
+        self.reserve(1)
+        self.client.post(f"{self.url}{reservation['id']}/confirm/", {}, format='json')
+
+        self.assertSummaryIsConsistent()
+        availability = ProductAvailability.objects.get(product=self.product, warehouse=self.warehouse)
+        self.assertEqual((availability.quantity, availability.reserved), (6, 1))
+
+
+
+class IdempotencyTests(InventoryTestMixin, APITestCase):
+
+    def adjust(self, key, adjustment=-2):
+        return self.client.post(
+            f'/inventory/stocks/{self.stock.pk}/adjust_stock/', {'adjustment': adjustment},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.adjust('key-1')
+        second = self.adjust('key-1')
+
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 8)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_replay_is_a_single_lookup(self):
+        self.adjust('key-1')
+
+        with self.assertNumQueries(1):
+            self.adjust('key-1')
+
+    def test_same_key_with_another_body_is_rejected(self):
+        self.adjust('key-1')
+
+        response = self.adjust('key-1', adjustment=-3)
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 8)
+
+    def test_errors_are_replayed_too(self):
+        first = self.adjust('key-1', adjustment=-50)
+
+        second = self.adjust('key-1', adjustment=-50)
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_keys_are_scoped_to_the_user(self):
+        self.adjust('key-1')
+        other = User.objects.create_user(email='otro@test.com', password='x', first_name='Luis', last_name='Gil')
+        other.groups.add(Group.objects.get(name='admin'))
+        self.client.force_authenticate(other)
+
+        response = self.adjust('key-1')
+
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 6)
+
+    def test_expired_key_runs_the_request_again(self):
+        self.adjust('key-1')
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        self.adjust('key-1')
+
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 6)
+
+    def test_without_header_every_request_runs(self):
+        self.client.post(f'/inventory/stocks/{self.stock.pk}/adjust_stock/', {'adjustment': -2}, format='json')
+        self.client.post(f'/inventory/stocks/{self.stock.pk}/adjust_stock/', {'adjustment': -2}, format='json')
+
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 6)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class ImportTests(InventoryTestMixin, APITestCase):
+    header = 'code,name,unit_price,warehouse,stock_code,cant\n'
+
+    def run_import(self, rows, **kwargs):
+        return import_csv(io.StringIO(self.header + rows), user=self.user, **kwargs).as_dict()
+
+    def test_creates_and_updates_products_and_stocks(self):
+        report = self.run_import(
+            'N1,Nuevo,2.50,Central,S-N1,7\n'
+            'P1,Producto 1,10,Central,S-P1,12\n'
+        )
+
+        self.assertEqual((report['rows'], report['products'], report['stocks'], report['error_count']), (2, 2, 2, 0))
+        self.assertEqual(Stock.objects.get(code='S-N1').cant, 7)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 12)
+        self.assertEqual(get_summary()['total_quantity'], 19)
+
+    def test_quantity_changes_are_recorded_as_movements(self):
+        self.run_import('P1,Producto 1,10,Central,S-P1,4\n')
+
+        movement = StockMovement.objects.get()
+        self.assertEqual(movement.motive, IMPORT_MOTIVE)
+        self.assertEqual((movement.stock_from_prev_cant, movement.stock_from_new_cant), (10, 4))
+        self.assertEqual(movement.create_by_user_id, self.user.pk)
+
+    def test_invalid_rows_are_reported_without_aborting(self):
+        report = self.run_import(
+            'N1,Nuevo,abc,Central,S-N1,7\n'
+            'N2,Otro,3,Desconocido,S-N2,1\n'
+            'N3,Bueno,3,Central,S-N3,1\n'
+        )
+
+        self.assertEqual(
+            report['errors'],
+            [
+                {'line': 2, 'error': 'unit_price no es un número válido'},
+                {'line': 3, 'error': "Almacén 'Desconocido' no encontrado"},
+            ]
+        )
+        self.assertEqual(report['stocks'], 1)
+        self.assertTrue(Stock.objects.filter(code='S-N3').exists())
+
+    def test_repeated_stock_code_in_a_chunk(self):
+        report = self.run_import(
+            'N1,Nuevo,2,Central,S-N1,7\n'
+            'N2,Otro,2,Central,S-N1,3\n'
+        )
+
+        self.assertEqual(report['errors'], [{'line': 3, 'error': 'stock_code repetido en la línea 2'}])
+        self.assertEqual(Stock.objects.get(code='S-N1').cant, 7)
+
+    def test_stock_cannot_drop_below_reserved(self):
+        reservation_service.reserve_stock(self.stock.pk, 6)
+
+        report = self.run_import('P1,Producto 1,10,Central,S-P1,5\n')
+
+        self.assertEqual(
+            report['errors'], [{'line': 2, 'error': 'La cantidad no puede ser menor que la reservada (6)'}]
+        )
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.cant, 10)
+
+    def test_query_count_does_not_depend_on_the_number_of_rows(self):
+        def rows(start, count):
+            return ''.join(f'N{index},Nuevo {index},2,Central,S-N{index},1\n' for index in range(start, start + count))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.run_import(rows(0, 2))
+        # 40 filas caben en un INSERT de productos incluso con el límite de parámetros de SQLite
+        with self.assertNumQueries(len(queries)):
+            report = self.run_import(rows(100, 40))
+        self.assertEqual(report['stocks'], 40)
+
+    def test_upload_endpoint(self):
+        upload = SimpleUploadedFile('stocks.csv', (self.header + 'N1,Nuevo,2,Central,S-N1,7\n').encode())
+
+        response = self.client.post('/inventory/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stocks'], 1)
+
+    def test_summary_follows_each_chunk(self):
+        rebuild_summaries()
+        Warehouse.objects.create(store=Store.objects.create(name='Otra', address='x'), name='Sur', address='x')
+
+        self.run_import(
+            'N1,Nuevo,2,Sur,S-N1,7\n'
+            'N1,Nuevo,2,Sur,S-N1B,2\n'
+            'P1,Producto 1,10,Norte,S-P1,3\n'
+            'N2,Otro,3,Central,S-N2,0\n'
+            'N3,Tercero,3,Norte,S-N3,4\n',
+            chunk_size=2
+        )
+
+        self.assertSummaryIsConsistent()
+
+    def test_summary_is_kept_when_the_rows_are_retried_one_by_one(self):
+        rebuild_summaries()
+        entries = []
+        original = import_service._write
+
+        def failing_once(batch, now, user):
+            entries.append(batch)
+            if len(entries) == 1:
+                raise DatabaseError('lote rechazado')
+            return original(batch, now, user)
+
+        with mock.patch.object(import_service, '_write', failing_once):
+            report = self.run_import('N1,Nuevo,2,Central,S-N1,7\nP1,Producto 1,10,Norte,S-P1,3\n')
+
+        self.assertEqual(report['stocks'], 2)
+        self.assertSummaryIsConsistent()
+
+    def test_import_invalidates_the_category_tree(self):
+        version = get_version(CATEGORY_TREE_CACHE)
+
+        self.run_import('N1,Nuevo,2,Central,S-N1,7\n')
+
+        self.assertNotEqual(get_version(CATEGORY_TREE_CACHE), version)
+
+
+class StockListTests(InventoryTestMixin, APITestCase):
+    url = '/inventory/stocks/'
+
+    def test_rows_match_the_model_serializer(self):
+        Stock.objects.filter(pk=self.stock.pk).update(expire_date=datetime.date(2030, 1, 2))
+        self.stock.refresh_from_db()
+
+        row = self.client.get(self.url).data['results'][0]
+
+        expected = StockSerializer(Stock.objects.select_related('product', 'warehouse__store').get()).data
+        self.assertEqual(row, {field: expected[field] for field in row})
+        self.assertEqual(set(row), set(stock_serializer.STOCK_LIST_FIELDS))
+
+    def test_fields_parameter_trims_the_columns(self):
+        response = self.client.get(self.url, {'fields': 'code, cant,unknown'})
+
+        self.assertEqual(response.data['results'], [{'code': 'S-P1', 'cant': 10}])
+
+    def test_requested_fields_are_resolved_once_per_response(self):
+        self.create_stocks(4)
+
+        with mock.patch.object(
+            stock_serializer, 'requested_fields', wraps=stock_serializer.requested_fields
+        ) as resolve:
+            response = self.client.get(self.url, {'page_size': 5})
+
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(resolve.call_count, 1)
+
+
+class AvailabilityTests(InventoryTestMixin, APITestCase):
+    url = '/inventory/availability/'
+
+    def writes(self, queries):
+        return [query['sql'] for query in queries if query['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+
+    def test_reads_the_maintained_table(self):
+        rebuild_summaries()
+        # Creado sin pasar por SummaryTracker: la lectura no lo ve porque no consulta stock
+        Stock.objects.create(code='S-P1-N', product=self.product, warehouse=self.other_warehouse, cant=4, unit_price=5)
+        self.client.post(f'/inventory/stocks/{self.stock.pk}/adjust_stock/', {'adjustment': 2}, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'products': f'{self.product.pk},999'})
+
+        self.assertEqual(self.writes(queries), [])
+        entry = response.data[self.product.pk]
+        self.assertEqual((entry['total'], entry['available']), (12, 12))
+        self.assertEqual([row['warehouse'] for row in entry['warehouses']], [self.warehouse.pk])
+        self.assertEqual(response.data[999], {'total': 0, 'available': 0, 'warehouses': []})
+
+    def test_missing_summary_is_not_built_on_read(self):
+        InventorySummary.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'products': self.product.pk})
+            summary = self.client.get('/inventory/stocks/inventory_summary/')
+
+        self.assertEqual(self.writes(queries), [])
+        self.assertEqual(summary.data['total_quantity'], 0)
+        self.assertFalse(InventorySummary.objects.exists())
+
+    def test_invalid_product_list(self):
+        response = self.client.post(self.url, {'products': 'abc'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
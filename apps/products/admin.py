@@ -1,7 +1,8 @@
 from django.contrib import admin
-from apps.products.models import Product
+from apps.products.models import Product, ProductCounterShard
 
 # Register your models here.
 
 
 admin.site.register(Product)
+admin.site.register(ProductCounterShard)
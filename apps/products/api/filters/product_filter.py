@@ -0,0 +1,72 @@
+from django_filters import rest_framework as filters
+from apps.products.models import Product
+from apps.products.services.facet_service import price_band_q, in_stock_exists
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+class ProductFilter(filters.FilterSet):
+    """
+    Filtros del catálogo. Las facetas admiten varios valores separados por
+    comas (?brand=a,b&category=1,2&price_band=0-10,10-50).
+    """
+    brand = CharInFilter(field_name='brand')
+    category = NumberInFilter(field_name='category')
+    subcategory = NumberInFilter(field_name='subcategory')
+    price_band = CharInFilter(method='filter_price_band')
+    has_discount = filters.BooleanFilter(method='filter_has_discount')
+    in_stock = filters.BooleanFilter(method='filter_in_stock')
+    min_price = filters.NumberFilter(field_name='unit_price', lookup_expr='gte')
+    max_price = filters.NumberFilter(field_name='unit_price', lookup_expr='lte')
+
+    # Filtros que son facetas: se excluyen al calcular los conteos
+    facet_filters = ('brand', 'category', 'subcategory', 'price_band', 'has_discount', 'in_stock')
+
+    class Meta:
+        model = Product
+        fields = ['is_active']
+
+    def filter_price_band(self, queryset, name, value):
+        condition = price_band_q(None)
+        for band in value:
+            condition |= price_band_q(band)
+        return queryset.filter(condition)
+
+    def filter_has_discount(self, queryset, name, value):
+        return queryset.filter(discount__gt=0) if value else queryset.filter(discount__lte=0)
+
+    def filter_in_stock(self, queryset, name, value):
+        return queryset.filter(in_stock_exists() if value else ~in_stock_exists())
+
+    def selected_facets(self):
+        """{faceta: conjunto de valores} de las facetas presentes en la petición"""
+        if not self.is_valid():
+            return {}
+        selected = {}
+        for name in self.facet_filters:
+            value = self.form.cleaned_data.get(name)
+            if value is None or value == []:
+                continue
+            if name in ('category', 'subcategory'):
+                selected[name] = {int(item) for item in value}
+            elif name in ('has_discount', 'in_stock'):
+                selected[name] = {value}
+            else:
+                selected[name] = set(value)
+        return selected
+
+    def facet_base_queryset(self):
+        """Queryset con los filtros que no son facetas"""
+        queryset = self.queryset
+        if not self.is_valid():
+            return queryset
+        for name, value in self.form.cleaned_data.items():
+            if name not in self.facet_filters:
+                queryset = self.filters[name].filter(queryset, value)
+        return queryset
@@ -1,22 +1,24 @@
 from rest_framework import serializers
 from apps.products.models import Category, SubCategory, Product
 from django.db import models
+from utils.images.images import srcset, thumbnail_url
 
 class SubCategorySerializer(serializers.ModelSerializer):
     
     full_path = serializers.SerializerMethodField()
+    products_count = serializers.SerializerMethodField()
     
     class Meta:
         model = SubCategory
-        fields = ['id', 'name',  'created_at', 'created_at']
+        fields = ['id', 'category', 'name', 'full_path', 'products_count', 'created_at', 'updated_at']
         read_only_fields = ['products_count', 'full_path']
 
     def get_products_count(self, obj):
-        """Obtener cantidad de productos en la subcategoría"""
-        return obj.products_count
+        """Productos activos de la subcategoría (anotación products_count del queryset)"""
+        return getattr(obj, 'products_count', None)
 
     def get_full_path(self, obj):
-        """Obtener ruta completa: Categoría → Subcategoría"""
+        """Obtener ruta completa: Categoría → Subcategoría (requiere category cargada)"""
         return f"{obj.category.name} → {obj.name}"
 
 class SubCategoryCreateSerializer(serializers.ModelSerializer):
@@ -39,11 +41,13 @@ class SubCategoryCreateSerializer(serializers.ModelSerializer):
 class CategorySerializer(serializers.ModelSerializer):
 
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Category
-        fields = ['id', 'name', 'image', 'image_url', 'created_at', 'updated_at']
-        read_only_fields = ['image_url']
+        fields = ['id', 'name', 'image', 'image_url', 'thumbnail_url', 'image_srcset', 'created_at', 'updated_at']
+        read_only_fields = ['image_url', 'thumbnail_url', 'image_srcset']
 
     def get_image_url(self, obj):
         """URL completa de la imagen"""
@@ -51,6 +55,17 @@ class CategorySerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def _variants(self, obj):
+        return (obj.image_variants or {}).get(obj.image.name) if obj.image else None
+
+    def get_thumbnail_url(self, obj):
+        """Miniatura WebP; None mientras no se hayan generado las variantes"""
+        return thumbnail_url(self._variants(obj))
+
+    def get_image_srcset(self, obj):
+        """srcset por formato (webp, jpg) de las variantes de la imagen"""
+        return srcset(self._variants(obj))
+
 
 class CategoryDetailSerializer(CategorySerializer):
     subcategories = SubCategorySerializer(many=True, read_only=True)
@@ -1,11 +1,38 @@
 from rest_framework import serializers
 from apps.products.models import Product
+from utils.images.images import media_name, srcset, thumbnail_url
 
 class ProductSerializer(serializers.ModelSerializer):
+    image_srcsets = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'likes', 'total_sales', 'is_deleted')
+        read_only_fields = ('created_at', 'updated_at', 'likes', 'total_sales', 'is_deleted', 'image_variants')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Incrementos aún en ProductCounterShard (anotados en el detalle)
+        for counter in ('likes', 'total_sales'):
+            if counter in data:
+                data[counter] += getattr(instance, f'pending_{counter}', 0)
+        return data
+
+    def update(self, instance, validated_data):
+        # Solo los campos enviados: likes y total_sales los suma counter_service
+        # e image_variants image_service, ambos con UPDATE
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+    def get_image_srcsets(self, obj):
+        """srcset de cada imagen de image_list, en el mismo orden (None si no tiene variantes)"""
+        variants = obj.image_variants or {}
+        return [
+            srcset(variants[name]) if name in variants else None
+            for name in map(media_name, obj.image_list)
+        ]
 
     def validate_image_list(self, value):
         if not isinstance(value, list):
@@ -30,7 +57,25 @@ class ProductSerializer(serializers.ModelSerializer):
 
 class ProductListSerializer(serializers.ModelSerializer):
     """Serializer optimizado para listados (menos campos)"""
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
-        fields = ('id', 'code', 'name', 'brand', 'stars', 'is_active')
\ No newline at end of file
+        fields = ('id', 'code', 'name', 'brand', 'stars', 'is_active', 'thumbnail_url')
+
+    def get_thumbnail_url(self, obj):
+        """Miniatura de la primera imagen con variantes generadas"""
+        variants = obj.image_variants or {}
+        for name in map(media_name, obj.image_list):
+            url = thumbnail_url(variants.get(name))
+            if url:
+                return url
+        return None
+
+class QuoteLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    qty = serializers.IntegerField(min_value=1, max_value=1000000)
+
+
+class QuoteSerializer(serializers.Serializer):
+    items = QuoteLineSerializer(many=True, allow_empty=False, max_length=1000)
@@ -3,14 +3,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db.models import Count, Q, Prefetch
 
 from apps.products.models import Category, SubCategory, Product
 from apps.products.api.serializers.category_serializer import (
     CategorySerializer, CategoryDetailSerializer, CategoryCreateSerializer,
     SubCategorySerializer, SubCategoryCreateSerializer
 )
+from apps.products.services.category_service import (
+    CATEGORY_TREE_CACHE, build_category_tree, active_products_count
+)
 from utils.pagination.pagination import Pagination
+from utils.cache.cache import cached_payload, conditional_response
 from utils.permission.admin import IsAdminGroup
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -33,7 +38,10 @@ class CategoryViewSet(viewsets.ModelViewSet):
         queryset = Category.objects.all()
         
         if self.action == 'retrieve':
-            queryset = queryset.prefetch_related('subcategories')
+            queryset = queryset.prefetch_related(Prefetch(
+                'subcategories',
+                queryset=SubCategory.objects.annotate(products_count=active_products_count())
+            ))
         elif self.action == 'with_products':
             queryset = queryset.prefetch_related('subcategories')
             
@@ -63,6 +71,20 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Árbol completo de categorías y subcategorías con el número de
+        productos activos. Se sirve desde caché con ETag (If-None-Match
+        devuelve 304) y se invalida al cambiar categorías, subcategorías o
+        productos.
+        """
+        etag, tree = cached_payload(
+            CATEGORY_TREE_CACHE, ['all'], build_category_tree,
+            getattr(settings, 'CATEGORY_TREE_CACHE_SECONDS', 300)
+        )
+        return conditional_response(request, etag, tree)
+
 
 class SubCategoryViewSet(viewsets.ModelViewSet):
     queryset = SubCategory.objects.all()
@@ -81,4 +103,4 @@ class SubCategoryViewSet(viewsets.ModelViewSet):
         return SubCategorySerializer
 
     def get_queryset(self):
-        return SubCategory.objects.select_related('category')
\ No newline at end of file
+        return SubCategory.objects.select_related('category').annotate(products_count=active_products_count())
\ No newline at end of file
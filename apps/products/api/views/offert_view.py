@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
 from apps.products.models import Offert
@@ -12,7 +14,12 @@ from apps.products.api.serializers.offert_serializer import (
     OffertDetailSerializer,
     ActiveOffertSerializer
 )
-from utils.pagination.pagination import Pagination
+from apps.products.services.offert_service import (
+    ACTIVE_OFFERTS_CACHE, active_offerts_queryset, build_active_offerts, is_scheduled
+)
+from utils.pagination.pagination import Pagination, wants_cursor
+from utils.cache.cache import cached_payload
+from utils.idempotency.idempotency import idempotent
 from utils.permission.admin import IsAdminGroup
 
 class OffertViewSet(viewsets.ModelViewSet):
@@ -37,11 +44,14 @@ class OffertViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Offert.objects.select_related('product')
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
-                offert = serializer.save()
+                with transaction.atomic():
+                    # Las ofertas que aún no empiezan se crean inactivas; sync_offerts las activa
+                    offert = serializer.save(is_active=is_scheduled(Offert(**serializer.validated_data)))
                 response_serializer = OffertSerializer(offert)
                 return Response(response_serializer.data, status=status.HTTP_201_CREATED)
             else:
@@ -68,7 +78,13 @@ class OffertViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(instance, data=request.data, partial=partial)
             
             if serializer.is_valid():
-                offert = serializer.save()
+                with transaction.atomic():
+                    offert = serializer.save()
+                    # Al cambiar las fechas se recalcula is_active salvo si se apagó a mano
+                    scheduled = is_scheduled(offert)
+                    if not offert.switched_off and offert.is_active != scheduled:
+                        offert.is_active = scheduled
+                        offert.save(update_fields=['is_active'])
                 response_serializer = OffertSerializer(offert)
                 return Response(response_serializer.data)
             else:
@@ -88,26 +104,33 @@ class OffertViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
     @action(detail=False, methods=['get'])
     def active_offerts(self, request):
         """
         Obtener ofertas activas (público) ;)
+        La lista del día sale de la caché (clave por fecha, se invalida al
+        escribir ofertas o productos) y se pagina en memoria; la paginación
+        por cursor consulta la base de datos.
         """
         try:
-            current_date = timezone.now().date()
-            active_offerts = Offert.objects.filter(
-                is_active=True,
-                init_date__lte=current_date,
-                end_date__gte=current_date
-            ).select_related('product')
-            
-            page = self.paginate_queryset(active_offerts)
-            if page is not None:
+            today = timezone.localdate()
+            if wants_cursor(request):
+                page = self.paginate_queryset(active_offerts_queryset(today))
                 serializer = self.get_serializer(page, many=True)
                 return self.get_paginated_response(serializer.data)
-            
-            serializer = self.get_serializer(active_offerts, many=True)
-            return Response(serializer.data)
+
+            _, active_offerts = cached_payload(
+                ACTIVE_OFFERTS_CACHE, [today.isoformat()], lambda: build_active_offerts(today),
+                getattr(settings, 'ACTIVE_OFFERTS_CACHE_SECONDS', 3600)
+            )
+            page = self.paginate_queryset(active_offerts)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(active_offerts)
             
         except Exception as e:
             return Response(
@@ -118,16 +141,21 @@ class OffertViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _paginated(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(OffertSerializer(page, many=True).data)
+        return Response(OffertSerializer(queryset, many=True).data)
+
     @action(detail=False, methods=['get'])
     def expired_offerts(self, request):
         try:
-            current_date = timezone.now().date()
+            current_date = timezone.localdate()
             expired_offerts = Offert.objects.filter(
                 end_date__lt=current_date
-            )
+            ).select_related('product').order_by('-end_date', '-pk')
             
-            serializer = OffertSerializer(expired_offerts, many=True)
-            return Response(serializer.data)
+            return self._paginated(expired_offerts)
             
         except Exception as e:
             return Response(
@@ -139,11 +167,14 @@ class OffertViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def toggle_active(self, request, pk=None): # Activar/desactivar ofertas chama
         try:
-            offert = self.get_object()
-            offert.is_active = not offert.is_active
-            offert.save()
+            with transaction.atomic():
+                offert = self.get_object()
+                offert.is_active = not offert.is_active
+                offert.switched_off = not offert.is_active
+                offert.save()
             
             message = "Oferta activada" if offert.is_active else "Oferta desactivada"
             return Response({
@@ -166,14 +197,13 @@ class OffertViewSet(viewsets.ModelViewSet):
         Obtener ofertas próximas a iniciar --> Esto puede ser util luego ;)
         """
         try:
-            current_date = timezone.now().date()
+            current_date = timezone.localdate()
             upcoming_offerts = Offert.objects.filter(
-                is_active=True,
+                switched_off=False,
                 init_date__gt=current_date
-            ).order_by('init_date')
+            ).select_related('product').order_by('init_date', 'pk')
             
-            serializer = OffertSerializer(upcoming_offerts, many=True)
-            return Response(serializer.data)
+            return self._paginated(upcoming_offerts)
             
         except Exception as e:
             return Response(
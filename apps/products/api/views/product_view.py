@@ -2,40 +2,184 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db import transaction
 from apps.products.models import Product
-from apps.products.api.serializers.product_serializer import ProductSerializer, ProductListSerializer
+from apps.products.api.serializers.product_serializer import ProductSerializer, ProductListSerializer, QuoteSerializer
+from apps.products.api.filters.product_filter import ProductFilter
+from apps.products.services.facet_service import compute_facets
+from apps.products.services import pricing_service, counter_service
+from apps.products.services.statistics_service import (
+    PRODUCT_STATISTICS_CACHE, build_product_statistics, inventory_value
+)
+from utils.cache.cache import cached_payload
 from utils.pagination.pagination import Pagination
+from utils.search.search import RankedSearchFilter
+from utils.idempotency.idempotency import idempotent
+from utils.export.export import stream_export, EXPORT_FORMATS
+
+PRODUCT_EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('code', 'code'),
+    ('slug', 'slug'),
+    ('name', 'name'),
+    ('brand', 'brand'),
+    ('unit_price', 'unit_price'),
+    ('discount', 'discount'),
+    ('weight', 'weight'),
+    ('stars', 'stars'),
+    ('likes', 'likes'),
+    ('total_sales', 'total_sales'),
+    ('is_active', 'is_active'),
+    ('category', 'category_id'),
+    ('category_name', 'category__name'),
+    ('subcategory', 'subcategory_id'),
+    ('subcategory_name', 'subcategory__name'),
+    ('small_description', 'small_description'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.filter(is_deleted=False)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['is_active', 'brand']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
+    filterset_class = ProductFilter
     search_fields = ['code', 'name', 'brand']
+    search_prefix_fields = ['code']
+    search_text_fields = ['name', 'brand']
     ordering_fields = ['name', 'created_at', 'stars', 'total_sales']
     ordering = ['-created_at']
     pagination_class = Pagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = counter_service.with_pending_counters(queryset)
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'list':
             return ProductListSerializer
+        elif self.action == 'quote':
+            return QuoteSerializer
         return ProductSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Listado del catálogo. Con ?facets=true añade a la respuesta los
+        conteos por marca, categoría, subcategoría, banda de precio,
+        descuento y disponibilidad para los filtros actuales.
+        """
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets', '').lower() in ('true', '1', 'yes'):
+            response.data['facets'] = self.facets(request)
+        return response
+
+    def facets(self, request):
+        queryset = RankedSearchFilter().filter_queryset(request, self.get_queryset(), self)
+        filterset = ProductFilter(request.query_params, queryset=queryset, request=request)
+        return compute_facets(filterset.facet_base_queryset(), filterset.selected_facets())
+
+    # Las escrituras van en una transacción para que el evento del outbox
+    # se confirme junto con el cambio
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
     def perform_destroy(self, instance):
-        instance.is_deleted = True
-        instance.save()
+        with transaction.atomic():
+            instance.is_deleted = True
+            instance.save(update_fields=['is_deleted', 'updated_at'])
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def toggle_active(self, request, pk=None):
-        product = self.get_object()
-        product.is_active = not product.is_active
-        product.save()
+        with transaction.atomic():
+            product = self.get_object()
+            product.is_active = not product.is_active
+            product.save(update_fields=['is_active', 'updated_at'])
         return Response({'status': 'active toggled', 'is_active': product.is_active})
 
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def like(self, request, pk=None):
+        """
+        Suma un "me gusta". El incremento va a una fila shard del producto
+        (no bloquea la fila de Product ni cambia su updated_at) y la
+        respuesta incluye lo pendiente de plegar.
+        """
+        product = self.get_object()
+        try:
+            counter_service.increment(product.pk, likes=1)
+            return Response({
+                'message': 'Me gusta registrado',
+                'likes': counter_service.current_totals(product)['likes']
+            })
+        except Exception as e:
+            return Response(
+                {
+                    'error': 'Error al registrar el me gusta',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"output debe ser uno de: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(queryset, PRODUCT_EXPORT_FIELDS, output, filename='products')
+
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """
+        Presupuesto de un carrito: {"items": [{"product_id", "qty"}]} o la
+        lista directamente. Aplica la combinación más barata de precios por
+        volumen, el descuento del producto y lista las ofertas vigentes.
+        """
+        data = request.data
+        if isinstance(data, list):
+            data = {'items': data}
+        serializer = self.get_serializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results, totals, has_errors = pricing_service.quote(serializer.validated_data['items'])
+            if has_errors:
+                return Response(
+                    {'error': 'Hay líneas inválidas en el presupuesto', 'results': results},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response({'results': results, **totals})
+
+        except Exception as e:
+            return Response(
+                {
+                    'error': 'Error al calcular el presupuesto',
+                    'message': str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        stats = {
-            'total_products': Product.objects.filter(is_deleted=False).count(),
-            'active_products': Product.objects.filter(is_active=True, is_deleted=False).count(),
-            'total_brands': Product.objects.filter(is_deleted=False).values('brand').distinct().count(),
-        }
-        return Response(stats)
\ No newline at end of file
+        """
+        Totales del catálogo con desglose por categoría y marca (en caché,
+        se invalida al escribir productos) y el valor del inventario, que se
+        lee de la fila ya mantenida de inventory_summary.
+        """
+        _, stats = cached_payload(
+            PRODUCT_STATISTICS_CACHE, ['all'], build_product_statistics,
+            getattr(settings, 'PRODUCT_STATISTICS_CACHE_SECONDS', 300)
+        )
+        return Response({**stats, 'inventory': inventory_value()})
\ No newline at end of file
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ProductConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.products'
+
+    def ready(self):
+        from apps.products.signals import connect_cache_invalidation, connect_image_variants
+        connect_cache_invalidation()
+        connect_image_variants()
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.services.counter_service import fold_counters, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Suma a Product.likes y Product.total_sales los incrementos pendientes en ProductCounterShard. "
+        "Con --loop se repite cada --interval segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Shards por transacción')
+        parser.add_argument('--loop', action='store_true', help='Repetir indefinidamente')
+        parser.add_argument('--interval', type=int, default=60, help='Segundos entre ejecuciones con --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            folded = fold_counters(batch_size=options['batch_size'])
+            elapsed = (time.perf_counter() - started) * 1000
+            if folded or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Productos actualizados: {folded} ({elapsed:.1f} ms)"))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,49 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.products.models import Category, Product
+from apps.products.services.image_service import image_sources, pending_sources, store_variants, variant_widths
+from utils.images.images import render_many
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las miniaturas y variantes WebP que falten de Category.image y Product.image_list "
+        "en un pool de procesos. Con --force las regenera todas, también las que fallaron; "
+        "las que cambian se escriben con un nombre nuevo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerar también las variantes existentes')
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2), help='Procesos del pool'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        jobs = []
+        for model in (Category, Product):
+            for instance in model.objects.only('pk', 'image_variants', 'image' if model is Category else 'image_list').iterator():
+                names = image_sources(instance) if options['force'] else pending_sources(instance)
+                if names:
+                    jobs.append((model, instance.pk, names))
+
+        done = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            futures = {
+                pool.submit(render_many, settings.MEDIA_ROOT, names, variant_widths()): (model, pk)
+                for model, pk, names in jobs
+            }
+            for future in as_completed(futures):
+                model, pk = futures[future]
+                store_variants(model, pk, future.result())
+                done += 1
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Entidades procesadas: {done} ({elapsed:.1f} s)"))
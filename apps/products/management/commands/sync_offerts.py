@@ -0,0 +1,37 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.services.offert_service import activate_offerts, expire_offerts
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Desactiva las ofertas cuya fecha de fin ya pasó, activa las que empiezan (salvo las apagadas "
+        "a mano) e invalida la caché de ofertas activas. Con --loop se repite cada --interval segundos. "
+        "Cada ejecución se registra en el logger con los contadores y la duración."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Repetir indefinidamente')
+        parser.add_argument('--interval', type=int, default=300, help='Segundos entre ejecuciones con --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            expired = expire_offerts()
+            activated = activate_offerts()
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info(
+                "sync_offerts: %d desactivadas, %d activadas (%.1f ms)", expired, activated, elapsed,
+                extra={'expired': expired, 'activated': activated, 'elapsed_ms': elapsed},
+            )
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Ofertas desactivadas: {expired}, activadas: {activated} ({elapsed:.1f} ms)"
+                ))
+                return
+            time.sleep(options['interval'])
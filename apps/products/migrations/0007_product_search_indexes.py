@@ -0,0 +1,45 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+
+# Índices de búsqueda solo para PostgreSQL (GIN, trigram y clases de
+# operadores no existen en SQLite). Las expresiones deben coincidir con las
+# que construye utils.search.search.RankedSearchFilter.
+def product_search_indexes():
+    return [
+        GinIndex(SearchVector('name', 'brand', config='simple'), name='product_search_vector_idx'),
+        GinIndex(SearchVector('name', config='simple'), name='product_name_vector_idx'),
+        GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='product_name_trgm_idx'),
+        models.Index(OpClass(Upper('code'), name='text_pattern_ops'), name='product_code_prefix_idx'),
+    ]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('products', 'Product')
+    for index in product_search_indexes():
+        schema_editor.add_index(Product, index)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('products', 'Product')
+    for index in product_search_indexes():
+        schema_editor.remove_index(Product, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_remove_category_description_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offert',
+            index=models.Index(fields=['is_active', 'init_date', 'end_date'], name='offert_active_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offert',
+            index=models.Index(fields=['end_date'], name='offert_end_date_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('likes', models.IntegerField(default=0)),
+                ('total_sales', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Product counter shard',
+                'verbose_name_plural': 'Product counter shards',
+                'unique_together': {('product', 'shard')},
+            },
+        ),
+    ]
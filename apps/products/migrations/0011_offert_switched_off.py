@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:27
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_switched_off(apps, schema_editor):
+    """
+    Hasta ahora las ofertas se creaban activas y solo se desactivaban a mano
+    o al expirar: las inactivas que no han expirado se apagaron a mano.
+    """
+    Offert = apps.get_model('products', 'Offert')
+    Offert.objects.filter(is_active=False, end_date__gte=timezone.localdate()).update(switched_off=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_productcountershard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offert',
+            name='switched_off',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_switched_off, migrations.RunPython.noop),
+    ]
@@ -9,6 +9,8 @@ class Category(models.Model):
         blank=True,
         help_text="Imagen representativa de la categoría"
     )
+    # {nombre de la imagen: [{name, width, height, format}]} (services/image_service.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -48,6 +50,7 @@ class Product(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.01, validators=[MinValueValidator(0.01)])
     name = models.CharField(max_length=255)
     image_list = models.JSONField(default=list, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     discount = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     brand = models.CharField(max_length=255, null=True, blank=True)
@@ -89,11 +92,39 @@ class Offert(models.Model):
     init_date = models.DateField(auto_now=False,auto_now_add=False)
     end_date = models.DateField(auto_now=False,auto_now_add=False)
     is_active = models.BooleanField(default=True)
+    # Apagada a mano con toggle_active: sync_offerts no la vuelve a activar
+    switched_off = models.BooleanField(default=False)
 
     class Meta:
         verbose_name = "Offert"
         verbose_name_plural = "Offerts"
+        indexes = [
+            # Vigentes: is_active + rango de fechas; próximas: is_active + init_date
+            models.Index(fields=['is_active', 'init_date', 'end_date'], name='offert_active_dates_idx'),
+            # Expiradas (sin filtro por is_active)
+            models.Index(fields=['end_date'], name='offert_end_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
-    
\ No newline at end of file
+
+
+class ProductCounterShard(models.Model):
+    """
+    Incrementos de likes y total_sales pendientes de sumar a Product,
+    repartidos en PRODUCT_COUNTER_SHARDS filas por producto para que los
+    incrementos concurrentes no compitan por la misma fila. El comando
+    fold_product_counters los pliega en Product (services/counter_service.py).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='counter_shards')
+    shard = models.PositiveSmallIntegerField()
+    likes = models.IntegerField(default=0)
+    total_sales = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Product counter shard"
+        verbose_name_plural = "Product counter shards"
+        unique_together = ['product', 'shard']
+
+    def __str__(self):
+        return f"{self.product_id} #{self.shard}"
@@ -0,0 +1,51 @@
+from django.core.files.storage import default_storage
+from django.db.models import Count, Q
+from apps.products.models import Category, SubCategory
+from utils.images.images import srcset, thumbnail_url
+
+CATEGORY_TREE_CACHE = 'category_tree'
+
+ACTIVE_PRODUCTS = Q(products__is_active=True, products__is_deleted=False)
+
+
+def active_products_count():
+    return Count('products', filter=ACTIVE_PRODUCTS)
+
+
+def build_category_tree():
+    """
+    Categorías con sus subcategorías anidadas y el número de productos
+    activos de cada una. Una consulta agregada por nivel.
+    """
+    categories = Category.objects.annotate(products_count=active_products_count()).order_by('name').values(
+        'id', 'name', 'image', 'image_variants', 'products_count'
+    )
+    subcategories = SubCategory.objects.annotate(products_count=active_products_count()).order_by('name').values(
+        'id', 'category_id', 'name', 'products_count'
+    )
+
+    tree = []
+    by_id = {}
+    for category in categories:
+        variants = (category['image_variants'] or {}).get(category['image'])
+        node = {
+            'id': category['id'],
+            'name': category['name'],
+            'image_url': default_storage.url(category['image']) if category['image'] else None,
+            'thumbnail_url': thumbnail_url(variants),
+            'image_srcset': srcset(variants),
+            'products_count': category['products_count'],
+            'subcategories': [],
+        }
+        by_id[category['id']] = node
+        tree.append(node)
+    for subcategory in subcategories:
+        parent = by_id.get(subcategory['category_id'])
+        if parent is not None:
+            parent['subcategories'].append({
+                'id': subcategory['id'],
+                'name': subcategory['name'],
+                'full_path': f"{parent['name']} → {subcategory['name']}",
+                'products_count': subcategory['products_count'],
+            })
+    return tree
@@ -0,0 +1,102 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Case, When, Value, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from apps.products.models import Product, ProductCounterShard
+
+COUNTERS = ('likes', 'total_sales')
+BATCH_SIZE = 1000
+
+
+def shard_count():
+    return getattr(settings, 'PRODUCT_COUNTER_SHARDS', 8)
+
+
+def increment(product_id, **deltas):
+    """
+    Suma deltas (likes=1, total_sales=n) a una de las filas shard del
+    producto elegida al azar con un UPDATE ... SET x = x + n; la fila se
+    crea la primera vez. La fila de Product no se toca (ni su updated_at).
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    if set(deltas) - set(COUNTERS):
+        raise ValueError(f"Contadores desconocidos: {', '.join(set(deltas) - set(COUNTERS))}")
+
+    shard = random.randrange(shard_count())
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    shard_row = ProductCounterShard.objects.filter(product_id=product_id, shard=shard)
+    with transaction.atomic():
+        if shard_row.update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                ProductCounterShard.objects.create(product_id=product_id, shard=shard, **deltas)
+        except IntegrityError:
+            # Otra petición creó la misma fila a la vez
+            shard_row.update(**updates)
+
+
+def _pending(counter):
+    return Coalesce(Subquery(
+        ProductCounterShard.objects.filter(product=OuterRef('pk')).values('product').annotate(
+            total=Sum(counter)
+        ).values('total')
+    ), 0)
+
+
+def with_pending_counters(queryset):
+    """Anota pending_likes y pending_total_sales (lo que aún no se ha plegado)"""
+    return queryset.annotate(**{f'pending_{counter}': _pending(counter) for counter in COUNTERS})
+
+
+def current_totals(product):
+    """Totales de `product` sumando sus shards pendientes (una consulta)"""
+    pending = ProductCounterShard.objects.filter(product=product).aggregate(
+        **{counter: Sum(counter) for counter in COUNTERS}
+    )
+    return {counter: getattr(product, counter) + (pending[counter] or 0) for counter in COUNTERS}
+
+
+def fold_counters(batch_size=BATCH_SIZE):
+    """
+    Pliega los shards con valores pendientes en Product. Por lotes de
+    batch_size, cada uno en su transacción: SELECT ... FOR UPDATE SKIP
+    LOCKED de los shards (los que se están incrementando quedan para la
+    siguiente vuelta), un UPDATE con CASE sobre los productos y otro que
+    pone los shards a cero. updated_at de Product no cambia.
+    Devuelve el número de productos actualizados.
+    """
+    folded = set()
+    while True:
+        with transaction.atomic():
+            rows = list(
+                ProductCounterShard.objects.select_for_update(skip_locked=True).exclude(
+                    likes=0, total_sales=0
+                ).order_by('pk').values_list('pk', 'product_id', 'likes', 'total_sales')[:batch_size]
+            )
+            if not rows:
+                break
+
+            totals = defaultdict(lambda: {counter: 0 for counter in COUNTERS})
+            for _, product_id, likes, total_sales in rows:
+                totals[product_id]['likes'] += likes
+                totals[product_id]['total_sales'] += total_sales
+
+            Product.objects.filter(pk__in=list(totals)).update(**{
+                counter: F(counter) + Case(
+                    *[When(pk=product_id, then=Value(values[counter])) for product_id, values in totals.items()],
+                    default=Value(0),
+                )
+                for counter in COUNTERS
+            })
+            ProductCounterShard.objects.filter(pk__in=[pk for pk, _, _, _ in rows]).update(likes=0, total_sales=0)
+            folded.update(totals)
+
+        if len(rows) < batch_size:
+            break
+    return len(folded)
@@ -0,0 +1,94 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Q, F, Case, When, Value, Count, Exists, OuterRef, CharField, BooleanField
+from apps.inventory.models import ProductAvailability
+
+
+# (clave, desde, hasta): desde <= unit_price < hasta
+PRICE_BANDS = [
+    ('0-10', None, Decimal('10')),
+    ('10-50', Decimal('10'), Decimal('50')),
+    ('50-100', Decimal('50'), Decimal('100')),
+    ('100-500', Decimal('100'), Decimal('500')),
+    ('500+', Decimal('500'), None),
+]
+
+FACETS = ('brand', 'category', 'subcategory', 'price_band', 'has_discount', 'in_stock')
+
+
+def price_band_q(key):
+    for band, low, high in PRICE_BANDS:
+        if band == key:
+            condition = Q()
+            if low is not None:
+                condition &= Q(unit_price__gte=low)
+            if high is not None:
+                condition &= Q(unit_price__lt=high)
+            return condition
+    return Q(pk__in=[])
+
+
+def in_stock_exists():
+    """
+    Algún almacén con cantidad no reservada, leído de product_availability
+    (lo construye la migración y lo mantiene SummaryTracker: solo se lee)
+    """
+    return Exists(ProductAvailability.objects.filter(product=OuterRef('pk'), quantity__gt=F('reserved')))
+
+
+def facet_annotations():
+    return {
+        'price_band': Case(
+            *[When(price_band_q(band), then=Value(band)) for band, _, _ in PRICE_BANDS],
+            output_field=CharField(),
+        ),
+        'has_discount': Case(
+            When(discount__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField()
+        ),
+        'in_stock': in_stock_exists(),
+    }
+
+
+def compute_facets(queryset, selected):
+    """
+    Conteos de cada faceta en una sola consulta agrupada por todas las
+    dimensiones a la vez. `queryset` lleva aplicados los filtros que no son
+    facetas (búsqueda, is_active, rango de precio) y `selected` es
+    {faceta: conjunto de valores elegidos}.
+
+    El conteo de cada faceta aplica las selecciones de las demás pero no la
+    suya (facetas disjuntivas): al elegir una marca se siguen viendo las
+    otras marcas con su número de productos.
+    """
+    groups = queryset.order_by().annotate(**facet_annotations()).values(
+        'brand', 'category', 'category__name', 'subcategory', 'subcategory__name',
+        'price_band', 'has_discount', 'in_stock',
+    ).annotate(total=Count('pk'))
+
+    counts = {facet: defaultdict(int) for facet in FACETS}
+    names = {'category': {}, 'subcategory': {}}
+    for group in groups:
+        for facet in ('category', 'subcategory'):
+            names[facet][group[facet]] = group[f'{facet}__name']
+        matches = {facet: not selected.get(facet) or group[facet] in selected[facet] for facet in FACETS}
+        for facet in FACETS:
+            if all(matches[other] for other in FACETS if other != facet):
+                counts[facet][group[facet]] += group['total']
+
+    facets = {}
+    for facet in FACETS:
+        values = sorted(counts[facet].items(), key=lambda item: (-item[1], str(item[0])))
+        if facet in names:
+            facets[facet] = [
+                {'value': value, 'name': names[facet].get(value), 'count': count} for value, count in values
+            ]
+        elif facet == 'price_band':
+            order = [band for band, _, _ in PRICE_BANDS]
+            facets[facet] = [
+                {'value': value, 'count': count}
+                for value, count in sorted(counts[facet].items(), key=lambda item: order.index(item[0]))
+            ]
+        else:
+            facets[facet] = [{'value': value, 'count': count} for value, count in values]
+    return facets
@@ -0,0 +1,96 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from apps.products.models import Category, Product
+from apps.products.services.category_service import CATEGORY_TREE_CACHE
+from apps.products.services.offert_service import ACTIVE_OFFERTS_CACHE
+from apps.core.services.outbox_service import publish
+from utils.cache.cache import bump_version
+from utils.images.images import media_name, render_many
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_widths():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1280)))
+
+
+def executor():
+    """
+    Pool de procesos compartido para generar variantes. Usa 'spawn' para no
+    heredar hilos ni conexiones del worker web.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def image_sources(instance):
+    """Imágenes locales de la entidad cuyas variantes se generan"""
+    if isinstance(instance, Category):
+        return [instance.image.name] if instance.image else []
+    return [name for name in map(media_name, instance.image_list) if name]
+
+
+def pending_sources(instance):
+    return [name for name in image_sources(instance) if name not in (instance.image_variants or {})]
+
+
+def store_variants(model, pk, results):
+    """
+    Guarda en image_variants las variantes generadas que sigan
+    correspondiendo a imágenes actuales de la entidad (si la imagen cambió
+    mientras tanto se descartan). Usa UPDATE para no volver a disparar la
+    generación desde post_save.
+    """
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk).first()
+        if instance is None:
+            return
+        current = set(image_sources(instance))
+        variants = {name: value for name, value in (instance.image_variants or {}).items() if name in current}
+        variants.update({name: value for name, value in results.items() if name in current})
+        model.objects.filter(pk=pk).update(image_variants=variants)
+        instance.image_variants = variants
+        if model is Product:
+            publish(instance)
+
+    bump_version(CATEGORY_TREE_CACHE if model is Category else ACTIVE_OFFERTS_CACHE)
+
+
+def _store_when_done(model, pk):
+    def callback(future):
+        # Se ejecuta en un hilo del pool: usa y cierra su propia conexión
+        try:
+            if future.cancelled() or future.exception() is not None:
+                return
+            store_variants(model, pk, future.result())
+        finally:
+            connections.close_all()
+    return callback
+
+
+def schedule_variants(instance):
+    """
+    Encola la generación de las variantes pendientes de `instance` en el
+    pool de procesos, fuera del hilo de la petición. Con
+    IMAGE_VARIANTS_ASYNC=False (tests) se generan en el momento.
+    """
+    names = pending_sources(instance)
+    if not names:
+        return
+    model, pk = type(instance), instance.pk
+    if not getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        store_variants(model, pk, render_many(settings.MEDIA_ROOT, names, variant_widths()))
+        return
+    future = executor().submit(render_many, settings.MEDIA_ROOT, names, variant_widths())
+    future.add_done_callback(_store_when_done(model, pk))
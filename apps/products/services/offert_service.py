@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.utils import timezone
+from apps.products.models import Offert
+from apps.products.api.serializers.offert_serializer import ActiveOffertSerializer
+from apps.core.services.outbox_service import publish_many
+from utils.cache.cache import bump_version
+
+ACTIVE_OFFERTS_CACHE = 'active_offerts'
+
+
+def active_offerts_queryset(today=None):
+    """Ofertas vigentes en `today` (índice offert_active_dates_idx)"""
+    today = today or timezone.localdate()
+    return Offert.objects.filter(
+        is_active=True, init_date__lte=today, end_date__gte=today
+    ).select_related('product').order_by('end_date', 'pk')
+
+
+def build_active_offerts(today):
+    """
+    Lista serializada de las ofertas vigentes en `today`. Se guarda en caché
+    con la fecha en la clave: cambia sola al pasar el día y se invalida al
+    escribir ofertas o productos.
+    """
+    return [dict(row) for row in ActiveOffertSerializer(active_offerts_queryset(today), many=True).data]
+
+
+def is_scheduled(offert, today=None):
+    """Si la oferta debe estar activa en `today` según sus fechas y el interruptor manual"""
+    today = today or timezone.localdate()
+    return not offert.switched_off and offert.init_date <= today <= offert.end_date
+
+
+def _set_active(is_active, **conditions):
+    """
+    Cambia is_active en las ofertas que cumplen `conditions`: un SELECT ...
+    FOR UPDATE SKIP LOCKED de los ids, un UPDATE y la inserción en bloque de
+    sus eventos del outbox (el UPDATE no dispara las señales). Devuelve el
+    número de ofertas cambiadas.
+    """
+    with transaction.atomic():
+        ids = list(
+            Offert.objects.select_for_update(skip_locked=True).filter(
+                is_active=not is_active, **conditions
+            ).values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+        Offert.objects.filter(pk__in=ids).update(is_active=is_active)
+        publish_many(Offert.objects.filter(pk__in=ids).order_by('pk'))
+        transaction.on_commit(lambda: bump_version(ACTIVE_OFFERTS_CACHE))
+    return len(ids)
+
+
+def expire_offerts(today=None):
+    """Desactiva las ofertas activas cuyo end_date ya pasó"""
+    today = today or timezone.localdate()
+    return _set_active(False, end_date__lt=today)
+
+
+def activate_offerts(today=None):
+    """
+    Activa las ofertas que ya empezaron y siguen vigentes. Las apagadas a
+    mano (switched_off) no se tocan: solo toggle_active las vuelve a activar.
+    """
+    today = today or timezone.localdate()
+    return _set_active(True, switched_off=False, init_date__lte=today, end_date__gte=today)
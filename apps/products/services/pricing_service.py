@@ -0,0 +1,195 @@
+import heapq
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+from apps.products.models import Product, BulkPricing
+from apps.products.services.offert_service import active_offerts_queryset
+
+CENT = Decimal('0.01')
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def _cost_table(items, limit):
+    """
+    Mínimo coste (en céntimos) de exactamente x unidades para x <= limit
+    combinando `items` ((unidades, céntimos), con repetición), y el item
+    elegido en cada paso para reconstruir la combinación. No se cachea: su
+    tamaño depende de la cantidad pedida y solo se usa con cantidades
+    pequeñas frente a los tramos.
+    """
+    infinite = float('inf')
+    cost = [0] + [infinite] * limit
+    choice = [-1] * (limit + 1)
+    for units_done in range(1, limit + 1):
+        for index, (units, cents) in enumerate(items):
+            if units <= units_done and cost[units_done - units] + cents < cost[units_done]:
+                cost[units_done] = cost[units_done - units] + cents
+                choice[units_done] = index
+    return cost, choice
+
+
+# Cada entrada ocupa O(unidades del mejor tramo): pocas entradas bastan
+# para los carritos habituales sin retener tablas de tramos grandes
+@lru_cache(maxsize=256)
+def _residue_paths(items, best):
+    """
+    Caminos mínimos sobre los restos módulo best.unidades. Usar un item i en
+    vez del tramo best encarece en c_i * u_b - u_i * c_b (>= 0, best es el de
+    mejor precio por unidad), así que el coste de q unidades es
+    (q * c_b + extra(q mod u_b)) / u_b. Dijkstra con best.unidades nodos.
+    """
+    best_units, best_cents = best
+    extra = [None] * best_units
+    previous = [None] * best_units
+    extra[0] = 0
+    heap = [(0, 0)]
+    while heap:
+        cost, residue = heapq.heappop(heap)
+        if cost > extra[residue]:
+            continue
+        for index, (units, cents) in enumerate(items):
+            if units % best_units == 0:
+                continue
+            target = (residue + units) % best_units
+            candidate = cost + cents * best_units - units * best_cents
+            if extra[target] is None or candidate < extra[target]:
+                extra[target] = candidate
+                previous[target] = (residue, index)
+                heapq.heappush(heap, (candidate, target))
+    return extra, previous
+
+
+def cheapest_combination(quantity, unit_cents, tiers):
+    """
+    Combinación más barata de tramos (unidades, céntimos) y precio unitario
+    para exactamente `quantity` unidades. Devuelve (céntimos, {item: veces}).
+
+    Primero se resuelve por caminos mínimos sobre los restos
+    (_residue_paths), que no depende de la cantidad. Esa solución ignora
+    que los tramos elegidos no pueden sumar más de `quantity` unidades; si
+    los supera (solo con cantidades pequeñas frente a los tramos) se usa la
+    programación dinámica exacta hasta `quantity`. Solo la primera se
+    cachea por conjunto de tramos.
+    """
+    catalog = {1: unit_cents}
+    for units, cents in tiers:
+        if units > 0 and cents < catalog.get(units, float('inf')):
+            catalog[units] = cents
+    items = tuple(sorted(catalog.items()))
+    best = min(items, key=lambda item: (item[1] / item[0], -item[0]))
+    best_units, best_cents = best
+
+    extra, previous = _residue_paths(items, best)
+    residue = quantity % best_units
+    used = {}
+    units_left = quantity
+    while residue:
+        residue, index = previous[residue]
+        used[items[index]] = used.get(items[index], 0) + 1
+        units_left -= items[index][0]
+    if units_left >= 0:
+        if units_left:
+            used[best] = used.get(best, 0) + units_left // best_units
+        return (quantity * best_cents + extra[quantity % best_units]) // best_units, used
+
+    cost, choice = _cost_table(items, quantity)
+    used = {}
+    units_left = quantity
+    while units_left > 0:
+        item = items[choice[units_left]]
+        used[item] = used.get(item, 0) + 1
+        units_left -= item[0]
+    return cost[quantity], used
+
+
+def money(cents):
+    return str(from_cents(cents))
+
+
+def load_catalog(product_ids):
+    """
+    Productos, tramos y ofertas vigentes de todo el carrito en tres
+    consultas de values() (sin instanciar modelos):
+    {product_id: {'product': dict, 'tiers': [(unidades, céntimos)], 'offers': [dict]}}
+    """
+    catalog = {
+        row['id']: {'product': row, 'tiers': [], 'offers': []}
+        for row in Product.objects.filter(
+            pk__in=product_ids, is_deleted=False, is_active=True
+        ).values('id', 'code', 'name', 'unit_price', 'discount')
+    }
+    for product_id, units, total_price in BulkPricing.objects.filter(
+        product_id__in=list(catalog)
+    ).values_list('product_id', 'cant', 'total_price'):
+        catalog[product_id]['tiers'].append((units, to_cents(total_price)))
+    for offert in active_offerts_queryset().filter(product_id__in=list(catalog)).values(
+        'id', 'product_id', 'name', 'description', 'end_date'
+    ):
+        catalog[offert.pop('product_id')]['offers'].append(offert)
+    return catalog
+
+
+def quote(lines):
+    """
+    Presupuesto de un carrito [{product_id, qty}]. Por línea: combinación
+    más barata de tramos de BulkPricing y precio unitario, descuento del
+    producto (porcentaje) y ofertas vigentes. Las ofertas solo se informan:
+    Offert no guarda ningún importe o porcentaje que aplicar.
+
+    Devuelve (results, totals, has_errors); results tiene el mismo formato
+    por línea que los ajustes masivos de stock.
+    """
+    catalog = load_catalog({line['product_id'] for line in lines})
+
+    results = []
+    has_errors = False
+    subtotal_cents = discount_cents = 0
+    for index, line in enumerate(lines):
+        entry = catalog.get(line['product_id'])
+        qty = line['qty']
+        result = {'line': index, 'product_id': line['product_id'], 'qty': qty}
+        if entry is None:
+            result.update(status='error', error='Producto no encontrado o inactivo')
+            has_errors = True
+            results.append(result)
+            continue
+
+        product = entry['product']
+        unit_cents = to_cents(product['unit_price'])
+        line_cents, used = cheapest_combination(qty, unit_cents, tuple(entry['tiers']))
+        percent = min(max(product['discount'], Decimal('0')), Decimal('100'))
+        line_discount = (line_cents * percent / 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+        line_discount = int(line_discount)
+        subtotal_cents += line_cents
+        discount_cents += line_discount
+
+        result.update(
+            status='ok',
+            code=product['code'],
+            name=product['name'],
+            unit_price=money(unit_cents),
+            breakdown=[
+                {'cant': units, 'price': money(cents), 'times': times}
+                for (units, cents), times in sorted(used.items(), reverse=True)
+            ],
+            subtotal=money(line_cents),
+            discount_percent=str(percent.quantize(CENT)),
+            discount=money(line_discount),
+            total=money(line_cents - line_discount),
+            offers=entry['offers'],
+        )
+        results.append(result)
+
+    totals = {
+        'subtotal': money(subtotal_cents),
+        'discount': money(discount_cents),
+        'total': money(subtotal_cents - discount_cents),
+    }
+    return results, totals, has_errors
@@ -0,0 +1,50 @@
+from django.db.models import Count, Max, Q, Case, When, Value, IntegerField
+from apps.products.models import Product
+from apps.inventory.services.summary_service import get_summary
+
+PRODUCT_STATISTICS_CACHE = 'product_statistics'
+TOP_BRANDS = 100
+
+ACTIVE = Q(is_active=True)
+
+
+def build_product_statistics():
+    """
+    Totales del catálogo (productos no eliminados) en una consulta de
+    agregados condicionales, más el desglose por categoría y por marca
+    (una consulta agrupada cada uno).
+    """
+    products = Product.objects.filter(is_deleted=False)
+    totals = products.aggregate(
+        total_products=Count('pk'),
+        active_products=Count('pk', filter=ACTIVE),
+        named_brands=Count('brand', distinct=True),
+        # values('brand').distinct() contaba también "sin marca" como una marca
+        has_unbranded=Max(Case(When(brand__isnull=True, then=Value(1)), default=Value(0), output_field=IntegerField())),
+    )
+    by_category = products.values('category', 'category__name').annotate(
+        total=Count('pk'), active=Count('pk', filter=ACTIVE)
+    ).order_by('-total', 'category__name')
+    by_brand = products.values('brand').annotate(
+        total=Count('pk'), active=Count('pk', filter=ACTIVE)
+    ).order_by('-total', 'brand')[:TOP_BRANDS]
+
+    return {
+        'total_products': totals['total_products'],
+        'active_products': totals['active_products'],
+        'total_brands': totals['named_brands'] + (totals['has_unbranded'] or 0),
+        'by_category': [
+            {'category': row['category'], 'name': row['category__name'], 'total': row['total'], 'active': row['active']}
+            for row in by_category
+        ],
+        'by_brand': [
+            {'brand': row['brand'], 'total': row['total'], 'active': row['active']}
+            for row in by_brand
+        ],
+    }
+
+
+def inventory_value():
+    """Valor y cantidad del inventario activo, leídos de la fila global de inventory_summary"""
+    summary = get_summary()
+    return {'total_quantity': summary['total_quantity'], 'total_value': summary['total_value']}
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from apps.products.models import Category, SubCategory, Product, Offert
+from apps.products.services.category_service import CATEGORY_TREE_CACHE
+from apps.products.services.statistics_service import PRODUCT_STATISTICS_CACHE
+from apps.products.services.offert_service import ACTIVE_OFFERTS_CACHE
+from apps.products.services.image_service import pending_sources, schedule_variants
+from utils.cache.cache import bump_version
+
+
+# Las versiones se suben al confirmar: si se subieran dentro de la
+# transacción, una lectura concurrente volvería a cachear los datos
+# anteriores con la versión nueva
+def invalidate_category_tree(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(CATEGORY_TREE_CACHE))
+
+
+def invalidate_product_statistics(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(PRODUCT_STATISTICS_CACHE))
+
+
+def invalidate_active_offerts(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(ACTIVE_OFFERTS_CACHE))
+
+
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw and pending_sources(instance):
+        transaction.on_commit(lambda: schedule_variants(instance))
+
+
+def connect_cache_invalidation():
+    for model in (Category, SubCategory, Product):
+        post_save.connect(invalidate_category_tree, sender=model, dispatch_uid=f'category_tree_save_{model.__name__}')
+        post_delete.connect(invalidate_category_tree, sender=model, dispatch_uid=f'category_tree_delete_{model.__name__}')
+    for model in (Category, Product):
+        post_save.connect(
+            invalidate_product_statistics, sender=model, dispatch_uid=f'product_statistics_save_{model.__name__}'
+        )
+        post_delete.connect(
+            invalidate_product_statistics, sender=model, dispatch_uid=f'product_statistics_delete_{model.__name__}'
+        )
+    # La lista de ofertas vigentes incluye los datos del producto
+    for model in (Offert, Product):
+        post_save.connect(
+            invalidate_active_offerts, sender=model, dispatch_uid=f'active_offerts_save_{model.__name__}'
+        )
+        post_delete.connect(
+            invalidate_active_offerts, sender=model, dispatch_uid=f'active_offerts_delete_{model.__name__}'
+        )
+
+
+def connect_image_variants():
+    for model in (Category, Product):
+        post_save.connect(
+            generate_image_variants, sender=model, dispatch_uid=f'image_variants_{model.__name__}'
+        )
@@ -1,3 +1,692 @@
-from django.test import TestCase
+import datetime
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
+from apps.accounts.models import User
+from apps.inventory.models import Store, Warehouse, Stock, InventorySummary, ProductAvailability
+from apps.inventory.services.summary_service import rebuild_summaries
+from apps.products.api.serializers.product_serializer import ProductSerializer
+from apps.products.models import Category, SubCategory, Product, BulkPricing, Offert, ProductCounterShard
+from apps.products.services import counter_service, pricing_service
+from apps.products.services.image_service import store_variants
+from apps.products.services.offert_service import activate_offerts, expire_offerts
+from apps.products.services.category_service import CATEGORY_TREE_CACHE
+from apps.products.services.pricing_service import cheapest_combination
+from utils.cache.cache import get_version
+from utils.images.images import render_many, srcset
+from utils.pagination.pagination import Pagination
+
+
+class ProductTestMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='admin@test.com', password='x')
+        cls.user.groups.add(Group.objects.get_or_create(name='admin')[0])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def create_products(count, **fields):
+        return Product.objects.bulk_create([
+            Product(code=f'C{index}', slug=f'c{index}', name=f'Producto {index}', unit_price=5, **fields)
+            for index in range(count)
+        ])
+
+class PaginationTests(ProductTestMixin, APITestCase):
+    url = '/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = cls.create_products(12)
+
+    def walk(self, params):
+        pages = []
+        response = self.client.get(self.url, params)
+        while True:
+            pages.append(response.data)
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_walks_every_product_once(self):
+        # Todos con el mismo created_at: el desempate por id mantiene el orden
+        pages = self.walk({'pagination': 'cursor', 'page_size': 5})
+
+        ids = [product['id'] for page in pages for product in page['results']]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(sorted(ids), sorted(product.pk for product in self.products))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_previous_link_returns_the_previous_page(self):
+        first = self.client.get(self.url, {'pagination': 'cursor'}).data
+        second = self.client.get(first['next']).data
+
+        back = self.client.get(second['previous']).data
+
+        self.assertEqual(back['results'], first['results'])
+
+    def test_deep_cursor_page_costs_the_same_as_the_first(self):
+        pages = self.walk({'pagination': 'cursor', 'page_size': 2, 'count': 'false'})
+        last_cursor = pages[-2]['next']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2, 'count': 'false'})
+        with self.assertNumQueries(len(queries)):
+            self.client.get(last_cursor)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'no-es-un-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_count_false_skips_the_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            with_count = self.client.get(self.url).data
+        with self.assertNumQueries(len(queries) - 1):
+            without_count = self.client.get(self.url, {'count': 'false'}).data
+
+        self.assertEqual(with_count['count'], 12)
+        self.assertNotIn('count', without_count)
+        self.assertEqual(without_count['results'], with_count['results'])
+        self.assertIn('page=2', without_count['next'])
+
+    def paginate(self, queryset, **params):
+        request = Request(APIRequestFactory().get(self.url, params))
+        paginator = Pagination()
+        return paginator, paginator.paginate_queryset(queryset, request)
+
+    def test_cursor_accepts_field_expressions(self):
+        paginator, page = self.paginate(Product.objects.order_by(F('name').desc()), pagination='cursor')
+
+        self.assertIsNotNone(paginator.keyset)
+        self.assertEqual([product.name for product in page], [f'Producto {index}' for index in (9, 8, 7, 6, 5)])
+
+    def test_cursor_falls_back_to_page_numbers_for_other_expressions(self):
+        paginator, page = self.paginate(Product.objects.order_by(Lower('name')), pagination='cursor')
+
+        self.assertIsNone(paginator.keyset)
+        self.assertEqual(len(page), 5)
+        self.assertIn('page=2', paginator.get_next_link())
+
+
+class SearchTests(ProductTestMixin, APITestCase):
+    """Búsqueda con ranking: en SQLite usa el camino istartswith/icontains"""
+    url = '/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Product.objects.bulk_create([
+            Product(code='CAF', slug='caf', name='Azúcar', brand='Dulce', unit_price=1),
+            Product(code='CAF-01', slug='caf-01', name='Leche', brand='Vaca', unit_price=1),
+            Product(code='X1', slug='x1', name='Café molido', brand='Tostados', unit_price=1),
+            Product(code='X2', slug='x2', name='Taza para café', brand='Loza', unit_price=1),
+            Product(code='X3', slug='x3', name='Té verde', brand='Caf', unit_price=1),
+            Product(code='X4', slug='x4', name='Pan', brand='Horno', unit_price=1),
+        ])
+
+    def codes(self, **params):
+        return [product['code'] for product in self.client.get(self.url, {'page_size': 20, **params}).data['results']]
+
+    def test_exact_code_then_code_prefix_then_text(self):
+        codes = self.codes(search='caf')
+
+        # Luego el nombre que empieza por el término y después el resto de coincidencias
+        self.assertEqual(codes[:3], ['CAF', 'CAF-01', 'X1'])
+        self.assertEqual(set(codes[3:]), {'X2', 'X3'})
+
+    def test_name_prefix_ranks_above_a_match_inside_the_name(self):
+        self.assertEqual(self.codes(search='café'), ['X1', 'X2'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.codes(search='café taza'), ['X2'])
+        self.assertEqual(self.codes(search='café pan'), [])
+
+    def test_ordering_parameter_replaces_the_ranking(self):
+        self.assertEqual(self.codes(search='café', ordering='-name'), ['X2', 'X1'])
+
+    def test_null_characters_are_ignored(self):
+        self.assertEqual(self.codes(search='pan\x00'), ['X4'])
+
+    def test_cursor_pagination_follows_the_ranking(self):
+        codes = []
+        page = self.client.get(self.url, {'search': 'caf', 'pagination': 'cursor', 'page_size': 2}).data
+        while True:
+            codes += [product['code'] for product in page['results']]
+            if not page['next']:
+                break
+            page = self.client.get(page['next']).data
+
+        self.assertEqual(codes, self.codes(search='caf'))
+
+
+class FacetTests(ProductTestMixin, APITestCase):
+    url = '/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = Category.objects.create(name='Bebidas')
+        Product.objects.bulk_create([
+            Product(code='A1', slug='a1', name='A1', brand='Acme', unit_price=5, category=cls.category),
+            Product(code='A2', slug='a2', name='A2', brand='Acme', unit_price=20, discount=10),
+            Product(code='B1', slug='b1', name='B1', brand='Beta', unit_price=60, category=cls.category),
+        ])
+        warehouse = Warehouse.objects.create(store=Store.objects.create(name='Tienda', address='x'), name='W', address='x')
+        Stock.objects.create(
+            code='S-A1', product=Product.objects.get(code='A1'), warehouse=warehouse, cant=3, unit_price=5
+        )
+        rebuild_summaries()
+
+    def facets(self, **params):
+        return self.client.get(self.url, {'facets': 'true', **params}).data['facets']
+
+    def counts(self, facet):
+        return {entry['value']: entry['count'] for entry in facet}
+
+    def test_counts_for_every_facet(self):
+        facets = self.facets()
+
+        self.assertEqual(self.counts(facets['brand']), {'Acme': 2, 'Beta': 1})
+        self.assertEqual(self.counts(facets['category']), {self.category.pk: 2, None: 1})
+        self.assertEqual(facets['category'][0]['name'], 'Bebidas')
+        self.assertEqual(self.counts(facets['price_band']), {'0-10': 1, '10-50': 1, '50-100': 1})
+        self.assertEqual(self.counts(facets['has_discount']), {True: 1, False: 2})
+        self.assertEqual(self.counts(facets['in_stock']), {True: 1, False: 2})
+
+    def test_selected_facet_keeps_its_other_values(self):
+        response = self.client.get(self.url, {'facets': 'true', 'brand': 'Beta'}).data
+
+        self.assertEqual([product['code'] for product in response['results']], ['B1'])
+        self.assertEqual(self.counts(response['facets']['brand']), {'Acme': 2, 'Beta': 1})
+        self.assertEqual(self.counts(response['facets']['price_band']), {'50-100': 1})
+
+    def test_without_facets_flag(self):
+        self.assertNotIn('facets', self.client.get(self.url).data)
+
+    def test_facets_are_one_grouped_query(self):
+        self.client.get(self.url, {'facets': 'true'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.create_products(20, brand='Gamma')
+
+        # Solo la consulta agrupada
+        with self.assertNumQueries(len(queries) + 1):
+            self.client.get(self.url, {'facets': 'true'})
+
+    def test_in_stock_filter_counts_free_quantity_only(self):
+        Stock.objects.filter(code='S-A1').update(reserved=3)
+        rebuild_summaries()
+
+        codes = [product['code'] for product in self.client.get(self.url, {'in_stock': 'true'}).data['results']]
+
+        self.assertEqual(codes, [])
+        self.assertEqual(self.counts(self.facets()['in_stock']), {False: 3})
+
+    def test_facets_do_not_write(self):
+        InventorySummary.objects.all().delete()
+        ProductAvailability.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            facets = self.facets(in_stock='false')
+
+        self.assertFalse([query for query in queries if query['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')])
+        self.assertEqual(self.counts(facets['in_stock']), {False: 3})
+
+
+class CategoryTreeTests(ProductTestMixin, APITestCase):
+    url = '/products/categories/tree/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = Category.objects.create(name='Bebidas')
+        cls.subcategory = SubCategory.objects.create(category=cls.category, name='Zumos')
+        cls.create_products(2, category=cls.category, subcategory=cls.subcategory)
+        Product.objects.create(code='D1', slug='d1', name='Borrado', category=cls.category, is_deleted=True)
+        Product.objects.create(code='I1', slug='i1', name='Inactivo', category=cls.category, is_active=False)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_counts_active_products(self):
+        tree = self.client.get(self.url).data
+
+        self.assertEqual(tree[0]['products_count'], 2)
+        self.assertEqual(
+            tree[0]['subcategories'],
+            [{'id': self.subcategory.pk, 'name': 'Zumos', 'full_path': 'Bebidas → Zumos', 'products_count': 2}]
+        )
+
+    def test_etag_answers_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_served_from_cache_until_a_write_is_committed(self):
+        self.client.get(self.url)
+        # update() no dispara señales: la respuesta sigue saliendo de la caché
+        Product.objects.filter(code='C0').update(is_active=False)
+        self.assertEqual(self.client.get(self.url).data[0]['products_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(code='C1').save()
+
+        self.assertEqual(self.client.get(self.url).data[0]['products_count'], 1)
+
+    def test_version_changes_on_commit(self):
+        version = get_version(CATEGORY_TREE_CACHE)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Category.objects.create(name='Nueva')
+        self.assertEqual(get_version(CATEGORY_TREE_CACHE), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_version(CATEGORY_TREE_CACHE), version)
+
+
+class StatisticsTests(ProductTestMixin, APITestCase):
+    url = '/products/products/statistics/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = Category.objects.create(name='Bebidas')
+        cls.create_products(2, brand='Acme', category=cls.category)
+        Product.objects.create(code='N1', slug='n1', name='Sin marca', is_active=False)
+        Product.objects.create(code='D1', slug='d1', name='Borrado', brand='Beta', is_deleted=True)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_totals_and_breakdowns(self):
+        data = self.client.get(self.url).data
+
+        self.assertEqual((data['total_products'], data['active_products'], data['total_brands']), (3, 2, 2))
+        self.assertEqual(data['by_category'][0], {'category': self.category.pk, 'name': 'Bebidas', 'total': 2, 'active': 2})
+        self.assertEqual(data['by_brand'], [{'brand': 'Acme', 'total': 2, 'active': 2}, {'brand': None, 'total': 1, 'active': 0}])
+        self.assertEqual(set(data['inventory']), {'total_quantity', 'total_value'})
+
+    def test_cached_response_skips_the_aggregates(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(self.url)
+
+        # Totales, por categoría y por marca salen de la caché
+        with self.assertNumQueries(len(cold) - 3):
+            self.client.get(self.url)
+
+    def test_product_write_invalidates_after_commit(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(code='N2', slug='n2', name='Nuevo', brand='Acme')
+
+        self.assertEqual(self.client.get(self.url).data['total_products'], 4)
+
+    def test_inventory_value_is_not_cached(self):
+        self.client.get(self.url)
+        InventorySummary.objects.filter(scope='global', scope_id=0).update(total_quantity=7)
+
+        self.assertEqual(self.client.get(self.url).data['inventory']['total_quantity'], 7)
+
+
+class QuoteTests(ProductTestMixin, APITestCase):
+    url = '/products/products/quote/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = Product.objects.create(code='P1', slug='p1', name='Producto 1', unit_price=1, discount=10)
+        BulkPricing.objects.create(product=cls.product, cant=10, total_price=8)
+
+    def test_uses_the_cheapest_tier_combination(self):
+        response = self.client.post(self.url, [{'product_id': self.product.pk, 'qty': 23}], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        line = response.data['results'][0]
+        self.assertEqual(line['breakdown'], [{'cant': 10, 'price': '8.00', 'times': 2}, {'cant': 1, 'price': '1.00', 'times': 3}])
+        self.assertEqual((line['subtotal'], line['discount'], line['total']), ('19.00', '1.90', '17.10'))
+        self.assertEqual((response.data['subtotal'], response.data['total']), ('19.00', '17.10'))
+
+    def test_unknown_product_is_reported_by_line(self):
+        response = self.client.post(
+            self.url, {'items': [{'product_id': self.product.pk, 'qty': 1}, {'product_id': 999999, 'qty': 1}]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([line['status'] for line in response.data['results']], ['ok', 'error'])
+
+    def test_query_count_does_not_depend_on_the_cart_size(self):
+        products = self.create_products(30)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, [{'product_id': self.product.pk, 'qty': 3}], format='json')
+
+        with self.assertNumQueries(len(queries)):
+            self.client.post(self.url, [{'product_id': product.pk, 'qty': 3} for product in products], format='json')
+
+    def test_tier_larger_than_the_quantity_is_not_used(self):
+        cents, used = cheapest_combination(7, 100, ((10, 500),))
+
+        self.assertEqual((cents, used), (700, {(1, 100): 7}))
+
+    def test_large_quantity(self):
+        cents, used = cheapest_combination(1000003, 100, ((10, 800), (3, 270)))
+
+        self.assertEqual(cents, 100000 * 800 + 270)
+        self.assertEqual(used, {(10, 800): 100000, (3, 270): 1})
+
+    def test_small_quantities_do_not_keep_cost_tables(self):
+        pricing_service._residue_paths.cache_clear()
+
+        for quantity in range(1, 9):
+            cheapest_combination(quantity, 100, ((10, 500), (3, 250)))
+
+        self.assertEqual(pricing_service._residue_paths.cache_info().currsize, 1)
+        self.assertFalse(hasattr(pricing_service._cost_table, 'cache_info'))
+
+
+class ActiveOffertTests(ProductTestMixin, APITestCase):
+    url = '/products/offerts/active_offerts/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.today = timezone.localdate()
+        cls.product = Product.objects.create(code='P1', slug='p1', name='Producto 1', unit_price=10)
+        day = datetime.timedelta(days=1)
+        cls.offerts = {
+            name: Offert.objects.create(
+                product=cls.product, name=name, description='x',
+                init_date=cls.today + start * day, end_date=cls.today + end * day
+            )
+            for name, start, end in (('larga', -5, 10), ('corta', 0, 1), ('mañana', 1, 3), ('pasada', -5, -1))
+        }
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def names(self, **params):
+        return [offert['name'] for offert in self.client.get(self.url, {'page_size': 20, **params}).data['results']]
+
+    def test_lists_the_offers_running_today(self):
+        self.assertEqual(self.names(), ['corta', 'larga'])
+
+    def test_cached_list_is_keyed_by_date(self):
+        self.names()
+        Offert.objects.filter(name='corta').update(name='renombrada')
+        self.assertEqual(self.names(), ['corta', 'larga'])
+
+        with mock.patch('django.utils.timezone.localdate', return_value=self.today + datetime.timedelta(days=2)):
+            self.assertEqual(self.names(), ['mañana', 'larga'])
+
+    def test_offer_write_invalidates_after_commit(self):
+        self.names()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            offert = self.offerts['corta']
+            offert.is_active = False
+            offert.save()
+
+        self.assertEqual(self.names(), ['larga'])
+
+    def test_product_write_invalidates_the_embedded_product(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Renombrado'
+            self.product.save()
+
+        results = self.client.get(self.url).data['results']
+        self.assertEqual({offert['product_details']['name'] for offert in results}, {'Renombrado'})
+
+    def test_cursor_pagination_reads_the_database(self):
+        self.names()
+        Offert.objects.filter(name='corta').update(is_active=False)
+
+        self.assertEqual(self.names(pagination='cursor'), ['larga'])
+
+
+class SyncOffertTests(ProductTestMixin, APITestCase):
+    url = '/products/offerts/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.today = timezone.localdate()
+        cls.product = Product.objects.create(code='P1', slug='p1', name='Producto 1', unit_price=10)
+
+    def create(self, name, start, end):
+        day = datetime.timedelta(days=1)
+        response = self.client.post(self.url, {
+            'product': self.product.pk, 'name': name, 'description': 'x',
+            'init_date': self.today + start * day, 'end_date': self.today + end * day,
+        })
+        return Offert.objects.get(pk=response.data['id'])
+
+    def on(self, days):
+        return mock.patch('django.utils.timezone.localdate', return_value=self.today + datetime.timedelta(days=days))
+
+    def test_future_offer_is_created_inactive_and_listed_as_upcoming(self):
+        offert = self.create('mañana', 1, 3)
+
+        upcoming = self.client.get(f'{self.url}upcoming_offerts/').data['results']
+
+        self.assertFalse(offert.is_active)
+        self.assertEqual([row['name'] for row in upcoming], ['mañana'])
+
+    def test_activates_the_offer_on_its_start_date(self):
+        offert = self.create('mañana', 1, 3)
+
+        with self.on(0):
+            self.assertEqual(activate_offerts(), 0)
+        with self.on(1), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(activate_offerts(), 1)
+
+        offert.refresh_from_db()
+        self.assertTrue(offert.is_active)
+
+    def test_manual_switch_off_is_not_reactivated(self):
+        offert = self.create('hoy', 0, 3)
+        self.client.post(f'{self.url}{offert.pk}/toggle_active/')
+
+        self.assertEqual(activate_offerts(), 0)
+        offert.refresh_from_db()
+        self.assertEqual((offert.is_active, offert.switched_off), (False, True))
+
+        self.client.post(f'{self.url}{offert.pk}/toggle_active/')
+        offert.refresh_from_db()
+        self.assertEqual((offert.is_active, offert.switched_off), (True, False))
+
+    def test_expires_the_offer_after_its_end_date(self):
+        offert = self.create('hoy', 0, 1)
+
+        with self.on(2):
+            self.assertEqual(expire_offerts(), 1)
+            self.assertEqual(activate_offerts(), 0)
+
+        offert.refresh_from_db()
+        self.assertFalse(offert.is_active)
+        self.assertFalse(offert.switched_off)
+
+    def test_date_change_recomputes_the_state(self):
+        offert = self.create('mañana', 1, 3)
+
+        self.client.patch(f'{self.url}{offert.pk}/', {'init_date': self.today})
+
+        offert.refresh_from_db()
+        self.assertTrue(offert.is_active)
+
+    def test_command_logs_each_run(self):
+        self.create('mañana', 1, 3)
+        self.create('hoy', 0, 1)
+        stdout = StringIO()
+
+        with self.on(2), self.assertLogs('apps.products.management.commands.sync_offerts', 'INFO') as logs:
+            call_command('sync_offerts', stdout=stdout)
+
+        record = logs.records[0]
+        self.assertEqual((record.expired, record.activated), (1, 1))
+        self.assertGreaterEqual(record.elapsed_ms, 0)
+        self.assertIn('activadas: 1', stdout.getvalue())
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False, IMAGE_VARIANT_WIDTHS=(20, 40))
+class ImageVariantTests(APITestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(self.media_root, 'categories'))
+        Image.new('RGB', (60, 30), (200, 10, 10)).save(os.path.join(self.media_root, 'categories/buena.jpg'))
+        with open(os.path.join(self.media_root, 'categories/rota.jpg'), 'wb') as broken:
+            broken.write(b'no es una imagen')
+
+    def test_render_many_records_failures_per_image(self):
+        results = render_many(self.media_root, ['categories/buena.jpg', 'categories/rota.jpg', 'categories/falta.jpg'], (20, 40))
+
+        self.assertEqual(
+            sorted((variant['width'], variant['format']) for variant in results['categories/buena.jpg']),
+            [(20, 'jpg'), (20, 'webp'), (40, 'jpg'), (40, 'webp')]
+        )
+        for variant in results['categories/buena.jpg']:
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, variant['name'])))
+        for name in ('categories/rota.jpg', 'categories/falta.jpg'):
+            self.assertEqual(set(results[name]), {'error'})
+            self.assertNotIn(self.media_root, results[name]['error'])
+
+    def test_failed_image_is_recorded_and_not_retried(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name='Rota', image='categories/rota.jpg')
+
+        category.refresh_from_db()
+        self.assertIn('error', category.image_variants['categories/rota.jpg'])
+        self.assertEqual(srcset(category.image_variants['categories/rota.jpg']), {})
+
+        with mock.patch('apps.products.services.image_service.render_many') as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                category.name = 'Rota 2'
+                category.save()
+        render.assert_not_called()
+
+    def test_store_variants_drops_results_for_replaced_images(self):
+        category = Category.objects.create(name='Buena', image='categories/buena.jpg')
+        results = render_many(self.media_root, ['categories/rota.jpg', 'categories/buena.jpg'], (20,))
+
+        store_variants(Category, category.pk, results)
+
+        category.refresh_from_db()
+        self.assertEqual(list(category.image_variants), ['categories/buena.jpg'])
+        self.assertEqual(len(category.image_variants['categories/buena.jpg']), 2)
+
+
+class ProductWriteTests(ProductTestMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = Product.objects.create(code='P1', slug='p1', name='Producto 1', unit_price=10)
+
+    def url(self, suffix=''):
+        return f'/products/products/{self.product.pk}/{suffix}'
+
+    def test_partial_update_writes_only_the_sent_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url(), {'name': 'Nuevo'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        update = next(query['sql'] for query in queries if query['sql'].startswith('UPDATE "products_product"'))
+        self.assertIn('"name"', update)
+        self.assertIn('"updated_at"', update)
+        self.assertNotIn('"likes"', update)
+        self.assertNotIn('"unit_price"', update)
+
+    def test_partial_update_keeps_concurrent_counter_folds(self):
+        instance = Product.objects.get(pk=self.product.pk)
+        Product.objects.filter(pk=self.product.pk).update(likes=7)
+
+        serializer = ProductSerializer(instance, data={'name': 'Nuevo'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.likes), ('Nuevo', 7))
+
+    def test_likes_are_counted_without_touching_the_product(self):
+        updated_at = self.product.updated_at
+
+        self.client.post(self.url('like/'))
+        response = self.client.post(self.url('like/'))
+
+        self.assertEqual(response.data['likes'], 2)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.likes, self.product.updated_at), (0, updated_at))
+        self.assertEqual(self.client.get(self.url()).data['likes'], 2)
+
+    def test_increments_spread_over_the_shards(self):
+        with override_settings(PRODUCT_COUNTER_SHARDS=4):
+            for _ in range(40):
+                counter_service.increment(self.product.pk, likes=1, total_sales=2)
+
+        shards = ProductCounterShard.objects.filter(product=self.product)
+        self.assertLessEqual(shards.count(), 4)
+        self.assertGreater(shards.count(), 1)
+        self.assertEqual(counter_service.current_totals(self.product), {'likes': 40, 'total_sales': 80})
+
+    def test_unknown_counter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            counter_service.increment(self.product.pk, stars=1)
+
+    def test_fold_moves_pending_counts_to_the_product(self):
+        other = Product.objects.create(code='P2', slug='p2', name='Producto 2', unit_price=10)
+        counter_service.increment(self.product.pk, likes=3)
+        counter_service.increment(other.pk, total_sales=5)
+        updated_at = self.product.updated_at
+
+        self.assertEqual(counter_service.fold_counters(batch_size=1), 2)
+
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.product.likes, self.product.updated_at), (3, updated_at))
+        self.assertEqual(other.total_sales, 5)
+        self.assertFalse(ProductCounterShard.objects.exclude(likes=0, total_sales=0).exists())
+        self.assertEqual(counter_service.current_totals(self.product)['likes'], 3)
+        self.assertEqual(counter_service.fold_counters(), 0)
+
+    def test_fold_command(self):
+        counter_service.increment(self.product.pk, likes=2)
+        stdout = StringIO()
+
+        call_command('fold_product_counters', stdout=stdout)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes, 2)
+        self.assertIn('Productos actualizados: 1', stdout.getvalue())
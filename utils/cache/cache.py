@@ -0,0 +1,66 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        version = 1
+        cache.add(_version_key(namespace), version, None)
+    return version
+
+
+def bump_version(namespace):
+    """
+    Invalida todas las entradas de `namespace`: las claves llevan la versión
+    y al cambiarla dejan de leerse (caducan solas por timeout).
+    """
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), 2, None)
+
+
+def versioned_key(namespace, *parts):
+    return ':'.join([namespace, f'v{get_version(namespace)}', *[str(part) for part in parts]])
+
+
+def make_etag(data):
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+
+
+def cached_payload(namespace, parts, build, timeout):
+    """
+    Devuelve (etag, data) desde la caché o llamando a build(). El ETag se
+    calcula una vez al construir, no en cada petición.
+    """
+    key = versioned_key(namespace, *parts)
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        entry = (make_etag(data), data)
+        cache.set(key, entry, timeout)
+    return entry
+
+
+def conditional_response(request, etag, data):
+    """200 con ETag, o 304 sin cuerpo si coincide con If-None-Match"""
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,71 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'json')
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+class Echo:
+    """Buffer de una línea para que csv.writer devuelva en vez de escribir"""
+    def write(self, value):
+        return value
+
+
+def _ndjson_rows(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _json_rows(columns, rows):
+    """Un array JSON emitido objeto a objeto"""
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False)
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+def _csv_rows(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+ROW_GENERATORS = {
+    'ndjson': _ndjson_rows,
+    'csv': _csv_rows,
+    'json': _json_rows,
+}
+
+
+def stream_export(queryset, fields, output='ndjson', filename='export'):
+    """
+    Devuelve un StreamingHttpResponse con el queryset en NDJSON, CSV o un
+    array JSON. Con filename=None se responde sin Content-Disposition.
+
+    `fields` es una lista de (columna, lookup); los lookups pueden cruzar
+    relaciones (p. ej. 'product__name') y se resuelven con JOIN en la misma
+    consulta. Las filas se leen con .iterator(chunk_size=...) (cursor de
+    servidor en PostgreSQL), así la memoria no depende del tamaño de la tabla.
+    """
+    if output not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {output}")
+
+    columns = [column for column, _ in fields]
+    rows = queryset.values_list(*[lookup for _, lookup in fields]).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    response = StreamingHttpResponse(ROW_GENERATORS[output](columns, rows), content_type=CONTENT_TYPES[output])
+    if filename is not None:
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
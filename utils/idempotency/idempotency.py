@@ -0,0 +1,109 @@
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from apps.core.models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def key_ttl():
+    return datetime.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL_SECONDS', 24 * 3600))
+
+
+def request_fingerprint(request):
+    """Huella de método, ruta y cuerpo: la misma clave no puede reutilizarse para otra petición"""
+    payload = json.dumps(
+        [request.method, request.path, request.data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(entry, fingerprint):
+    if entry.fingerprint != fingerprint:
+        return Response(
+            {'error': 'La Idempotency-Key ya se usó con una petición distinta'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(entry.body, status=entry.status_code, headers={REPLAY_HEADER: 'true'})
+
+
+def idempotent(view_method):
+    """
+    Hace idempotente una acción de escritura de un ViewSet cuando el cliente
+    envía la cabecera Idempotency-Key. Sin la cabecera la acción se ejecuta
+    como siempre.
+
+    La clave (usuario, clave) se reserva, la acción se ejecuta y su status y
+    cuerpo se guardan en una sola transacción: si el proceso cae a mitad no
+    queda ni la escritura ni la clave, y un reintento concurrente espera en
+    el índice único hasta que la primera termina. Los reintentos se
+    resuelven con una lectura por el índice único y devuelven la respuesta
+    guardada con la cabecera Idempotent-Replayed. Las respuestas 5xx no se
+    guardan (y su transacción se deshace) para que el cliente pueda
+    reintentar.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'La Idempotency-Key no puede superar {MAX_KEY_LENGTH} caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_id = request.user.pk if request.user.is_authenticated else 0
+        fingerprint = request_fingerprint(request)
+        now = timezone.now()
+        entry = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+        if entry is not None:
+            if entry.expires_at > now and entry.status_code is not None:
+                return _replay(entry, fingerprint)
+            # Caducada, o sin respuesta (solo puede quedar de versiones
+            # anteriores que la confirmaban aparte): se reutiliza la clave
+            IdempotencyKey.objects.filter(pk=entry.pk).filter(
+                Q(expires_at__lte=now) | Q(status_code__isnull=True)
+            ).delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    entry = IdempotencyKey.objects.create(
+                        user_id=user_id, key=key, fingerprint=fingerprint, expires_at=now + key_ttl()
+                    )
+            except IntegrityError:
+                # Otra petición con la misma clave se adelantó y ya confirmó
+                entry = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+                if entry is None:
+                    return Response(
+                        {'error': 'La petición con esta Idempotency-Key aún se está procesando'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                return _replay(entry, fingerprint)
+
+            response = view_method(self, request, *args, **kwargs)
+
+            if response.status_code >= 500:
+                # Se deshace también la escritura parcial: el cliente puede reintentar
+                transaction.set_rollback(True)
+            elif not isinstance(response, Response):
+                IdempotencyKey.objects.filter(pk=entry.pk).delete()
+            else:
+                IdempotencyKey.objects.filter(pk=entry.pk).update(
+                    status_code=response.status_code, body=response.data
+                )
+        return response
+
+    return wrapper
@@ -0,0 +1,115 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Formatos de salida: (extensión, formato de Pillow, opciones de guardado)
+OUTPUT_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def variant_name(source_name, width, extension, digest):
+    """variants/<ruta del original sin extensión>-<ancho>.<hash del contenido>.<ext>"""
+    stem, _ = os.path.splitext(source_name)
+    return f'variants/{stem}-{width}.{digest}.{extension}'
+
+
+def _write_once(path, data):
+    """Escribe el fichero si no existe; el nombre lleva el hash, así que nunca se sobrescribe"""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as temp:
+        temp.write(data)
+    os.replace(temp.name, path)
+
+
+def render_variants(root, source_name, widths):
+    """
+    Genera las variantes de `source_name` (relativo a `root`) para cada
+    ancho menor que el original (o del tamaño original si es más pequeña
+    que todos), en WebP y JPEG. No usa Django para poder ejecutarse en un ProcessPoolExecutor.
+
+    La orientación EXIF se aplica a los píxeles y las variantes se guardan
+    sin metadatos; el original no se modifica. El nombre de cada variante
+    lleva el hash de su contenido: regenerarla con otro resultado crea un
+    fichero nuevo en vez de cambiar uno que se sirve como inmutable.
+    Devuelve una lista de {'name', 'width', 'height', 'format'}.
+    """
+    with Image.open(os.path.join(root, source_name)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    targets = sorted({width for width in widths if width < image.width}) or [image.width]
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for extension, pillow_format, options in OUTPUT_FORMATS:
+            output = resized
+            if pillow_format == 'JPEG' and output.mode == 'RGBA':
+                output = Image.new('RGB', output.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            output.save(buffer, pillow_format, **options)
+            data = buffer.getvalue()
+            name = variant_name(source_name, width, extension, hashlib.sha256(data).hexdigest()[:16])
+            _write_once(os.path.join(root, name), data)
+            variants.append({'name': name, 'width': width, 'height': height, 'format': extension})
+    return variants
+
+
+def render_many(root, source_names, widths):
+    """
+    render_variants() para varias imágenes de la misma entidad. Las que no
+    se pueden abrir o procesar quedan como {'error': mensaje} para no
+    volver a encolarlas en cada guardado (generate_image_variants --force
+    las reintenta).
+    """
+    results = {}
+    for source_name in source_names:
+        try:
+            results[source_name] = render_variants(root, source_name, widths)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            # Sin la ruta absoluta: image_variants se devuelve en la API
+            results[source_name] = {'error': str(e).replace(os.path.join(root, ''), '') or type(e).__name__}
+    return results
+
+
+def srcset(variants):
+    """{'webp': 'url 320w, ...', 'jpg': ...} a partir de la lista de variantes de una imagen"""
+    if not isinstance(variants, list):
+        # Sin variantes o {'error': ...} si no se pudieron generar
+        return {}
+    by_format = {}
+    for variant in sorted(variants, key=lambda item: item['width']):
+        by_format.setdefault(variant['format'], []).append(
+            f"{default_storage.url(variant['name'])} {variant['width']}w"
+        )
+    return {image_format: ', '.join(entries) for image_format, entries in by_format.items()}
+
+
+def thumbnail_url(variants):
+    """La variante WebP más pequeña"""
+    if not isinstance(variants, list):
+        return None
+    webp = [variant for variant in variants if variant['format'] == 'webp']
+    if not webp:
+        return None
+    return default_storage.url(min(webp, key=lambda item: item['width'])['name'])
+
+
+def media_name(url):
+    """Nombre en MEDIA_ROOT de una URL /media/...; None si la imagen es externa"""
+    if isinstance(url, str) and url.startswith(settings.MEDIA_URL):
+        return url[len(settings.MEDIA_URL):]
+    return None
@@ -0,0 +1,156 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Nombres con un hash de contenido (ManifestStaticFilesStorage, almacenamiento
+# por contenido): un segmento hexadecimal de 12+ caracteres con alguna letra
+HASHED_NAME = re.compile(r'(?:^|[./_-])(?=[0-9]*[a-f])[0-9a-f]{12,64}(?:[./_-]|$)')
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def is_hashed(path):
+    return bool(HASHED_NAME.search(os.path.basename(path)))
+
+
+def make_etag(stat_result):
+    """ETag fuerte a partir de mtime y tamaño (como nginx), sin leer el fichero"""
+    return '"%x-%x"' % (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def parse_range(header, size):
+    """
+    (inicio, fin) inclusivos de un Range de un solo tramo; None si no hay
+    cabecera o no se entiende (se sirve el fichero completo) y ValueError si
+    el tramo no es satisfacible.
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Rango no satisfacible')
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return etag in tags or '*' in tags
+    modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return modified_since is not None and int(mtime) <= modified_since
+
+
+def _sendfile(request, full_path):
+    """
+    Delega el envío al proxy si MEDIA_SENDFILE_BACKEND lo indica:
+    - 'x-accel-redirect' (nginx): MEDIA_SENDFILE_PREFIX + ruta pedida, p. ej.
+      /_protected/media/categories/x.jpg con un location internal.
+    - 'x-sendfile' (Apache mod_xsendfile, lighttpd): ruta absoluta.
+    El proxy resuelve entonces Range por su cuenta.
+    """
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', '')
+    if backend == 'x-accel-redirect':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/_protected') + request.path
+        return response
+    if backend == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+        return response
+    return None
+
+
+def _file_response(request, full_path, size, etag):
+    if_range = request.headers.get('If-Range')
+    range_header = request.headers.get('Range') if if_range in (None, etag) else None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'))
+        response['Content-Length'] = size
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_read_range(full_path, start, length), status=206)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = length
+    return response
+
+
+@require_safe
+def serve(request, path, document_root):
+    """
+    Sustituto de django.views.static.serve para /media/ y /static/:
+    - ETag fuerte y Last-Modified; If-None-Match / If-Modified-Since -> 304.
+    - Cache-Control immutable de un año para nombres con hash, y
+      MEDIA_CACHE_SECONDS con revalidación para el resto.
+    - Range de un tramo (206 / 416), respetando If-Range.
+    - X-Accel-Redirect / X-Sendfile para no copiar bytes en el worker.
+    """
+    try:
+        full_path = safe_join(document_root, path)
+        stat_result = os.stat(full_path)
+    except (SuspiciousFileOperation, ValueError, OSError):
+        raise Http404('Fichero no encontrado')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('Fichero no encontrado')
+
+    etag = make_etag(stat_result)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat_result.st_mtime),
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if is_hashed(path) else (
+            'public, max-age=%d, must-revalidate' % getattr(settings, 'MEDIA_CACHE_SECONDS', 3600)
+        ),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = _sendfile(request, full_path) or _file_response(request, full_path, stat_result.st_size, etag)
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -1,6 +1,269 @@
+import base64
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from django.db.models import F, Q, Model
+from django.db.models.expressions import OrderBy
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+def wants_count(request, param='count'):
+    return request.query_params.get(param, 'true').lower() not in ('false', '0', 'no')
+
+
+def wants_cursor(request):
+    return 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor'
+
 
 class Pagination(pagination.PageNumberPagination):
+    """
+    Paginación por número de página. Opciones:
+    - ?count=false evita el COUNT(*) (la respuesta no incluye count).
+    - ?cursor=... o ?pagination=cursor usa KeysetPagination, cuyo coste no
+      crece con la profundidad de la página. Si el orden no admite cursor
+      (una expresión) se sigue paginando por número de página.
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if wants_cursor(request) and KeysetPagination.supports(queryset):
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.page_size
+            self.keyset.page_size_query_param = self.page_size_query_param
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        self.with_count = wants_count(request, self.count_query_param)
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound('Página inválida.')
+        if self.page_number < 1:
+            raise NotFound('Página inválida.')
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.with_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.with_count:
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if self.with_count:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f"Tipo no serializable en el cursor: {type(value)}")
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Paginación por cursor (keyset). Usa el orden del queryset (el que deja
+    OrderingFilter, p. ej. -created_at o name) más el id como desempate, y
+    pide la página siguiente con WHERE (campos) > (valores de la última
+    fila) en vez de OFFSET, así cualquier página cuesta lo mismo que la
+    primera. Los NULL se ordenan como el valor más alto en ambos motores.
+
+    ?count=false omite el COUNT(*) de la respuesta.
+    """
     page_size = 5
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def ordering_field(field):
+        """(nombre, descendente) de un elemento del orden, o None si es una expresión"""
+        if isinstance(field, str):
+            return field.lstrip('-'), field.startswith('-')
+        if isinstance(field, F):
+            return field.name, False
+        if isinstance(field, OrderBy) and isinstance(field.expression, F):
+            return field.expression.name, field.descending
+        return None
+
+    @classmethod
+    def supports(cls, queryset):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or []
+        return all(cls.ordering_field(field) is not None for field in ordering)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or ['-pk'])
+        pk_name = queryset.model._meta.pk.name
+        fields = []
+        for field in ordering:
+            parsed = self.ordering_field(field)
+            if parsed is None:
+                raise ValueError('KeysetPagination solo admite ordenaciones por nombre de campo')
+            name, descending = parsed
+            fields.append((pk_name if name == 'pk' else name, descending))
+        if pk_name not in [name for name, _ in fields]:
+            fields.append((pk_name, fields[0][1]))
+        return fields
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            return cursor['v'], bool(cursor.get('r'))
+        except (ValueError, TypeError, KeyError):
+            raise NotFound('Cursor inválido.')
+
+    def encode_cursor(self, values, reverse):
+        raw = json.dumps({'v': values, 'r': int(reverse)}, default=_json_default)
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _after(field, descending, value):
+        """Q de las filas que van después de `value` en el orden indicado"""
+        if descending:
+            return Q(**{f'{field}__isnull': False}) if value is None else Q(**{f'{field}__lt': value})
+        return Q(pk__in=[]) if value is None else (Q(**{f'{field}__gt': value}) | Q(**{f'{field}__isnull': True}))
+
+    @staticmethod
+    def _equal(field, value):
+        return Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+
+    def keyset_filter(self, ordering, values):
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(ordering, values):
+            condition |= equal & self._after(field, descending, value)
+            equal &= self._equal(field, value)
+        return condition
+
+    @staticmethod
+    def row_value(row, field):
+        if isinstance(row, dict):
+            return row[field]
+        value = row
+        for part in field.split('__'):
+            value = getattr(value, part, None)
+            if value is None:
+                break
+        return value.pk if isinstance(value, Model) else value
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+        if queryset._fields is not None:
+            # Querysets de values(): el cursor necesita los campos de orden en cada fila
+            missing = [field for field, _ in ordering if field not in queryset._fields]
+            if missing:
+                queryset = queryset.values(*queryset._fields, *missing)
+        self.count = queryset.count() if wants_count(request, self.count_query_param) else None
+
+        reverse = False
+        if cursor is not None:
+            values, reverse = cursor
+            if len(values) != len(ordering):
+                raise NotFound('Cursor inválido.')
+            scan = [(field, descending != reverse) for field, descending in ordering]
+            queryset = queryset.filter(self.keyset_filter(scan, values))
+        else:
+            scan = ordering
+
+        order_by = [
+            F(field).desc(nulls_first=True) if descending else F(field).asc(nulls_last=True)
+            for field, descending in scan
+        ]
+        rows = list(queryset.order_by(*order_by)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = (cursor is not None) if reverse else has_more
+        self.has_previous = has_more if reverse else cursor is not None
+        self.next_values = [self.row_value(rows[-1], field) for field, _ in ordering] if rows else None
+        self.previous_values = [self.row_value(rows[0], field) for field, _ in ordering] if rows else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or self.next_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_values, False))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.previous_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.previous_values, True))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,110 @@
+import re
+
+from django.db import connection
+from django.db.models import Q, Case, When, Value, FloatField
+from django.db.models.functions import Upper
+from rest_framework import filters
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+# Configuración de full-text sin stemming: nombres y marcas, no prosa
+SEARCH_CONFIG = 'simple'
+TRIGRAM_MIN_LENGTH = 3
+
+
+def search_vector(*fields):
+    """
+    Vector de búsqueda de los campos de texto. Los índices GIN de las
+    migraciones se crean con esta misma expresión para que PostgreSQL
+    pueda usarlos.
+    """
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*fields, config=SEARCH_CONFIG)
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    Búsqueda indexada con ranking (?search=). Atributos de la vista:
+    - search_prefix_fields: códigos; coinciden por prefijo sin distinguir
+      mayúsculas (índice sobre UPPER(code)).
+    - search_text_fields: texto; en PostgreSQL full-text con prefijo por
+      palabra (índice GIN del vector) más similitud trigram para errores
+      de escritura (índice GIN trigram del primer campo).
+
+    En otros motores usa istartswith/icontains con el mismo ranking
+    aproximado. Los resultados se ordenan por relevancia salvo que la
+    petición traiga ?ordering=, por eso este filtro va después de
+    OrderingFilter en filter_backends.
+    """
+
+    def get_search_term(self, request):
+        return request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        prefix_fields = getattr(view, 'search_prefix_fields', None)
+        text_fields = getattr(view, 'search_text_fields', None)
+        term = self.get_search_term(request)
+        if not term or not (prefix_fields or text_fields):
+            return super().filter_queryset(request, queryset, view)
+
+        prefix_fields = prefix_fields or []
+        text_fields = text_fields or []
+        tokens = TOKEN_RE.findall(term)
+        queryset = queryset.alias(**{
+            f'_search_prefix_{index}': Upper(field) for index, field in enumerate(prefix_fields)
+        })
+        upper_term = term.upper()
+        exact_code = Q(pk__in=[])
+        code_prefix = Q(pk__in=[])
+        for index in range(len(prefix_fields)):
+            exact_code |= Q(**{f'_search_prefix_{index}': upper_term})
+            code_prefix |= Q(**{f'_search_prefix_{index}__startswith': upper_term})
+
+        if connection.vendor == 'postgresql' and tokens:
+            queryset, condition, text_rank = self.postgres_text(queryset, text_fields, term, tokens)
+        else:
+            condition, text_rank = self.fallback_text(text_fields, tokens or [term])
+
+        queryset = queryset.filter(code_prefix | condition).annotate(
+            search_rank=Case(
+                When(exact_code, then=Value(3.0)),
+                When(code_prefix, then=Value(2.0)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ) + text_rank
+        )
+        if self.must_call_distinct(queryset, prefix_fields + text_fields):
+            queryset = queryset.distinct()
+
+        if filters.OrderingFilter.ordering_param not in request.query_params:
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
+
+    def postgres_text(self, queryset, text_fields, term, tokens):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+        if not text_fields:
+            return queryset, Q(pk__in=[]), Value(0.0, output_field=FloatField())
+
+        # Cada palabra como prefijo: "cafe mol" -> cafe:* & mol:*
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), config=SEARCH_CONFIG, search_type='raw')
+        queryset = queryset.alias(_search_vector=search_vector(*text_fields))
+        condition = Q(_search_vector=query)
+        rank = SearchRank(search_vector(*text_fields), query)
+        if len(term) >= TRIGRAM_MIN_LENGTH:
+            condition |= Q(**{f'{text_fields[0]}__trigram_similar': term})
+            rank = rank + TrigramSimilarity(text_fields[0], term)
+        return queryset, condition, rank
+
+    def fallback_text(self, text_fields, tokens):
+        if not text_fields:
+            return Q(pk__in=[]), Value(0.0, output_field=FloatField())
+
+        condition = Q()
+        for token in tokens:
+            condition &= Q(*[Q(**{f'{field}__icontains': token}) for field in text_fields], _connector=Q.OR)
+        rank = Case(
+            When(**{f'{text_fields[0]}__istartswith': tokens[0]}, then=Value(1.0)),
+            When(condition, then=Value(0.5)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return condition, rank
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from apps.core.models import MediaBlob
+
+BLOB_PREFIX = 'blobs'
+
+
+def blob_name(sha256, original_name):
+    """blobs/<2 primeros caracteres del hash>/<hash><extensión original>"""
+    _, extension = os.path.splitext(original_name)
+    return f'{BLOB_PREFIX}/{sha256[:2]}/{sha256}{extension.lower()}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage que guarda cada subida bajo el SHA-256 de su contenido.
+    El fichero se escribe por trozos a un temporal mientras se calcula el
+    hash (memoria acotada) y solo se mueve a su nombre definitivo si ese
+    contenido no existía; si ya existía se descarta y se devuelve el nombre
+    del blob existente. Cada blob queda registrado en MediaBlob.
+
+    Como el nombre depende solo del contenido, las URLs no cambian nunca y
+    se pueden servir como immutable.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide _save() a partir del hash
+        return name
+
+    def _save(self, name, content):
+        upload_dir = self.path(BLOB_PREFIX)
+        os.makedirs(upload_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+
+            # Si el contenido ya existe se reutiliza su blob: el UPDATE saca
+            # last_used_at del alcance del GC y bloquea la fila mientras dure
+            # la transacción
+            existing = None
+            if MediaBlob.objects.filter(sha256=sha256).update(last_used_at=timezone.now()):
+                existing = MediaBlob.objects.filter(sha256=sha256).values_list('name', flat=True).first()
+            final_name = existing or blob_name(sha256, name)
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if existing is None:
+            final_name = self._register(final_name, sha256, size)
+        return final_name
+
+    def _register(self, name, sha256, size):
+        """
+        Crea la fila del blob. Si una subida concurrente del mismo contenido
+        se adelantó (nombre o sha256 únicos), devuelve su nombre y borra la
+        copia propia cuando se guardó con otra extensión.
+        """
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, sha256=sha256, size=size)
+            return name
+        except IntegrityError:
+            existing = MediaBlob.objects.filter(sha256=sha256).values_list('name', flat=True).first()
+            if existing is None:
+                raise
+            MediaBlob.objects.filter(sha256=sha256).update(last_used_at=timezone.now())
+            if existing != name:
+                self.delete(name)
+            return existing